@@ -0,0 +1,48 @@
+import argparse
+import asyncio
+
+import uvicorn
+
+from app.config import settings
+
+def serve() -> None:
+    # Each worker is a separate process; approvals use versioned writes,
+    # singleton jobs use Mongo leases and caches listen on the invalidation
+    # channel, so nothing relies on in-process locks.
+    uvicorn.run(
+        "app.main:app",
+        host=settings.api_host,
+        port=settings.api_port,
+        workers=settings.api_workers,
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m app")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("serve", help="run the API (default)")
+    indexes = commands.add_parser("indexes", help="create or verify the indexes in app/indexes.py")
+    indexes.add_argument("action", choices=["apply", "verify"])
+    migrate = commands.add_parser("migrate", help="run a data migration from app/migrations.py")
+    migrate.add_argument("name", choices=["skill", "head-to-head", "civ-stats", "unify-stats"])
+    migrate.add_argument("--only-missing", action="store_true", help="skip documents (skill) or stat tables (head-to-head, civ-stats, unify-stats) that already have data")
+    replay = commands.add_parser("replay", help="rebuild stat tables from validated_matches (app/replay.py)")
+    replay.add_argument("--table", action="append", dest="tables", help="only this table, e.g. civ6_lifetime_stats.rt_ffa (repeatable)")
+    replay.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    replay.add_argument("--dry-run", action="store_true", help="replay and report without writing")
+    season = commands.add_parser("season", help="list seasons or archive the current one (app/seasons.py)")
+    season.add_argument("action", choices=["list", "rollover"])
+    season.add_argument("--name", help="name of the season being started")
+    args = parser.parse_args()
+    if args.command == "indexes":
+        from app.indexes import run
+        raise SystemExit(asyncio.run(run(args.action)))
+    if args.command == "migrate":
+        from app.migrations import run
+        raise SystemExit(asyncio.run(run(args.name, only_missing=args.only_missing)))
+    if args.command == "replay":
+        from app.replay import run
+        raise SystemExit(asyncio.run(run(tables=args.tables, workers=args.workers, dry_run=args.dry_run)))
+    if args.command == "season":
+        from app.seasons import run
+        raise SystemExit(asyncio.run(run(args.action, name=args.name)))
+    serve()
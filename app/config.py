@@ -1,4 +1,5 @@
-from typing import List
+from datetime import datetime
+from typing import List, Literal, Optional
 from pydantic_settings import BaseSettings
 from pydantic import (
     Field,
@@ -20,6 +21,20 @@ class Settings(BaseSettings):
     # API
     api_host: str = Field("0.0.0.0", env="API_HOST")
     api_port: int = Field(8000, gt=0, lt=65536, env="API_PORT")
+    # uvicorn worker processes (python -m app); shared state is coordinated through Mongo
+    api_workers: int = Field(1, ge=1, le=64, env="API_WORKERS")
+
+    # Create the indexes in app/indexes.py at startup (idempotent)
+    ensure_indexes: bool = Field(True, env="ENSURE_INDEXES")
+
+    # Multi-worker coordination
+    lease_ttl_seconds: float = Field(30.0, ge=1, env="LEASE_TTL_SECONDS")
+    invalidation_poll_seconds: float = Field(2.0, gt=0, env="INVALIDATION_POLL_SECONDS")
+
+    # Auto-approval of confirmed matches (TrueSkillService); interval 0 disables the scheduler
+    auto_approve_hold_hours: float = Field(48.0, ge=0, env="AUTO_APPROVE_HOLD_HOURS")
+    auto_approve_interval_seconds: float = Field(60.0, ge=0, env="AUTO_APPROVE_INTERVAL_SECONDS")
+    auto_approve_batch_size: int = Field(500, ge=1, env="AUTO_APPROVE_BATCH_SIZE")
 
     # CORS
     allowed_origins_raw: str = Field("http://localhost:3000", env="ALLOWED_ORIGINS")
@@ -30,11 +45,35 @@ class Settings(BaseSettings):
     ts_beta: float = Field(70.0, gt=0, env="TS_BETA")
     ts_tau: float = Field(1.0, ge=0, env="TS_TAU")
     ts_draw_prob: float = Field(0.0, ge=0, le=1, env="TS_DRAW_PROB")
+    # "trueskill" (reference library) or "numpy" (app/services/trueskill_numpy.py)
+    ts_engine: Literal["trueskill", "numpy"] = Field("trueskill", env="TS_ENGINE")
+    # LRU memo in front of rate(); 0 disables it
+    ts_memo_size: int = Field(4096, ge=0, env="TS_MEMO_SIZE")
+    ts_memo_quantum: float = Field(1e-6, gt=0, env="TS_MEMO_QUANTUM")
 
     ts_sigma_free: float = Field(90.0, ge=0, env="TS_SIGMA_FREE")
     ts_teamer_boost: float = Field(1.0, env="TS_TEAMER_BOOST")
     
     min_points_for_subs: int = Field(5, ge=0, env="MIN_POINTS_FOR_SUBS")
+
+    # In-memory leaderboards: rows served, plus spare rows kept below them
+    leaderboard_size: int = Field(100, ge=1, env="LEADERBOARD_SIZE")
+    leaderboard_buffer: int = Field(100, ge=0, env="LEADERBOARD_BUFFER")
+
+    # Stat tables: one collection per ledger, or one collection per game keyed by
+    # (discord_id, ledger) once `python -m app migrate unify-stats` has run
+    stat_layout: Literal["collections", "unified"] = Field("collections", env="STAT_LAYOUT")
+
+    # Start of the first season, until `python -m app season rollover` records seasons in the DB
+    season_started_at: Optional[datetime] = Field(None, env="SEASON_STARTED_AT")
+
+    # Optimistic concurrency: attempts before an approval gives up with 409
+    approve_max_retries: int = Field(5, ge=1, le=50, env="APPROVE_MAX_RETRIES")
+    # Batch approval: matches per request and per transaction
+    batch_approve_max_matches: int = Field(500, ge=1, env="BATCH_APPROVE_MAX_MATCHES")
+    batch_approve_chunk_size: int = Field(100, ge=1, env="BATCH_APPROVE_CHUNK_SIZE")
+    # Unapproval: later matches it may re-rate before asking for a full replay
+    unapprove_max_replay_matches: int = Field(1000, ge=0, env="UNAPPROVE_MAX_REPLAY_MATCHES")
     
     civ_save_parser_version: str = Field("1.0", env="CIV_SAVE_PARSER_VERSION")
 
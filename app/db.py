@@ -5,6 +5,12 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from app.config import settings
+from app.services.invalidation import invalidations
+from app.indexes import ensure_indexes, stat_collections
+from app.services.leaderboard_cache import leaderboards
+from app.services.rating_store import ratings
+from app.services.auto_approval import auto_approval
+from app.services.stat_tables import stat_table
 
 # Ensure startup logs are visible when running directly (won't override existing handlers)
 if not logging.getLogger().hasHandlers():
@@ -44,6 +50,19 @@ async def db_lifespan(app: FastAPI):
         app.state.mongodb = db
         logger.info("🟢 MongoDB connected (db=%s)", db.name)
 
+        if settings.ensure_indexes:
+            await ensure_indexes(client)
+
+        stat_tables = [stat_table(client, database, collection) for database, collection in stat_collections()]
+        await leaderboards.load_all(stat_tables)
+        await ratings.load_all(stat_tables)
+
+        # cross-worker cache invalidation
+        await invalidations.start(client, settings.invalidation_poll_seconds)
+
+        # lease-guarded, so one worker approves at a time
+        await auto_approval.start(client, settings.auto_approve_interval_seconds)
+
         yield  # application runs while yielded
 
     except Exception:
@@ -53,6 +72,8 @@ async def db_lifespan(app: FastAPI):
             client.close()
         raise
     finally:
+        await auto_approval.stop()
+        await invalidations.stop()
         client = getattr(app.state, "mongodb_client", None)
         if client:
             client.close()
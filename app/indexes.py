@@ -0,0 +1,195 @@
+"""
+Declarative registry of the MongoDB indexes the service relies on.
+
+``ensure_indexes`` is applied from ``db_lifespan`` on every start; creating
+an index that already exists with the same spec is a no-op, so it is safe
+to run from every worker. ``verify_indexes`` compares the registry with
+what the server has and reports missing, unexpected and unused indexes.
+
+    python -m app indexes apply
+    python -m app indexes verify
+"""
+import json
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from app.config import settings
+from app.services.stat_tables import UNIFIED_COLLECTION, UNIFIED_DATABASE
+
+logger = logging.getLogger(__name__)
+
+STAT_GAMES = ("civ6", "civ7")
+STAT_DATABASES = ("civ6_lifetime_stats", "civ6_season_stats", "civ7_lifetime_stats", "civ7_season_stats")
+STAT_PREFIXES = ("rt_", "pbc_")
+# game_mode values produced by the parsers (see determine_game_mode)
+STAT_MODES = ("duel", "ffa", "teamer")
+
+@dataclass(frozen=True)
+class IndexSpec:
+    database: str
+    collection: str
+    keys: Tuple[Tuple[str, int], ...]
+    name: str
+    unique: bool = False
+    expire_after_seconds: Optional[int] = None
+
+    def model(self) -> IndexModel:
+        options: Dict[str, Any] = {"name": self.name}
+        if self.unique:
+            options["unique"] = True
+        if self.expire_after_seconds is not None:
+            options["expireAfterSeconds"] = self.expire_after_seconds
+        return IndexModel(list(self.keys), **options)
+
+    def matches(self, info: Dict[str, Any]) -> bool:
+        """Whether an entry of ``index_information()`` is this index."""
+        return (
+            tuple((k, int(d)) for k, d in info["key"]) == self.keys
+            and bool(info.get("unique")) == self.unique
+            and info.get("expireAfterSeconds") == self.expire_after_seconds
+        )
+
+def stat_collections() -> List[Tuple[str, str]]:
+    return [(db, prefix + mode) for db in STAT_DATABASES for prefix in STAT_PREFIXES for mode in STAT_MODES]
+
+def registry() -> List[IndexSpec]:
+    specs = [
+        # duplicate report detection in create_from_save
+        IndexSpec("match_reporter", "pending_matches", (("save_file_hash", ASCENDING),), "save_file_hash_unique", unique=True),
+        # batch approval walks pending matches oldest first
+        IndexSpec("match_reporter", "pending_matches", (("created_at", ASCENDING), ("_id", ASCENDING)), "created_at"),
+        # expired leases are removed by the server; acquire() also takes over expired ones
+        IndexSpec("match_reporter", "leases", (("expires_at", ASCENDING),), "expires_at_ttl", expire_after_seconds=0),
+        # approvals in flight (StatWriteGate); drained by season rollover, crashed ones expire
+        IndexSpec("match_reporter", "stat_writers", (("expires_at", ASCENDING),), "expires_at_ttl", expire_after_seconds=0),
+        # a player's rating series is one range read over its monthly buckets
+        IndexSpec("match_reporter", "rating_series", (("table", ASCENDING), ("player", ASCENDING), ("month", ASCENDING)), "rating_series", unique=True),
+        # head-to-head: one pair, and one player's rivals by games together
+        IndexSpec("match_reporter", "head_to_head", (("table", ASCENDING), ("a", ASCENDING), ("b", ASCENDING)), "pair", unique=True),
+        IndexSpec("match_reporter", "head_to_head", (("table", ASCENDING), ("a", ASCENDING), ("games", DESCENDING), ("b", ASCENDING)), "rivals"),
+        # civ stats of a stat table are one read, optionally of one map type
+        IndexSpec("match_reporter", "civ_stats", (("table", ASCENDING), ("map_type", ASCENDING), ("civ", ASCENDING)), "rollup", unique=True),
+        # rating replay streams each (game, mode, cloud) ledger in approval order
+        IndexSpec(
+            "match_reporter", "validated_matches",
+            (("game", ASCENDING), ("game_mode", ASCENDING), ("is_cloud", ASCENDING), ("approved_at", ASCENDING), ("_id", ASCENDING)),
+            "replay",
+        ),
+        # auto-approval scheduler: eligible confirmed matches, oldest first, and their history rows
+        IndexSpec(settings.mongo_db_name, "matches", (("status", ASCENDING), ("confirmedAt", ASCENDING)), "auto_approval"),
+        IndexSpec(settings.mongo_db_name, "rating_history", (("matchId", ASCENDING),), "matchId"),
+        IndexSpec("server_members", "users", (("steam_id", ASCENDING),), "steam_id"),
+        IndexSpec("server_members", "users", (("discord_id", ASCENDING),), "discord_id"),
+    ]
+    if settings.stat_layout == "unified":
+        specs.extend(unified_specs())
+        return specs
+    for database, collection in stat_collections():
+        # Leaderboard and its keyset pages: sorted by mu desc, sigma asc, _id
+        # asc. Sort keys first (equality-sort-range) so the index returns
+        # documents in order; the games and lastModified filters are checked
+        # on the index keys, without an in-memory sort.
+        specs.append(IndexSpec(
+            database, collection,
+            (("mu", DESCENDING), ("sigma", ASCENDING), ("_id", ASCENDING), ("games", ASCENDING), ("lastModified", ASCENDING)),
+            "leaderboard_keyset",
+        ))
+        # Leaderboard filtered to players of one civ (civs.<civ leader> > 0)
+        specs.append(IndexSpec(database, collection, (("civs.$**", ASCENDING),), "civs"))
+        # Leaderboard ordered by the precomputed conservative skill
+        specs.append(IndexSpec(
+            database, collection,
+            (("skill", DESCENDING), ("games", ASCENDING)),
+            "leaderboard_skill",
+        ))
+    return specs
+
+def unified_specs() -> List[IndexSpec]:
+    """Indexes of the unified stats layout (app/services/stat_tables.py), one collection per game."""
+    specs = []
+    for game in STAT_GAMES:
+        database = UNIFIED_DATABASE.format(game=game)
+        # one document per player and ledger; a player's profile is one range of it
+        specs.append(IndexSpec(database, UNIFIED_COLLECTION, (("discord_id", ASCENDING), ("ledger", ASCENDING)), "profile", unique=True))
+        # the per-collection leaderboard indexes with the ledger as equality prefix
+        specs.append(IndexSpec(
+            database, UNIFIED_COLLECTION,
+            (("ledger", ASCENDING), ("mu", DESCENDING), ("sigma", ASCENDING), ("discord_id", ASCENDING), ("games", ASCENDING), ("lastModified", ASCENDING)),
+            "leaderboard_keyset",
+        ))
+        # civ-filtered leaderboards: a compound wildcard index (MongoDB 7.0+) so a civ's
+        # range is scanned within one ledger, not across every ledger of the game
+        specs.append(IndexSpec(database, UNIFIED_COLLECTION, (("ledger", ASCENDING), ("civs.$**", ASCENDING)), "ledger_civs"))
+        specs.append(IndexSpec(database, UNIFIED_COLLECTION, (("ledger", ASCENDING), ("skill", DESCENDING), ("games", ASCENDING)), "leaderboard_skill"))
+    return specs
+
+def collection_specs(database: str, collection: str) -> List[IndexSpec]:
+    """Registered indexes of one collection."""
+    return [spec for spec in registry() if (spec.database, spec.collection) == (database, collection)]
+
+def _by_namespace(specs: List[IndexSpec]) -> Dict[Tuple[str, str], List[IndexSpec]]:
+    grouped: Dict[Tuple[str, str], List[IndexSpec]] = {}
+    for spec in specs:
+        grouped.setdefault((spec.database, spec.collection), []).append(spec)
+    return grouped
+
+async def ensure_indexes(client, specs: List[IndexSpec] = None) -> int:
+    """Create every registered index; returns the number of collections that failed."""
+    failures = 0
+    for (database, collection), group in _by_namespace(specs or registry()).items():
+        try:
+            await client[database][collection].create_indexes([spec.model() for spec in group])
+        except OperationFailure as e:
+            # e.g. duplicates blocking a unique index, or an index with the same name and other options
+            failures += 1
+            logger.error(f"🔴 Could not create indexes on {database}.{collection}: {e}")
+    if failures:
+        logger.warning(f"⚠️ Indexes incomplete on {failures} collections, run `python -m app indexes verify`")
+    else:
+        logger.info("🟢 Indexes ensured")
+    return failures
+
+async def verify_indexes(client, specs: List[IndexSpec] = None) -> Dict[str, Any]:
+    """
+    Report per collection the registered indexes that are missing, indexes
+    present but not registered, and indexes with no recorded use since the
+    server last started (``$indexStats``).
+    """
+    report = {"missing": [], "unexpected": [], "unused": []}
+    for (database, collection), group in _by_namespace(specs or registry()).items():
+        coll = client[database][collection]
+        present = await coll.index_information()
+        namespace = f"{database}.{collection}"
+        for spec in group:
+            if not any(spec.matches(info) for info in present.values()):
+                report["missing"].append({"namespace": namespace, "name": spec.name, "keys": spec.keys})
+        for name, info in present.items():
+            if name != "_id_" and not any(spec.matches(info) for spec in group):
+                report["unexpected"].append({"namespace": namespace, "name": name, "keys": info["key"]})
+        if present:
+            async for stat in coll.aggregate([{"$indexStats": {}}]):
+                if stat["name"] != "_id_" and stat["accesses"]["ops"] == 0:
+                    report["unused"].append({
+                        "namespace": namespace,
+                        "name": stat["name"],
+                        "since": stat["accesses"]["since"].isoformat(),
+                    })
+    return report
+
+async def run(command: str) -> int:
+    """Entry point of ``python -m app indexes``; returns the exit status."""
+    client = AsyncIOMotorClient(settings.mongo_url.get_secret_value(), uuidRepresentation="standard")
+    try:
+        if command == "apply":
+            return 1 if await ensure_indexes(client) else 0
+        report = await verify_indexes(client)
+        print(json.dumps(report, indent=2, default=str))
+        return 1 if report["missing"] else 0
+    finally:
+        client.close()
+
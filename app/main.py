@@ -7,6 +7,7 @@ from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.config import settings
 from app.db import db_lifespan
 from app.dependencies import get_database
+from app.metrics import metrics
 
 from app.routes import router
 
@@ -47,4 +48,8 @@ async def db_stats(db: AsyncIOMotorDatabase = Depends(get_database)):
         stats = await db.command("dbstats", scale=1)
         return JSONResponse(stats)
     except Exception as e:
-        raise HTTPException(503, f"DB not ready: {e!s}")
\ No newline at end of file
+        raise HTTPException(503, f"DB not ready: {e!s}")
+
+@app.get("/_debug/metrics")
+async def debug_metrics():
+    return JSONResponse(metrics.snapshot())
\ No newline at end of file
@@ -0,0 +1,35 @@
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict
+
+class Metrics:
+    """Process-local counters, gauges and snapshot providers for /_debug/metrics."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._gauges: Dict[str, float] = {}
+        self._providers: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    def inc(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] += value
+
+    def set(self, name: str, value: float) -> None:
+        with self._lock:
+            self._gauges[name] = value
+
+    def register(self, name: str, provider: Callable[[], Dict[str, Any]]) -> None:
+        self._providers[name] = provider
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+            }
+        for name, provider in self._providers.items():
+            out[name] = provider()
+        return out
+
+metrics = Metrics()
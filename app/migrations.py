@@ -0,0 +1,152 @@
+"""
+Data migrations over the stat collections, run by hand:
+
+    python -m app migrate skill [--only-missing]
+    python -m app migrate head-to-head [--only-missing]
+    python -m app migrate civ-stats [--only-missing]
+    python -m app migrate unify-stats [--only-missing]
+
+The skill migration is a server-side update (aggregation pipeline), so
+documents never travel to the client and a concurrent approval cannot be
+overwritten with stale values. The derived collections are rebuilt one
+stat table at a time and should run while approvals are quiet.
+``unify-stats`` copies the stat collections into the unified layout
+(app/services/stat_tables.py) before switching STAT_LAYOUT.
+"""
+import logging
+from typing import Dict
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReplaceOne
+
+from app.config import settings
+from app.indexes import STAT_GAMES, ensure_indexes, stat_collections, unified_specs
+from app.services.invalidation import invalidations
+from app.models.db_models import MatchModel
+from app.services.civ_stats import add_rollup, rollup_docs, rollup_of
+from app.services.head_to_head import backfill_pipeline
+from app.services.skill import skill_expression
+from app.services.stat_tables import LedgerTable, stat_table, unified_collection
+
+# stat documents per bulk write when copying collections
+UNIFY_BATCH_SIZE = 1000
+
+logger = logging.getLogger(__name__)
+
+async def backfill_skill(client, only_missing: bool = False) -> Dict[str, int]:
+    """
+    Set ``skill`` on every stat document from its current mu/sigma.
+
+    Approvals keep ``skill`` current from then on; rerun this after changing
+    TS_SIGMA_FREE, TS_TEAMER_BOOST or TS_MU, since stored scores are computed
+    with the settings of the run.
+    """
+    modified = {}
+    for database, collection in stat_collections():
+        query = {"mu": {"$exists": True}}
+        if only_missing:
+            query["skill"] = {"$exists": False}
+        res = await stat_table(client, database, collection).update_many(
+            query,
+            [{"$set": {"skill": skill_expression(teamer=collection.endswith("teamer"))}}],
+        )
+        modified[f"{database}.{collection}"] = res.modified_count
+    # in-memory leaderboards of running workers reload on their next read
+    await invalidations.publish(client, list(modified))
+    logger.info(f"✅ 🔄 Backfilled skill on {sum(modified.values())} stat documents")
+    return modified
+
+async def backfill_head_to_head(client, only_missing: bool = False) -> Dict[str, int]:
+    """
+    Rebuild ``match_reporter.head_to_head`` from ``validated_matches``, one
+    aggregation per stat table ending in ``$merge``. Seasonal tables only
+    count the current season, like replay. An approval landing while its
+    table is rebuilt can be counted twice or not at all, so run this while
+    approvals are quiet.
+    """
+    from app.replay import replay_jobs
+    head_to_head = client["match_reporter"].head_to_head
+    validated_matches = client["match_reporter"].validated_matches
+    tables = {}
+    for job in await replay_jobs(client):
+        if only_missing and await head_to_head.find_one({"table": job.table}, {"_id": 1}):
+            continue
+        await head_to_head.delete_many({"table": job.table})
+        await validated_matches.aggregate(backfill_pipeline(job.table, job.query())).to_list(length=None)
+        tables[job.table] = await head_to_head.count_documents({"table": job.table})
+    logger.info(f"✅ 🔄 Backfilled {sum(tables.values())} head-to-head records in {len(tables)} stat tables")
+    return tables
+
+async def backfill_civ_stats(client, only_missing: bool = False) -> Dict[str, int]:
+    """
+    Rebuild ``match_reporter.civ_stats`` from ``validated_matches``. Civ
+    names go through ``get_cpl_name``, so matches are streamed and counted
+    here with the approvals' rules rather than on the server.
+    """
+    from app.replay import replay_jobs
+    civ_stats = client["match_reporter"].civ_stats
+    validated_matches = client["match_reporter"].validated_matches
+    tables = {}
+    for job in await replay_jobs(client):
+        if only_missing and await civ_stats.find_one({"table": job.table}, {"_id": 1}):
+            continue
+        delta_value_name = "season_delta" if job.is_seasonal else "delta"
+        rollup = rollup_of([], delta_value_name)
+        async for doc in validated_matches.find(job.query()):
+            add_rollup(rollup, MatchModel(**doc), delta_value_name)
+        await civ_stats.delete_many({"table": job.table})
+        if rollup:
+            await civ_stats.insert_many(rollup_docs(job.table, rollup), ordered=False)
+        tables[job.table] = sum(counters.get("matches", 0) for counters in rollup.values())
+    logger.info(f"✅ 🔄 Backfilled civ stats of {sum(tables.values())} matches in {len(tables)} stat tables")
+    return tables
+
+async def unify_stats(client, only_missing: bool = False) -> Dict[str, int]:
+    """
+    Copy every stat collection, archived seasons included, into the unified
+    layout: one ``<game>_stats.ratings`` document per (discord_id, ledger).
+    Collections are streamed in batches of upserts, so a rerun picks up
+    documents changed since; stop approvals for the final run, then set
+    STAT_LAYOUT=unified. The collections are left in place.
+    """
+    if await ensure_indexes(client, unified_specs()):
+        raise RuntimeError("Could not create the unified stats indexes")
+    sources = list(stat_collections())
+    for game in STAT_GAMES:
+        archive = f"{game}_season_archive"
+        sources += [(archive, name) for name in sorted(await client[archive].list_collection_names()) if not name.endswith("__archiving")]
+    tables = {}
+    for database, collection in sources:
+        game = database.split("_", 1)[0]
+        table = LedgerTable(unified_collection(client, game), f"{database}.{collection}")
+        if only_missing and await table.find_one({}, {"_id": 1}):
+            continue
+        copied, batch = 0, []
+        async for doc in client[database][collection].find({}):
+            batch.append(ReplaceOne(table.scope({"_id": doc["_id"]}), table.to_storage(doc), upsert=True))
+            if len(batch) == UNIFY_BATCH_SIZE:
+                await table.bulk_write(batch, ordered=False)
+                copied, batch = copied + len(batch), []
+        if batch:
+            await table.bulk_write(batch, ordered=False)
+            copied += len(batch)
+        if copied:
+            tables[table.full_name] = copied
+    logger.info(f"✅ 🔄 Copied {sum(tables.values())} stat documents of {len(tables)} stat tables into the unified layout")
+    return tables
+
+MIGRATIONS = {
+    "skill": backfill_skill,
+    "head-to-head": backfill_head_to_head,
+    "civ-stats": backfill_civ_stats,
+    "unify-stats": unify_stats,
+}
+
+async def run(name: str, only_missing: bool = False) -> int:
+    """Entry point of ``python -m app migrate``; returns the exit status."""
+    client = AsyncIOMotorClient(settings.mongo_url.get_secret_value(), uuidRepresentation="standard")
+    try:
+        await MIGRATIONS[name](client, only_missing=only_missing)
+        return 0
+    finally:
+        client.close()
@@ -18,6 +18,15 @@ class StatModel(BaseModel):
     subbedOut: int
     civs: Optional[Dict[str, int]] = None
     lastModified: datetime = Field(default_factory=datetime.utcnow)
+    version: int = 0  # bumped on every rating write, used for compare-and-swap
+
+class RatingSnapshot(BaseModel):
+    """A player's rating in one stat table around an approved match, used to revert it."""
+    mu_before: float
+    sigma_before: float
+    mu_after: float
+    sigma_after: float
+    version: int  # version of the stat document this match wrote
 
 class PlayerModel(BaseModel):
     steam_id: Optional[str] = None
@@ -33,6 +42,8 @@ class PlayerModel(BaseModel):
     season_delta: Optional[float] = None
     is_sub: bool = False
     subbed_out: bool = False
+    rating: Optional[RatingSnapshot] = None
+    season_rating: Optional[RatingSnapshot] = None
 
 class MatchModel(BaseModel):
     game: str  # parsers return "civ6" or "civ7"
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import Dict, List, Literal, Optional
 from datetime import datetime
 
 class PlayerSchema(BaseModel):
@@ -51,6 +51,16 @@ class ChangeOrder(BaseModel):
 class DeletePendingMatch(BaseModel):
     match_id: str
 
+class TeamPlacementDeltas(BaseModel):
+    team: int
+    players: List[int] # indexes into the match's players
+    delta: List[List[int]] # [position][player], position 0 is first place
+    season_delta: List[List[int]]
+
+class PlacementDeltasResponse(BaseModel):
+    match_id: str
+    teams: List[TeamPlacementDeltas] # in current finishing order
+
 class TriggerQuit(BaseModel):
     match_id: str
     quitter_discord_id: str
@@ -77,15 +87,60 @@ class RemoveSub(BaseModel):
     sub_out_id: str
     discord_message_id: str
 
+class EditOperation(BaseModel):
+    op: Literal["change_order", "assign_discord_id", "assign_sub", "remove_sub", "trigger_quit"]
+    new_order: Optional[str] = None
+    player_id: Optional[str] = None
+    player_discord_id: Optional[str] = None
+    sub_in_id: Optional[str] = None
+    sub_out_discord_id: Optional[str] = None
+    sub_out_id: Optional[str] = None
+    quitter_discord_id: Optional[str] = None
+
+class EditMatch(BaseModel):
+    match_id: str
+    operations: List[EditOperation] # applied in order, ratings recomputed once
+    discord_message_id: str
+
 class ApproveMatch(BaseModel):
     match_id: str
     approver_discord_id: str
+
+class UnapproveMatch(BaseModel):
+    match_id: str  # ID of the validated match
+    approver_discord_id: str
+
+class ApproveMatchesFilter(BaseModel):
+    game: Optional[str] = None
+    game_mode: Optional[str] = None
+    is_cloud: Optional[bool] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+
+class ApproveMatches(BaseModel):
+    approver_discord_id: str
+    match_ids: Optional[List[str]] = None # takes precedence over filter
+    filter: Optional[ApproveMatchesFilter] = None
+
+class ApproveMatchResult(BaseModel):
+    match_id: str
+    status: Literal["approved", "not_found", "invalid_id", "error", "conflict"]
+    detail: Optional[str] = None
+    validated_match_id: Optional[str] = None
+    players: Optional[List[PlayerSchema]] = None
+
+class ApproveMatchesResponse(BaseModel):
+    results: List[ApproveMatchResult] # chronological, or in match_ids order
     
-class GetLeaderboardRequest(BaseModel):
+class StatTableRequest(BaseModel):
     game: str
     game_type: str
     game_mode: str
     is_seasonal: bool
+    season: Optional[int] = None # archived season number (seasonal stats only); the current season if omitted
+
+class GetLeaderboardRequest(StatTableRequest):
+    order: Literal["mu", "skill"] = "mu" # skill: conservative score from app/services/skill.py
 
 class PlayerLeaderboard(BaseModel):
     discord_id: str
@@ -93,6 +148,174 @@ class PlayerLeaderboard(BaseModel):
     games_played: int
     wins: int
     first: int
+    skill: Optional[int] = None
 
 class LeaderboardRankingResponse(BaseModel):
-    rankings: List[PlayerLeaderboard]
\ No newline at end of file
+    rankings: List[PlayerLeaderboard]
+
+class BrowseLeaderboardRequest(StatTableRequest):
+    page_size: int = Field(50, ge=1, le=100)
+    min_games: int = Field(3, ge=0)
+    active_since: Optional[datetime] = None # players with a rated game since then
+    civ: Optional[str] = None # civ/leader key as stored in civs, e.g. "MayaLadySixSky"
+    cursor: Optional[str] = None # next_cursor of the previous page
+
+class BrowseLeaderboardResponse(BaseModel):
+    rankings: List[PlayerLeaderboard]
+    next_cursor: Optional[str] = None # absent on the last page
+
+class GetPlayerRankRequest(StatTableRequest):
+    discord_id: str
+
+class PlayerRankResponse(BaseModel):
+    discord_id: str
+    rank: int
+    rating: int
+    games_played: int
+    ranked_players: int
+    percentile: float # share of ranked players rated below, 0-100
+
+class GetLeaderboardPageRequest(GetPlayerRankRequest):
+    radius: int = Field(5, ge=0, le=50) # players shown above and below
+
+class PlayerRank(BaseModel):
+    rank: int
+    discord_id: str
+    rating: int
+    games_played: int
+
+class LeaderboardPageResponse(BaseModel):
+    rankings: List[PlayerRank]
+    ranked_players: int
+
+class GetRatingHistogramRequest(StatTableRequest):
+    bucket_size: int = Field(50, ge=1)
+
+class RatingBucket(BaseModel):
+    min_rating: int
+    count: int
+
+class RatingHistogramResponse(BaseModel):
+    buckets: List[RatingBucket]
+    ranked_players: int
+
+class GetRatingHistoryRequest(StatTableRequest):
+    discord_id: str
+    since: Optional[datetime] = None
+    max_points: Optional[int] = Field(None, ge=2) # evenly downsampled, keeping the first and last points
+
+class RatingHistoryResponse(BaseModel):
+    discord_id: str
+    t: List[datetime] # approval times, oldest first
+    mu: List[float]
+    sigma: List[float]
+
+class GetHeadToHeadRequest(StatTableRequest):
+    discord_id: str
+    opponent_discord_id: str
+
+class HeadToHeadRecord(BaseModel):
+    discord_id: str # the opponent
+    games: int
+    wins: int # finished ahead of the opponent
+    losses: int
+    draws: int
+
+class HeadToHeadResponse(BaseModel):
+    discord_id: str
+    opponent: HeadToHeadRecord
+
+class GetRivalsRequest(StatTableRequest):
+    discord_id: str
+    limit: int = Field(10, ge=1, le=100)
+
+class RivalsResponse(BaseModel):
+    discord_id: str
+    rivals: List[HeadToHeadRecord] # most games together first
+
+class GetCivStatsRequest(StatTableRequest):
+    map_type: Optional[str] = None # every map type if omitted
+
+class CivStats(BaseModel):
+    civ: str
+    picks: int
+    pick_rate: float # picks per match
+    wins: int # positive delta in the stat table
+    win_rate: float
+    first: int
+    first_rate: float
+    mean_delta: float
+
+class CivStatsResponse(BaseModel):
+    matches: int
+    civs: List[CivStats] # most picked first
+
+class GetPlayerProfileRequest(BaseModel):
+    game: str
+    discord_id: str
+
+class ProfileRating(BaseModel):
+    table: str # stat table, e.g. civ6_lifetime_stats.rt_ffa or civ6_season_archive.s1_rt_ffa
+    rating: int
+    sigma: float
+    games_played: int
+    wins: int
+    first: int
+    skill: Optional[int] = None
+
+class PlayerProfileResponse(BaseModel):
+    discord_id: str
+    ratings: List[ProfileRating] # by table name
+
+class BalanceTeamsRequest(BaseModel):
+    game: str
+    game_type: str
+    game_mode: str
+    is_seasonal: bool
+    discord_ids: List[str]
+    teams: int = Field(2, ge=2)
+    limit: int = Field(5, ge=1, le=50)
+
+class Lineup(BaseModel):
+    teams: List[List[str]]
+    quality: float # TrueSkill draw probability, higher is fairer
+    team_mu: List[float]
+
+class BalanceTeamsResponse(BaseModel):
+    lineups: List[Lineup] # best first
+    exhaustive: bool # False when found by local search
+    evaluated: int
+
+class RolloverSeason(BaseModel):
+    approver_discord_id: str
+    name: Optional[str] = None # name of the season being started
+
+class SeasonResponse(BaseModel):
+    season: int
+    name: Optional[str] = None
+    started_at: Optional[datetime] = None
+    ended_at: Optional[datetime] = None # absent for the current season
+    tables: Optional[Dict[str, int]] = None # archived stat documents per seasonal table
+
+class SeasonsResponse(BaseModel):
+    seasons: List[SeasonResponse] # oldest first, the current season last
+
+class RolloverSeasonResponse(BaseModel):
+    archived: SeasonResponse
+    current: SeasonResponse
+
+class ConfirmPlacements(BaseModel):
+    match_id: str
+    teams: List[List[str]] # player ids per team
+    placements: List[int] # rank of each team, 1 = winner
+
+class RatingDelta(BaseModel):
+    deltaMu: float
+    deltaSigma: float
+
+class ConfirmPlacementsResponse(BaseModel):
+    matchId: str
+    ratingDeltas: Dict[str, RatingDelta] # by player id
+
+class ApproveEligibleMatchesResponse(BaseModel):
+    approved: int
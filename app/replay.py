@@ -0,0 +1,220 @@
+"""
+Rebuild stat tables by replaying ``validated_matches``.
+
+    python -m app replay [--table civ6_lifetime_stats.rt_ffa ...] [--workers N] [--dry-run]
+
+Every stat table is an independent ledger: the matches of one (game, mode,
+cloud) in ``approved_at`` order, rated with the same code as approvals
+(``MatchService.rate_into_ledger``: sub and quit rules, skill, civ counts).
+Tables are replayed in parallel worker processes. Each one streams its
+matches with a server-side cursor, keeps every player in memory, writes the
+result to ``<table>__replay`` with the registered indexes and swaps it in
+with an atomic rename. In the unified layout of app/services/stat_tables.py
+it writes the ledger ``<table>__replay`` and swaps it in ``SWAP_BATCH``
+players at a time, each batch in its own small transaction: readers see
+every player exactly once, some still with their old ratings until the
+swap finishes. The deltas and rating snapshots stored on the matches
+and the table's rating series and civ stats (app/services/rating_series.py,
+app/services/civ_stats.py) are rewritten to match.
+
+Approvals are held off for the whole replay (``StatWriteGate`` in
+app/services/leases.py, as for season rollover): it takes the stat-writes
+lease and waits for the approvals in flight before any match is read, and
+approvals arriving meanwhile fail with a conflict, so no approval is lost
+to the swap. Dry runs write nothing and leave approvals alone.
+
+Seasonal tables only count matches approved since the current season
+started (app/seasons.py, or SEASON_STARTED_AT before the first rollover)
+and are skipped when that is unknown.
+"""
+import asyncio
+import logging
+import multiprocessing
+import time
+from contextlib import AsyncExitStack
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from bson.int64 import Int64
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient, UpdateOne
+
+from app.config import settings
+from app.seasons import current_season_start
+from app.indexes import collection_specs
+from app.models.db_models import MatchModel
+from app.services.invalidation import invalidations
+from app.services.leases import STAT_TABLES_LEASE, STAT_WRITES_LEASE, LeaseManager, StatWriteGate
+from app.services.match_service import MatchService, SNAPSHOT_FIELDS
+from app.services.rating_ledger import RatingLedger
+from app.services.rating_series import Point, bucket_docs
+from app.services.civ_stats import Rollup, add_rollup, rollup_docs, rollup_of
+from app.services.stat_tables import LedgerTable
+
+logger = logging.getLogger(__name__)
+
+WRITE_BATCH = 10_000
+SWAP_BATCH = 1_000
+
+@dataclass(frozen=True)
+class ReplayJob:
+    game: str
+    game_mode: str
+    is_cloud: bool
+    is_seasonal: bool
+    since: Optional[datetime] = None
+
+    @property
+    def table(self) -> str:
+        database = f"{self.game}_{'season' if self.is_seasonal else 'lifetime'}_stats"
+        return f"{database}.{'pbc_' if self.is_cloud else 'rt_'}{self.game_mode}"
+
+    def query(self) -> Dict[str, Any]:
+        query: Dict[str, Any] = {"game": self.game, "game_mode": self.game_mode, "is_cloud": self.is_cloud}
+        if self.since is not None:
+            query["approved_at"] = {"$gte": self.since}
+        return query
+
+def _replay_matches(svc: MatchService, ledger: RatingLedger, cursor, delta_value_name: str, stats: Dict[str, Any],
+                    match_ops: List[UpdateOne], points: List[Point], civ_rollup: Rollup) -> None:
+    snapshot_field = SNAPSHOT_FIELDS[delta_value_name]
+    for doc in cursor:
+        match = MatchModel(**doc)
+        if svc.approval_problem(match):
+            stats["skipped"] += 1
+            continue
+        svc.rate_into_ledger(match, ledger, delta_value_name, modified_at=match.approved_at or match.created_at)
+        stats["matches"] += 1
+        # the match's deltas and snapshots must describe the rebuilt table, or unapprove_match would revert to stale ratings
+        changes = {}
+        for i, player in enumerate(match.players):
+            changes[f"players.{i}.{delta_value_name}"] = getattr(player, delta_value_name)
+            changes[f"players.{i}.{snapshot_field}"] = getattr(player, snapshot_field).dict()
+        match_ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": changes}))
+        points.extend(svc.series_points(match, doc["_id"], delta_value_name))
+        add_rollup(civ_rollup, match, delta_value_name)
+
+def _swap_ledger(client, target: LedgerTable, temp: LedgerTable, discord_ids: List[str]) -> None:
+    """Relabel ``temp``'s documents to ``target``'s ledger, replacing its players batch by batch."""
+    for start in range(0, len(discord_ids), SWAP_BATCH):
+        players = {"_id": {"$in": [Int64(d) for d in discord_ids[start:start + SWAP_BATCH]]}}
+        def swap(session):
+            target.delete_many(players, session=session)
+            temp.update_many(players, {"$set": {"ledger": target.full_name}}, session=session)
+        with client.start_session() as session:
+            session.with_transaction(swap)
+    # players the rebuilt ledger no longer has
+    kept = set(discord_ids)
+    stale = [doc["_id"] for doc in target.find({}, {"_id": 1}) if str(doc["_id"]) not in kept]
+    for start in range(0, len(stale), SWAP_BATCH):
+        target.delete_many({"_id": {"$in": stale[start:start + SWAP_BATCH]}})
+
+def replay_table(job: ReplayJob, mongo_url: str, dry_run: bool = False) -> Dict[str, Any]:
+    """Rebuild one stat table; runs in a worker process with its own client."""
+    started = time.monotonic()
+    client = MongoClient(mongo_url, uuidRepresentation="standard")
+    try:
+        svc = MatchService(client)
+        target = svc.get_stat_table(job.is_cloud, job.game_mode, job.game, job.is_seasonal)
+        ledger = RatingLedger(target)
+        delta_value_name = "season_delta" if job.is_seasonal else "delta"
+        order = [("approved_at", 1), ("_id", 1)]
+        stats: Dict[str, Any] = {"table": job.table, "matches": 0, "skipped": 0}
+        match_ops: List[UpdateOne] = []
+        points: List[Point] = []
+        civ_rollup = rollup_of([], delta_value_name)
+        cursor = svc.validated_matches.find(job.query(), sort=order, batch_size=2_000)
+        _replay_matches(svc, ledger, cursor, delta_value_name, stats, match_ops, points, civ_rollup)
+        stats["players"] = len(ledger.docs)
+        if dry_run:
+            stats["seconds"] = round(time.monotonic() - started, 2)
+            return stats
+
+        if isinstance(target, LedgerTable):
+            temp = LedgerTable(target.collection, f"{target.full_name}__replay")
+            temp.delete_many({})
+        else:
+            temp = target.database[f"{target.name}__replay"]
+            temp.drop()
+        docs = list(ledger.docs.values())
+        for start in range(0, len(docs), WRITE_BATCH):
+            temp.insert_many(docs[start:start + WRITE_BATCH], ordered=False)
+        specs = [] if isinstance(target, LedgerTable) else collection_specs(target.database.name, target.name)
+        if specs:
+            temp.create_indexes([spec.model() for spec in specs])
+        ledger.commit()
+
+        if isinstance(target, LedgerTable):
+            _swap_ledger(client, target, temp, list(ledger.docs))
+        else:
+            temp.rename(target.name, dropTarget=True)
+        for start in range(0, len(match_ops), WRITE_BATCH):
+            svc.validated_matches.bulk_write(match_ops[start:start + WRITE_BATCH], ordered=False)
+        series = client["match_reporter"].rating_series
+        series.delete_many({"table": job.table})
+        buckets = bucket_docs(job.table, points)
+        for start in range(0, len(buckets), WRITE_BATCH):
+            series.insert_many(buckets[start:start + WRITE_BATCH], ordered=False)
+        civ_stats = client["match_reporter"].civ_stats
+        civ_stats.delete_many({"table": job.table})
+        if civ_rollup:
+            civ_stats.insert_many(rollup_docs(job.table, civ_rollup), ordered=False)
+        stats["players"] = len(ledger.docs)
+        stats["seconds"] = round(time.monotonic() - started, 2)
+        return stats
+    finally:
+        client.close()
+
+async def replay_jobs(client) -> List[ReplayJob]:
+    """One job per (game, mode, cloud) present in validated_matches, for lifetime and (if configured) season tables."""
+    jobs = []
+    season_started_at = await current_season_start(client)
+    groups = client["match_reporter"].validated_matches.aggregate([
+        {"$group": {"_id": {"game": "$game", "game_mode": "$game_mode", "is_cloud": "$is_cloud"}}},
+    ])
+    async for group in groups:
+        key = group["_id"]
+        if not key.get("game") or not key.get("game_mode"):
+            continue
+        jobs.append(ReplayJob(key["game"], key["game_mode"], bool(key["is_cloud"]), is_seasonal=False))
+        if season_started_at is not None:
+            jobs.append(ReplayJob(key["game"], key["game_mode"], bool(key["is_cloud"]), is_seasonal=True, since=season_started_at))
+    if season_started_at is None:
+        logger.warning("⚠️ Start of the current season unknown (no rollover yet and SEASON_STARTED_AT unset), seasonal tables are not replayed")
+    return sorted(jobs, key=lambda job: job.table)
+
+async def replay(client, mongo_url: str, tables: List[str] = None, workers: int = None, dry_run: bool = False) -> List[Dict[str, Any]]:
+    jobs = [job for job in await replay_jobs(client) if not tables or job.table in tables]
+    results = []
+    leases = LeaseManager(client)
+    async with AsyncExitStack() as stack:
+        await stack.enter_async_context(leases.hold(STAT_TABLES_LEASE, settings.lease_ttl_seconds))
+        if not dry_run:
+            # approvals wait until the rebuilt tables are swapped in, or the swap would drop their writes
+            await stack.enter_async_context(leases.hold(STAT_WRITES_LEASE, settings.lease_ttl_seconds))
+            await StatWriteGate(client).drain(settings.lease_ttl_seconds)
+        loop = asyncio.get_running_loop()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [loop.run_in_executor(pool, replay_table, job, mongo_url, dry_run) for job in jobs]
+            for future in asyncio.as_completed(futures):
+                stats = await future
+                results.append(stats)
+                logger.info(f"✅ 🔄 Replayed {stats['table']}: {stats['matches']} matches, {stats['players']} players in {stats['seconds']}s")
+        if not dry_run and results:
+            # running workers drop their in-memory leaderboards and previews
+            await invalidations.publish(client, [stats["table"] for stats in results])
+    return results
+
+async def run(tables: List[str] = None, workers: int = None, dry_run: bool = False) -> int:
+    """Entry point of ``python -m app replay``; returns the exit status."""
+    mongo_url = settings.mongo_url.get_secret_value()
+    client = AsyncIOMotorClient(mongo_url, uuidRepresentation="standard")
+    try:
+        results = await replay(client, mongo_url, tables=tables, workers=workers, dry_run=dry_run)
+        for stats in sorted(results, key=lambda s: s["table"]):
+            print(f"{stats['table']}: {stats['matches']} matches ({stats['skipped']} skipped), {stats['players']} players, {stats['seconds']}s")
+        return 0
+    finally:
+        client.close()
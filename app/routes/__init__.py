@@ -1,7 +1,9 @@
 from fastapi import APIRouter
 from app.routes.upload import router as upload_router
 from app.routes.matches import router as matches_router
+from app.routes.ratings import router as ratings_router
 
 router = APIRouter()
 router.include_router(upload_router)
-router.include_router(matches_router)
\ No newline at end of file
+router.include_router(matches_router)
+router.include_router(ratings_router)
\ No newline at end of file
@@ -1,8 +1,9 @@
 import logging
-from fastapi import APIRouter, Depends, HTTPException, Form
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Form, Header, Response
 from app.dependencies import get_database
-from app.models.schemas import MatchResponse, MatchUpdate, ChangeOrder, DeletePendingMatch, TriggerQuit, AppendDiscordMessageID, AssignDiscordId, AssignSub, RemoveSub, ApproveMatch, GetLeaderboardRequest, LeaderboardRankingResponse
-from app.services.match_service import MatchService, InvalidIDError, NotFoundError, MatchServiceError
+from app.models.schemas import MatchResponse, MatchUpdate, PlacementDeltasResponse, ChangeOrder, DeletePendingMatch, TriggerQuit, AppendDiscordMessageID, AssignDiscordId, AssignSub, RemoveSub, EditMatch, ApproveMatch, UnapproveMatch, ApproveMatches, ApproveMatchesResponse, GetLeaderboardRequest, LeaderboardRankingResponse, BrowseLeaderboardRequest, BrowseLeaderboardResponse, GetPlayerRankRequest, PlayerRankResponse, GetLeaderboardPageRequest, LeaderboardPageResponse, GetRatingHistogramRequest, RatingHistogramResponse, GetRatingHistoryRequest, RatingHistoryResponse, BalanceTeamsRequest, BalanceTeamsResponse, GetHeadToHeadRequest, HeadToHeadResponse, GetRivalsRequest, RivalsResponse, GetCivStatsRequest, CivStatsResponse, GetPlayerProfileRequest, PlayerProfileResponse, RolloverSeason, RolloverSeasonResponse, SeasonsResponse
+from app.services.match_service import MatchService, InvalidIDError, NotFoundError, ConflictError, MatchServiceError
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/v1", tags=["matches"])
@@ -70,6 +71,21 @@ async def change_order(payload: ChangeOrder = Form(), db = Depends(get_database)
         logger.warning(f"⚠️ Update error: {e}")
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.put("/get-placement-deltas/", response_model=PlacementDeltasResponse)
+async def get_placement_deltas(match_id: str = Form(), db = Depends(get_database)):
+    svc = MatchService(db)
+    try:
+        return await svc.get_placement_deltas(match_id)
+    except InvalidIDError:
+        logger.error(f"🔴 Invalid match ID: {match_id}")
+        raise HTTPException(status_code=400, detail="Invalid match ID")
+    except NotFoundError:
+        logger.warning(f"🔴 Match not found: {match_id}")
+        raise HTTPException(status_code=404, detail="Match not found")
+    except MatchServiceError as e:
+        logger.warning(f"⚠️ Placement deltas error: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.put("/delete-pending-match/", response_model=MatchResponse)
 async def delete_pending_match(payload: DeletePendingMatch = Form(), db = Depends(get_database)):
     svc = MatchService(db)
@@ -160,6 +176,27 @@ async def remove_sub(payload: RemoveSub = Form(), db = Depends(get_database)):
         logger.warning(f"⚠️ Update error: {e}")
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.put("/edit-match/", response_model=MatchResponse)
+async def edit_match(payload: EditMatch, db = Depends(get_database)):
+    svc = MatchService(db)
+    match_id = payload.match_id
+    operations = [op.dict(exclude_none=True) for op in payload.operations]
+    discord_message_id = payload.discord_message_id
+    try:
+        return await svc.edit_match(match_id, operations, discord_message_id)
+    except InvalidIDError:
+        logger.error(f"🔴 Invalid match ID: {match_id}")
+        raise HTTPException(status_code=400, detail="Invalid match ID")
+    except NotFoundError:
+        logger.warning(f"🔴 Match not found. matchID: {match_id}")
+        raise HTTPException(status_code=404, detail="Match not found")
+    except ConflictError as e:
+        logger.warning(f"⚠️ Edit conflict: {e}")
+        raise HTTPException(status_code=409, detail=str(e))
+    except MatchServiceError as e:
+        logger.warning(f"⚠️ Update error: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.put("/approve-match/", response_model=MatchResponse)
 async def approve_match(payload: ApproveMatch = Form(), db = Depends(get_database)):
     svc = MatchService(db)
@@ -167,25 +204,185 @@ async def approve_match(payload: ApproveMatch = Form(), db = Depends(get_databas
     approver_discord_id = payload.approver_discord_id
     try:
         return await svc.approve_match(match_id, approver_discord_id)
+    except InvalidIDError:
+        logger.error(f"🔴 Invalid match ID: {match_id}")
+        raise HTTPException(status_code=400, detail="Invalid match ID")
     except NotFoundError:
         logger.warning(f"🔴 Match not found. matchID: {match_id}")
         raise HTTPException(status_code=404, detail="Match not found")
+    except ConflictError as e:
+        logger.warning(f"⚠️ Approval conflict: {e}")
+        raise HTTPException(status_code=409, detail=str(e))
     except MatchServiceError as e:
         logger.warning(f"⚠️ Update error: {e}")
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.put("/approve-matches/", response_model=ApproveMatchesResponse)
+async def approve_matches(payload: ApproveMatches, db = Depends(get_database)):
+    if payload.match_ids is None and payload.filter is None:
+        raise HTTPException(status_code=400, detail="Either match_ids or filter is required")
+    svc = MatchService(db)
+    filters = payload.filter.dict(exclude_none=True) if payload.filter else None
+    return await svc.approve_matches(payload.approver_discord_id, match_ids=payload.match_ids, filters=filters)
+
+@router.put("/unapprove-match/", response_model=MatchResponse)
+async def unapprove_match(payload: UnapproveMatch = Form(), db = Depends(get_database)):
+    svc = MatchService(db)
+    match_id = payload.match_id
+    try:
+        return await svc.unapprove_match(match_id, payload.approver_discord_id)
+    except InvalidIDError:
+        logger.error(f"🔴 Invalid match ID: {match_id}")
+        raise HTTPException(status_code=400, detail="Invalid match ID")
+    except NotFoundError:
+        logger.warning(f"🔴 Validated match not found. matchID: {match_id}")
+        raise HTTPException(status_code=404, detail="Match not found")
+    except ConflictError as e:
+        logger.warning(f"⚠️ Unapproval conflict: {e}")
+        raise HTTPException(status_code=409, detail=str(e))
+    except MatchServiceError as e:
+        logger.warning(f"⚠️ Unapproval error: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.put("/get-leaderboard-ranking/", response_model=LeaderboardRankingResponse)
-async def get_leaderboard_ranking(payload: GetLeaderboardRequest = Form(), db = Depends(get_database)):
+async def get_leaderboard_ranking(response: Response, payload: GetLeaderboardRequest = Form(), if_none_match: Optional[str] = Header(None), db = Depends(get_database)):
     svc = MatchService(db)
     game = payload.game
     game_type = payload.game_type
     game_mode = payload.game_mode
     is_seasonal = payload.is_seasonal
     try:
-        return await svc.get_leaderboard(game_type, game, game_mode, is_seasonal)
+        leaderboard = await svc.get_leaderboard(game_type, game, game_mode, is_seasonal, payload.order, season=payload.season)
+        etag = leaderboard.pop("etag")
+        if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+        return leaderboard
     except NotFoundError:
         logger.warning(f"🔴 Invalid game type for leaderboard. game:{game} game_mode:{game_mode}")
         raise HTTPException(status_code=404, detail="Match not found")
     except MatchServiceError as e:
         logger.warning(f"⚠️ Update error: {e}")
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.put("/browse-leaderboard/", response_model=BrowseLeaderboardResponse)
+async def browse_leaderboard(payload: BrowseLeaderboardRequest = Form(), db = Depends(get_database)):
+    svc = MatchService(db)
+    try:
+        return await svc.browse_leaderboard(
+            payload.game_type, payload.game, payload.game_mode, payload.is_seasonal, payload.page_size,
+            payload.min_games, active_since=payload.active_since, civ=payload.civ, cursor=payload.cursor, season=payload.season,
+        )
+    except MatchServiceError as e:
+        logger.warning(f"⚠️ Leaderboard browse error: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.put("/get-player-rank/", response_model=PlayerRankResponse)
+async def get_player_rank(payload: GetPlayerRankRequest = Form(), db = Depends(get_database)):
+    svc = MatchService(db)
+    try:
+        return await svc.get_player_rank(payload.game_type, payload.game, payload.game_mode, payload.is_seasonal, payload.discord_id, season=payload.season)
+    except InvalidIDError:
+        logger.error(f"🔴 Invalid discord ID: {payload.discord_id}")
+        raise HTTPException(status_code=400, detail="Invalid discord ID")
+    except NotFoundError:
+        logger.warning(f"🔴 Player not ranked. discordID: {payload.discord_id} game:{payload.game} game_mode:{payload.game_mode}")
+        raise HTTPException(status_code=404, detail="Player not ranked")
+    except MatchServiceError as e:
+        logger.warning(f"⚠️ Rating lookup error: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.put("/get-leaderboard-page/", response_model=LeaderboardPageResponse)
+async def get_leaderboard_page(payload: GetLeaderboardPageRequest = Form(), db = Depends(get_database)):
+    svc = MatchService(db)
+    try:
+        return await svc.get_leaderboard_page(payload.game_type, payload.game, payload.game_mode, payload.is_seasonal, payload.discord_id, payload.radius, season=payload.season)
+    except InvalidIDError:
+        logger.error(f"🔴 Invalid discord ID: {payload.discord_id}")
+        raise HTTPException(status_code=400, detail="Invalid discord ID")
+    except NotFoundError:
+        logger.warning(f"🔴 Player not ranked. discordID: {payload.discord_id} game:{payload.game} game_mode:{payload.game_mode}")
+        raise HTTPException(status_code=404, detail="Player not ranked")
+    except MatchServiceError as e:
+        logger.warning(f"⚠️ Rating lookup error: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.put("/get-rating-histogram/", response_model=RatingHistogramResponse)
+async def get_rating_histogram(payload: GetRatingHistogramRequest = Form(), db = Depends(get_database)):
+    svc = MatchService(db)
+    try:
+        return await svc.get_rating_histogram(payload.game_type, payload.game, payload.game_mode, payload.is_seasonal, payload.bucket_size, season=payload.season)
+    except MatchServiceError as e:
+        logger.warning(f"⚠️ Rating lookup error: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.put("/get-rating-history/", response_model=RatingHistoryResponse)
+async def get_rating_history(payload: GetRatingHistoryRequest = Form(), db = Depends(get_database)):
+    svc = MatchService(db)
+    try:
+        return await svc.get_rating_series(payload.game_type, payload.game, payload.game_mode, payload.is_seasonal, payload.discord_id,
+                                           since=payload.since, max_points=payload.max_points, season=payload.season)
+    except MatchServiceError as e:
+        logger.warning(f"⚠️ Rating lookup error: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.put("/get-head-to-head/", response_model=HeadToHeadResponse)
+async def get_head_to_head(payload: GetHeadToHeadRequest = Form(), db = Depends(get_database)):
+    svc = MatchService(db)
+    try:
+        return await svc.get_head_to_head(payload.game_type, payload.game, payload.game_mode, payload.is_seasonal, payload.discord_id,
+                                          payload.opponent_discord_id, season=payload.season)
+    except MatchServiceError as e:
+        logger.warning(f"⚠️ Head-to-head lookup error: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.put("/get-rivals/", response_model=RivalsResponse)
+async def get_rivals(payload: GetRivalsRequest = Form(), db = Depends(get_database)):
+    svc = MatchService(db)
+    try:
+        return await svc.get_rivals(payload.game_type, payload.game, payload.game_mode, payload.is_seasonal, payload.discord_id,
+                                    payload.limit, season=payload.season)
+    except MatchServiceError as e:
+        logger.warning(f"⚠️ Head-to-head lookup error: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.put("/get-civ-stats/", response_model=CivStatsResponse)
+async def get_civ_stats(payload: GetCivStatsRequest = Form(), db = Depends(get_database)):
+    svc = MatchService(db)
+    try:
+        return await svc.get_civ_stats(payload.game_type, payload.game, payload.game_mode, payload.is_seasonal, map_type=payload.map_type, season=payload.season)
+    except MatchServiceError as e:
+        logger.warning(f"⚠️ Civ stats lookup error: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.put("/get-player-profile/", response_model=PlayerProfileResponse)
+async def get_player_profile(payload: GetPlayerProfileRequest = Form(), db = Depends(get_database)):
+    svc = MatchService(db)
+    try:
+        return await svc.get_player_profile(payload.game, payload.discord_id)
+    except MatchServiceError as e:
+        logger.warning(f"⚠️ Player profile lookup error: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.put("/balance-teams/", response_model=BalanceTeamsResponse)
+async def balance_teams(payload: BalanceTeamsRequest, db = Depends(get_database)):
+    svc = MatchService(db)
+    try:
+        return await svc.balance_teams(payload.game_type, payload.game, payload.game_mode, payload.is_seasonal, payload.discord_ids, payload.teams, limit=payload.limit)
+    except MatchServiceError as e:
+        logger.warning(f"⚠️ Team balance error: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.put("/get-seasons/", response_model=SeasonsResponse)
+async def get_seasons(db = Depends(get_database)):
+    svc = MatchService(db)
+    return await svc.get_seasons()
+
+@router.put("/rollover-season/", response_model=RolloverSeasonResponse)
+async def rollover_season(payload: RolloverSeason = Form(), db = Depends(get_database)):
+    svc = MatchService(db)
+    try:
+        return await svc.rollover_season(payload.approver_discord_id, name=payload.name)
+    except ConflictError as e:
+        logger.warning(f"⚠️ Season rollover conflict: {e}")
+        raise HTTPException(status_code=409, detail=str(e))
@@ -0,0 +1,36 @@
+import logging
+from fastapi import APIRouter, Depends, HTTPException
+from app.config import settings
+from app.dependencies import get_database
+from app.models.schemas import ConfirmPlacements, ConfirmPlacementsResponse, ApproveEligibleMatchesResponse
+from app.services.auto_approval import AUTO_APPROVAL_LEASE, auto_approval
+from app.services.leases import LeaseManager, LeaseUnavailableError
+from app.services.rating_service import TrueSkillService, RatingServiceError, MatchNotFoundError
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/api/v1", tags=["ratings"])
+
+@router.put("/confirm-placements/", response_model=ConfirmPlacementsResponse)
+async def confirm_placements(payload: ConfirmPlacements, db = Depends(get_database)):
+    svc = TrueSkillService(db)
+    try:
+        return await svc.confirm_placements_and_rate(payload.match_id, payload.teams, payload.placements)
+    except MatchNotFoundError:
+        logger.warning(f"🔴 Match not found. matchID: {payload.match_id}")
+        raise HTTPException(status_code=404, detail="Match not found")
+    except RatingServiceError as e:
+        logger.warning(f"⚠️ Placement confirmation error: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.put("/approve-eligible-matches/", response_model=ApproveEligibleMatchesResponse)
+async def approve_eligible_matches(db = Depends(get_database)):
+    # on demand; the auto-approval scheduler (app/services/auto_approval.py) does the same periodically,
+    # under the same lease so the two never approve at once
+    try:
+        async with LeaseManager(db).hold(AUTO_APPROVAL_LEASE, settings.lease_ttl_seconds) as lease:
+            approved = await auto_approval.run_once(db, lease)
+    except LeaseUnavailableError:
+        logger.warning("⚠️ Auto-approval already running")
+        raise HTTPException(status_code=409, detail="Auto-approval already running, try again")
+    logger.info(f"✅ 🔄 Approved {approved} matches past their 48h hold")
+    return {"approved": approved}
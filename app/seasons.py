@@ -0,0 +1,143 @@
+"""
+Seasons: metadata in ``match_reporter.seasons`` and the rollover job.
+
+    python -m app season list
+    python -m app season rollover [--name NAME]
+
+A season is ``{_id: number, name, started_at, ended_at, tables}``; the one
+without ``ended_at`` is current. Rolling over archives every seasonal stat
+table of the current season and starts the next one with empty tables:
+
+1. the live table is renamed to ``<table>__archiving`` (same database, so
+   metadata only and atomic); approvals from then on write into a new,
+   empty live table that gets the registered indexes,
+2. ``$out`` copies the frozen table server side to
+   ``<game>_season_archive.s<number>_<table>``, which gets the same indexes
+   so archived leaderboards are served like live ones,
+3. the frozen table is dropped.
+
+In the unified stats layout (app/services/stat_tables.py) the documents of
+the live ledger are re-keyed to the archived ledger's name instead, with
+one update_many; running an interrupted rollover again re-keys the rest.
+
+Approvals are kept out of the rollover (``StatWriteGate`` in
+app/services/leases.py): it takes the stat-writes lease, waits for the
+approvals in flight to finish and refuses to start if they do not within
+LEASE_TTL_SECONDS; approvals arriving meanwhile fail with a conflict. No
+approval can read a rating from the old season and write it into the new
+one.
+"""
+import json
+import logging
+from datetime import datetime, UTC
+from typing import Any, Dict, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.config import settings
+from app.indexes import collection_specs, stat_collections
+from app.services.invalidation import invalidations
+from app.services.leases import STAT_WRITES_LEASE, STAT_TABLES_LEASE, LeaseManager, StatWriteGate
+from app.services.stat_tables import stat_table
+
+logger = logging.getLogger(__name__)
+
+def _seasons(client):
+    return client["match_reporter"].seasons
+
+def archive_table(client, database: str, season: int, collection: str):
+    """Archived copy of ``database.collection`` (a ``<game>_season_stats`` table) for ``season``."""
+    game = database.split("_", 1)[0]
+    return client[f"{game}_season_archive"][f"s{season}_{collection}"]
+
+async def current_season(client) -> Dict[str, Any]:
+    """The current season; before the first rollover, season 1 starting at SEASON_STARTED_AT."""
+    doc = await _seasons(client).find_one({"ended_at": None}, sort=[("_id", -1)])
+    if doc is not None:
+        return doc
+    last = await _seasons(client).find_one({}, sort=[("_id", -1)])
+    return {"_id": (last["_id"] + 1) if last else 1, "name": None, "started_at": settings.season_started_at, "ended_at": None}
+
+async def current_season_start(client) -> Optional[datetime]:
+    return (await current_season(client)).get("started_at")
+
+async def list_seasons(client) -> List[Dict[str, Any]]:
+    seasons = await _seasons(client).find({}).sort([("_id", 1)]).to_list(length=None)
+    if not seasons or seasons[-1].get("ended_at") is not None:
+        seasons.append(await current_season(client))
+    return seasons
+
+async def _archive(client, database: str, collection: str, season: int) -> Optional[int]:
+    """Move one live table into the archive of ``season``; returns its document count, or None if it never existed."""
+    archive = archive_table(client, database, season, collection)
+    if settings.stat_layout == "unified":
+        # the documents move to the archived ledger in place. No transaction: approvals are
+        # held off by the StatWriteGate, and a rollover interrupted here is finished by
+        # running it again, so the count is taken from the archived ledger
+        archived = stat_table(client, archive.database.name, archive.name)
+        await stat_table(client, database, collection).update_many({}, {"$set": {"ledger": archived.full_name}})
+        count = await archived.count_documents({}) or None
+    else:
+        count = await _archive_collection(client, database, collection, archive)
+    if count is None:
+        return None
+    # the season's rating series, head-to-head records and civ stats now belong to the archived table
+    for derived in ("rating_series", "head_to_head", "civ_stats"):
+        await client["match_reporter"][derived].update_many(
+            {"table": f"{database}.{collection}"}, {"$set": {"table": f"{archive.database.name}.{archive.name}"}},
+        )
+    return count
+
+async def _archive_collection(client, database: str, collection: str, archive) -> Optional[int]:
+    db = client[database]
+    frozen = f"{collection}__archiving"
+    names = await db.list_collection_names()
+    if frozen in names:
+        raise RuntimeError(f"{database}.{frozen} is left over from an interrupted rollover; archive or drop it first")
+    specs = [spec.model() for spec in collection_specs(database, collection)]
+    if collection not in names:
+        await db[collection].create_indexes(specs)
+        return None
+    await db[collection].rename(frozen)
+    await db[collection].create_indexes(specs)
+    await db[frozen].aggregate([{"$out": {"db": archive.database.name, "coll": archive.name}}]).to_list(length=None)
+    await archive.create_indexes(specs)
+    count = await archive.estimated_document_count()
+    await db[frozen].drop()
+    return count
+
+async def rollover(client, name: Optional[str] = None) -> Dict[str, Any]:
+    """Archive the current season's stat tables and start the next season; returns both seasons."""
+    leases = LeaseManager(client)
+    async with leases.hold(STAT_TABLES_LEASE, settings.lease_ttl_seconds), leases.hold(STAT_WRITES_LEASE, settings.lease_ttl_seconds):
+        await StatWriteGate(client).drain(settings.lease_ttl_seconds)
+        season = await current_season(client)
+        number = season["_id"]
+        ended_at = datetime.now(UTC)
+        tables = {}
+        for database, collection in stat_collections():
+            if not database.endswith("_season_stats"):
+                continue
+            count = await _archive(client, database, collection, number)
+            if count is not None:
+                tables[f"{database}.{collection}"] = count
+        archived = {**season, "ended_at": ended_at, "tables": tables}
+        await _seasons(client).replace_one({"_id": number}, archived, upsert=True)
+        current = {"_id": number + 1, "name": name, "started_at": ended_at, "ended_at": None}
+        await _seasons(client).insert_one(current)
+        # other workers drop their in-memory boards of the live tables
+        await invalidations.publish(client, [f"{database}.{collection}" for database, collection in stat_collections() if database.endswith("_season_stats")])
+    logger.info(f"✅ 🗓️ Season {number} archived ({sum(tables.values())} stat documents in {len(tables)} tables), season {number + 1} started")
+    return {"archived": archived, "current": current}
+
+async def run(action: str, name: Optional[str] = None) -> int:
+    """Entry point of ``python -m app season``; returns the exit status."""
+    client = AsyncIOMotorClient(settings.mongo_url.get_secret_value(), uuidRepresentation="standard")
+    try:
+        if action == "rollover":
+            print(json.dumps(await rollover(client, name=name), indent=2, default=str))
+        else:
+            print(json.dumps(await list_seasons(client), indent=2, default=str))
+        return 0
+    finally:
+        client.close()
@@ -0,0 +1,91 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, UTC
+from typing import Any, Dict, Optional
+
+from app.config import settings
+from app.metrics import metrics
+from app.services.leases import Lease, LeaseManager, LeaseUnavailableError
+from app.services.rating_service import TrueSkillService
+
+logger = logging.getLogger(__name__)
+
+AUTO_APPROVAL_LEASE = "auto-approval"
+
+class AutoApprovalScheduler:
+    """
+    Periodically approves confirmed matches whose hold has passed
+    (``TrueSkillService.approve_eligible_matches``).
+
+    Every worker runs the loop, but each tick is guarded by a lease so only
+    one of them approves at a time; the others skip the tick. A tick drains
+    the backlog in batches of ``AUTO_APPROVE_BATCH_SIZE``, oldest first.
+    ``lag_seconds`` is how long the oldest eligible match had been waiting
+    past its hold when the tick started. If the lease is lost mid-tick (its
+    renewal failed), the tick stops after the current batch so it does not
+    approve alongside the worker that took the lease over.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._stats: Dict[str, Any] = {
+            "ticks": 0, "led": 0, "approved": 0, "batches": 0, "errors": 0,
+            "lag_seconds": None, "last_run_at": None, "last_approved": 0,
+        }
+
+    async def run_once(self, db, lease: Optional[Lease] = None) -> int:
+        """Approve every eligible match, or until ``lease`` is lost; returns how many."""
+        svc = TrueSkillService(db)
+        oldest = await svc.oldest_eligible()
+        now = datetime.now(UTC).replace(tzinfo=None)
+        due = oldest + timedelta(hours=settings.auto_approve_hold_hours) if oldest else None
+        self._stats["lag_seconds"] = round((now - due).total_seconds(), 3) if due else 0.0
+        approved = 0
+        while True:
+            batch = await svc.approve_eligible_matches(limit=settings.auto_approve_batch_size)
+            approved += batch
+            self._stats["approved"] += batch
+            self._stats["batches"] += 1
+            if batch < settings.auto_approve_batch_size:
+                break
+            if lease and lease.lost:
+                logger.warning(f"🟠 Lost lease {lease.name}, stopping auto-approval after {approved} matches")
+                break
+        self._stats["last_run_at"] = datetime.now(UTC).isoformat()
+        self._stats["last_approved"] = approved
+        if approved:
+            logger.info(f"✅ 🔄 Auto-approved {approved} matches (lag {self._stats['lag_seconds']}s)")
+        return approved
+
+    async def _run(self, db, interval_seconds: float) -> None:
+        leases = LeaseManager(db)
+        while True:
+            await asyncio.sleep(interval_seconds)
+            self._stats["ticks"] += 1
+            try:
+                async with leases.hold(AUTO_APPROVAL_LEASE, settings.lease_ttl_seconds) as lease:
+                    self._stats["led"] += 1
+                    await self.run_once(db, lease)
+            except LeaseUnavailableError:
+                # another worker is approving
+                pass
+            except Exception:
+                self._stats["errors"] += 1
+                logger.exception("⚠️ Auto-approval failed")
+
+    async def start(self, db, interval_seconds: float) -> None:
+        if interval_seconds <= 0:
+            logger.info("🟠 Auto-approval scheduler disabled")
+            return
+        self._task = asyncio.create_task(self._run(db, interval_seconds))
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "running": self._task is not None}
+
+auto_approval = AutoApprovalScheduler()
+metrics.register("auto_approval", auto_approval.stats)
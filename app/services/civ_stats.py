@@ -0,0 +1,95 @@
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from app.utils import get_cpl_name
+
+# (map_type, civ) -> counters; civ None holds the number of matches of the map type
+Rollup = Dict[Tuple[str, Optional[str]], Dict[str, float]]
+
+def add_rollup(rollup: Rollup, match, delta_value_name: str, sign: int = 1) -> None:
+    """
+    Count one match into ``rollup``. Every civ slot counts once: a
+    subbed-out player shares the slot of the sub who finished it. Wins use
+    the stat tables' rule, a positive delta in the ledger.
+    """
+    rollup[(match.map_type, None)]["matches"] += sign
+    for player in match.players:
+        if not player.civ or player.subbed_out:
+            continue
+        counters = rollup[(match.map_type, get_cpl_name(match.game, player.civ, player.leader))]
+        delta = getattr(player, delta_value_name) or 0
+        counters["picks"] += sign
+        counters["wins"] += sign * (delta > 0)
+        counters["first"] += sign * (player.placement == 0)
+        counters["delta_sum"] += sign * delta
+
+def rollup_of(matches: Iterable[Any], delta_value_name: str, sign: int = 1) -> Rollup:
+    rollup: Rollup = defaultdict(lambda: defaultdict(int))
+    for match in matches:
+        add_rollup(rollup, match, delta_value_name, sign)
+    return rollup
+
+def merge_rollups(*rollups: Rollup) -> Rollup:
+    merged: Rollup = defaultdict(lambda: defaultdict(int))
+    for rollup in rollups:
+        for key, counters in rollup.items():
+            for field, value in counters.items():
+                merged[key][field] += value
+    return merged
+
+def rollup_docs(table: str, rollup: Rollup) -> List[Dict[str, Any]]:
+    return [{"table": table, "map_type": map_type, "civ": civ, **counters} for (map_type, civ), counters in rollup.items()]
+
+class CivStats:
+    """
+    Civ/leader rollups per stat table and map type in ``match_reporter.civ_stats``.
+
+    One document per (table, map_type, civ) counts picks, wins, first places
+    and the sum of deltas; the document with ``civ: None`` counts matches.
+    Approvals ``$inc`` them, so a table's pick and win rates are one indexed
+    read. ``python -m app migrate civ-stats`` and replay rebuild them.
+    """
+
+    def __init__(self, db):
+        self.collection = db["match_reporter"].civ_stats
+
+    async def record(self, table: str, rollup: Rollup) -> None:
+        ops = [
+            UpdateOne({"table": table, "map_type": map_type, "civ": civ}, {"$inc": dict(counters)}, upsert=True)
+            for (map_type, civ), counters in rollup.items()
+            if any(counters.values())
+        ]
+        if ops:
+            await self.collection.bulk_write(ops, ordered=False)
+
+    async def summary(self, table: str, map_type: Optional[str] = None) -> Dict[str, Any]:
+        """Pick, win and first-place rates per civ, over every map type unless ``map_type`` is given."""
+        query: Dict[str, Any] = {"table": table}
+        if map_type is not None:
+            query["map_type"] = map_type
+        matches = 0
+        civs: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(int))
+        async for doc in self.collection.find(query):
+            if doc["civ"] is None:
+                matches += doc.get("matches", 0)
+                continue
+            for field in ("picks", "wins", "first", "delta_sum"):
+                civs[doc["civ"]][field] += doc.get(field, 0)
+        rows = [
+            {
+                "civ": civ,
+                "picks": c["picks"],
+                "pick_rate": c["picks"] / matches if matches else 0.0,
+                "wins": c["wins"],
+                "win_rate": c["wins"] / c["picks"],
+                "first": c["first"],
+                "first_rate": c["first"] / c["picks"],
+                "mean_delta": c["delta_sum"] / c["picks"],
+            }
+            for civ, c in civs.items()
+            if c["picks"] > 0
+        ]
+        rows.sort(key=lambda row: (-row["picks"], row["civ"]))
+        return {"matches": matches, "civs": rows}
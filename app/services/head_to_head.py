@@ -0,0 +1,99 @@
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bson.int64 import Int64
+from pymongo import UpdateOne
+
+def counted_players(match) -> List[Any]:
+    # subbed-out players did not finish the game they are listed in; unplaced players have no result
+    return [p for p in match.players if p.discord_id != None and p.placement is not None and not p.subbed_out]
+
+def pair_results(matches: Iterable[Any]) -> Dict[Tuple[str, str], List[int]]:
+    """``(a, b) -> [games, wins, losses]`` of a against b, both directions, for players on different teams."""
+    results: Dict[Tuple[str, str], List[int]] = defaultdict(lambda: [0, 0, 0])
+    for match in matches:
+        players = counted_players(match)
+        for a in players:
+            for b in players:
+                if a.team == b.team or a.discord_id == b.discord_id:
+                    continue
+                counts = results[(a.discord_id, b.discord_id)]
+                counts[0] += 1
+                counts[1] += a.placement < b.placement
+                counts[2] += a.placement > b.placement
+    return results
+
+def backfill_pipeline(table: str, query: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Aggregation over ``validated_matches`` rebuilding the records of ``table`` server side, same rules as ``pair_results``."""
+    return [
+        {"$match": query},
+        {"$project": {"_id": 0, "players": {"$filter": {
+            "input": "$players",
+            "as": "p",
+            "cond": {"$and": [
+                {"$ne": ["$$p.discord_id", None]},
+                {"$ne": [{"$ifNull": ["$$p.placement", None]}, None]},
+                {"$ne": ["$$p.subbed_out", True]},
+            ]},
+        }}}},
+        {"$project": {"a": "$players", "b": "$players"}},
+        {"$unwind": "$a"},
+        {"$unwind": "$b"},
+        {"$match": {"$expr": {"$and": [{"$ne": ["$a.team", "$b.team"]}, {"$ne": ["$a.discord_id", "$b.discord_id"]}]}}},
+        {"$group": {
+            "_id": {"a": "$a.discord_id", "b": "$b.discord_id"},
+            "games": {"$sum": 1},
+            "wins": {"$sum": {"$cond": [{"$lt": ["$a.placement", "$b.placement"]}, 1, 0]}},
+            "losses": {"$sum": {"$cond": [{"$gt": ["$a.placement", "$b.placement"]}, 1, 0]}},
+        }},
+        {"$project": {
+            "_id": 0, "table": {"$literal": table}, "a": {"$toLong": "$_id.a"}, "b": {"$toLong": "$_id.b"},
+            "games": 1, "wins": 1, "losses": 1,
+        }},
+        {"$merge": {"into": {"db": "match_reporter", "coll": "head_to_head"}, "on": ["table", "a", "b"], "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ]
+
+def _record(doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "discord_id": str(doc["b"]),
+        "games": doc["games"],
+        "wins": doc["wins"],
+        "losses": doc["losses"],
+        "draws": doc["games"] - doc["wins"] - doc["losses"],
+    }
+
+class HeadToHead:
+    """
+    Pairwise records per stat table in ``match_reporter.head_to_head``.
+
+    One document per (table, a, b) counts the games of player a against
+    player b on another team, and how many a finished ahead of (wins) or
+    behind (losses) b. Both directions are stored, so a pair and a player's
+    rivals are each one indexed query. Approvals ``$inc`` the records of the
+    match; ``python -m app migrate head-to-head`` rebuilds them.
+    """
+
+    def __init__(self, db):
+        self.collection = db["match_reporter"].head_to_head
+
+    async def record(self, table: str, matches: Iterable[Any], sign: int = 1) -> None:
+        """Count ``matches`` into the records of ``table`` (``sign=-1`` takes them back out)."""
+        ops = [
+            UpdateOne(
+                {"table": table, "a": Int64(a), "b": Int64(b)},
+                {"$inc": {"games": sign * games, "wins": sign * wins, "losses": sign * losses}},
+                upsert=True,
+            )
+            for (a, b), (games, wins, losses) in pair_results(matches).items()
+        ]
+        if ops:
+            await self.collection.bulk_write(ops, ordered=False)
+
+    async def pair(self, table: str, discord_id: str, opponent_discord_id: str) -> Optional[Dict[str, Any]]:
+        doc = await self.collection.find_one({"table": table, "a": Int64(discord_id), "b": Int64(opponent_discord_id)})
+        return _record(doc) if doc else None
+
+    async def rivals(self, table: str, discord_id: str, limit: int) -> List[Dict[str, Any]]:
+        """Opponents of a player by games played together, most first."""
+        cursor = self.collection.find({"table": table, "a": Int64(discord_id), "games": {"$gt": 0}}).sort([("games", -1), ("b", 1)]).limit(limit)
+        return [_record(doc) async for doc in cursor]
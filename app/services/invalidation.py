@@ -0,0 +1,92 @@
+import asyncio
+import logging
+from collections.abc import Awaitable
+from datetime import datetime, UTC
+from typing import Callable, Dict, List, Optional
+
+from pymongo import ReturnDocument
+
+from app.services.leases import WORKER_ID
+
+logger = logging.getLogger(__name__)
+
+Listener = Callable[[str, int], Optional[Awaitable[None]]]
+
+class InvalidationChannel:
+    """
+    Cross-worker invalidation via per-topic version counters.
+
+    Topics are stat-table names (``civ6_lifetime_stats.rt_ffa`` ...) stored
+    in ``match_reporter.rating_versions``. Writers ``publish`` by bumping a
+    topic's version; every worker polls the collection and calls its
+    listeners for topics whose version moved since the last poll. The same
+    versions tag cached rating previews (see ``MatchService._preview_key``).
+    """
+
+    def __init__(self):
+        self._listeners: List[Listener] = []
+        self._seen: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _collection(db):
+        return db["match_reporter"].rating_versions
+
+    async def versions(self, db, topics: List[str]) -> List[int]:
+        versions = {topic: 0 for topic in topics}
+        async for doc in self._collection(db).find({"_id": {"$in": topics}}):
+            versions[doc["_id"]] = doc.get("version", 0)
+        return [versions[topic] for topic in topics]
+
+    async def publish(self, db, topics: List[str]) -> None:
+        now = datetime.now(UTC)
+        for topic in topics:
+            doc = await self._collection(db).find_one_and_update(
+                {"_id": topic},
+                {"$inc": {"version": 1}, "$set": {"by": WORKER_ID, "at": now}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+            # Our own bump needs no local callback if nobody else moved the topic
+            if self._seen.get(topic, 0) == doc["version"] - 1:
+                self._seen[topic] = doc["version"]
+
+    def subscribe(self, listener: Listener) -> None:
+        self._listeners.append(listener)
+
+    async def poll(self, db) -> None:
+        changed = []
+        async for doc in self._collection(db).find({}):
+            topic, version = doc["_id"], doc.get("version", 0)
+            if self._seen.get(topic) != version:
+                if topic in self._seen or self._task is not None:
+                    changed.append((topic, version))
+                self._seen[topic] = version
+        for topic, version in changed:
+            for listener in self._listeners:
+                try:
+                    res = listener(topic, version)
+                    if isinstance(res, Awaitable):
+                        await res
+                except Exception:
+                    logger.exception(f"⚠️ Invalidation listener failed for {topic}")
+
+    async def _run(self, db, interval_seconds: float) -> None:
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await self.poll(db)
+            except Exception:
+                logger.exception("⚠️ Invalidation poll failed")
+
+    async def start(self, db, interval_seconds: float) -> None:
+        # The first poll only records current versions
+        await self.poll(db)
+        self._task = asyncio.create_task(self._run(db, interval_seconds))
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+invalidations = InvalidationChannel()
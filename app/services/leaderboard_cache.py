@@ -0,0 +1,169 @@
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.config import settings
+from app.metrics import metrics
+from app.services.invalidation import invalidations
+
+logger = logging.getLogger(__name__)
+
+# Same qualification as the leaderboard query: more than two games played
+MIN_GAMES = 3
+
+# Leaderboard orders: the server-side sort (backed by an index in app/indexes.py)
+# and the equivalent in-memory sort key. Documents not yet given a skill
+# (see app/migrations.py) sort last, as they do in Mongo.
+ORDERS = {
+    "mu": [("mu", -1), ("sigma", 1)],
+    "skill": [("skill", -1)],
+}
+
+def _mu_key(row: Dict[str, Any]) -> Tuple[float, float, int]:
+    return (-row["mu"], row["sigma"], int(row["_id"]))
+
+def _skill_key(row: Dict[str, Any]) -> Tuple[float, int]:
+    skill = row.get("skill")
+    return (float("inf") if skill is None else -skill, int(row["_id"]))
+
+SORT_KEYS = {"mu": _mu_key, "skill": _skill_key}
+
+class Leaderboard:
+    """
+    The best ``capacity`` qualifying rows of one stat table in ``order``
+    (mu desc then sigma asc, or skill desc). ``complete`` means the table
+    had no more qualifying rows than that when it was loaded, so a player
+    missing from ``rows`` is known not to qualify; otherwise only rows ranked
+    above the current last one can be placed without a re-query.
+    """
+
+    def __init__(self, rows: Iterable[Dict[str, Any]], capacity: int, complete: bool, order: str = "mu"):
+        self.rows: Dict[int, Dict[str, Any]] = {int(r["_id"]): r for r in rows}
+        self.sort_key = SORT_KEYS[order]
+        self.capacity = capacity
+        self.complete = complete
+        self.stale = False
+        self._response: Optional[Dict[str, Any]] = None
+        self._etag: Optional[str] = None
+
+    def _floor(self) -> Optional[Tuple]:
+        if self.complete or not self.rows:
+            return None
+        return max(self.sort_key(r) for r in self.rows.values())
+
+    def apply(self, row: Dict[str, Any]) -> None:
+        discord_id = int(row["_id"])
+        held = self.rows.get(discord_id)
+        if held is not None and held.get("version", 0) > row.get("version", 0):
+            # an older write finishing after a newer one
+            return
+        floor = self._floor()
+        self.rows.pop(discord_id, None)
+        if row["games"] >= MIN_GAMES and (floor is None or self.sort_key(row) < floor):
+            self.rows[discord_id] = row
+            if len(self.rows) > self.capacity:
+                worst = max(self.rows.values(), key=self.sort_key)
+                del self.rows[int(worst["_id"])]
+                self.complete = False
+        if not self.complete and len(self.rows) < settings.leaderboard_size:
+            # rows below the floor are unknown; reload before serving
+            self.stale = True
+        self._response = None
+
+    def response(self) -> Tuple[Dict[str, Any], str]:
+        if self._response is None:
+            top = sorted(self.rows.values(), key=self.sort_key)[:settings.leaderboard_size]
+            self._response = {"rankings": [
+                {
+                    "discord_id": str(row["_id"]),
+                    "rating": int(row["mu"]),
+                    "games_played": row["games"],
+                    "wins": row["wins"],
+                    "first": row["first"],
+                    "skill": None if row.get("skill") is None else int(row["skill"]),
+                }
+                for row in top
+            ]}
+            # content hash, so every worker hands out the same ETag for the same board
+            digest = hashlib.sha1(json.dumps(self._response["rankings"]).encode("utf-8")).hexdigest()
+            self._etag = f'"{digest}"'
+        return self._response, self._etag
+
+class LeaderboardCache:
+    """
+    In-memory leaderboards keyed by stat table (``civ6_lifetime_stats.rt_ffa`` ...)
+    and order.
+
+    Boards are loaded at startup and on first use, then kept current by the
+    approval paths, which pass the rows they just wrote to ``apply``. Writes
+    by other workers arrive through the invalidation channel and mark the
+    board stale; it is reloaded on the next read.
+    """
+
+    def __init__(self):
+        self._boards: Dict[Tuple[str, str], Leaderboard] = {}
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self._stats = {"hits": 0, "loads": 0, "applied": 0, "invalidated": 0}
+
+    @staticmethod
+    def _capacity() -> int:
+        return settings.leaderboard_size + settings.leaderboard_buffer
+
+    async def load(self, stat_table, order: str = "mu") -> Leaderboard:
+        capacity = self._capacity()
+        cursor = stat_table.find(
+            {"games": {"$gte": MIN_GAMES}},
+            {"mu": 1, "sigma": 1, "skill": 1, "games": 1, "wins": 1, "first": 1, "version": 1},
+        ).sort(ORDERS[order]).limit(capacity + 1)
+        rows = await cursor.to_list(length=None)
+        board = Leaderboard(rows[:capacity], capacity, complete=len(rows) <= capacity, order=order)
+        self._boards[(stat_table.full_name, order)] = board
+        self._stats["loads"] += 1
+        return board
+
+    async def load_all(self, stat_tables) -> None:
+        for stat_table in stat_tables:
+            for order in ORDERS:
+                try:
+                    await self.load(stat_table, order)
+                except Exception:
+                    logger.exception(f"⚠️ Could not load leaderboard {stat_table.full_name} ({order})")
+        logger.info(f"🟢 Loaded {len(self._boards)} leaderboards")
+
+    async def get(self, stat_table, order: str = "mu") -> Tuple[Dict[str, Any], str]:
+        """The leaderboard response and its ETag, loading the board if needed."""
+        key = (stat_table.full_name, order)
+        board = self._boards.get(key)
+        if board is None or board.stale:
+            lock = self._locks.setdefault(key, asyncio.Lock())
+            async with lock:
+                board = self._boards.get(key)
+                if board is None or board.stale:
+                    board = await self.load(stat_table, order)
+        else:
+            self._stats["hits"] += 1
+        return board.response()
+
+    def apply(self, stat_table, rows: Iterable[Dict[str, Any]]) -> None:
+        """Fold freshly written stat rows (``_id, mu, sigma, skill, games, wins, first, version``) into a loaded board."""
+        boards = [self._boards[(stat_table.full_name, order)] for order in ORDERS if (stat_table.full_name, order) in self._boards]
+        for row in rows:
+            for board in boards:
+                board.apply(row)
+            self._stats["applied"] += 1
+
+    def invalidate(self, topic: str, version: int = None) -> None:
+        for order in ORDERS:
+            board = self._boards.get((topic, order))
+            if board is not None:
+                board.stale = True
+                self._stats["invalidated"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "boards": len(self._boards)}
+
+leaderboards = LeaderboardCache()
+invalidations.subscribe(leaderboards.invalidate)
+metrics.register("leaderboards", leaderboards.stats)
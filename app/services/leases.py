@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import os
+import socket
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, UTC
+from typing import AsyncIterator
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+# Identifies this process among uvicorn workers / nodes
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# Held by jobs that rebuild or swap stat tables (replay, season rollover)
+STAT_TABLES_LEASE = "stat-tables"
+# Held by jobs that move or rewrite stat documents under approvals (replay, season rollover); approvals are refused meanwhile
+STAT_WRITES_LEASE = "stat-writes"
+
+class LeaseUnavailableError(Exception): ...
+
+class Lease:
+    def __init__(self, name: str, owner: str):
+        self.name = name
+        self.owner = owner
+        self.lost = False
+
+class LeaseManager:
+    """
+    Named, expiring leases stored in ``match_reporter.leases``.
+
+    A lease is a document ``{_id: name, owner, expires_at}``. Acquiring is a
+    single upsert that only matches an expired lease or one we already own;
+    losing the race surfaces as a duplicate key error. Holders renew in the
+    background, so a crashed worker's lease frees itself after ``ttl``.
+    """
+
+    def __init__(self, db, owner: str = WORKER_ID):
+        self.leases = db["match_reporter"].leases
+        self.owner = owner
+
+    async def acquire(self, name: str, ttl_seconds: float) -> bool:
+        now = datetime.now(UTC)
+        try:
+            await self.leases.find_one_and_update(
+                {"_id": name, "$or": [{"expires_at": {"$lte": now}}, {"owner": self.owner}]},
+                {"$set": {"owner": self.owner, "expires_at": now + timedelta(seconds=ttl_seconds), "renewed_at": now}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    async def renew(self, name: str, ttl_seconds: float) -> bool:
+        now = datetime.now(UTC)
+        res = await self.leases.update_one(
+            {"_id": name, "owner": self.owner},
+            {"$set": {"expires_at": now + timedelta(seconds=ttl_seconds), "renewed_at": now}},
+        )
+        return res.matched_count == 1
+
+    async def release(self, name: str) -> None:
+        await self.leases.delete_one({"_id": name, "owner": self.owner})
+
+    async def _keep_alive(self, lease: Lease, ttl_seconds: float) -> None:
+        while True:
+            await asyncio.sleep(ttl_seconds / 3)
+            try:
+                if not await self.renew(lease.name, ttl_seconds):
+                    lease.lost = True
+                    logger.error(f"🔴 Lease {lease.name} was lost by {self.owner}")
+                    return
+            except Exception:
+                logger.exception(f"⚠️ Failed to renew lease {lease.name}")
+
+    @asynccontextmanager
+    async def hold(self, name: str, ttl_seconds: float, wait_seconds: float = 0.0) -> AsyncIterator[Lease]:
+        """Hold ``name`` for the duration of the block, waiting up to ``wait_seconds`` for it."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + wait_seconds
+        while not await self.acquire(name, ttl_seconds):
+            if loop.time() >= deadline:
+                raise LeaseUnavailableError(f"Lease {name} is held by another worker")
+            await asyncio.sleep(min(1.0, ttl_seconds / 4))
+        lease = Lease(name, self.owner)
+        renewer = asyncio.create_task(self._keep_alive(lease, ttl_seconds))
+        try:
+            yield lease
+        finally:
+            renewer.cancel()
+            try:
+                await self.release(name)
+            except Exception:
+                logger.exception(f"⚠️ Failed to release lease {name}")
+
+class StatWriteGate:
+    """
+    Keeps approvals apart from replay and season rollover, across workers.
+
+    An approval registers in ``match_reporter.stat_writers`` before it reads
+    ratings and checks the lease after; the job takes the lease and then
+    waits until no approval is registered. One of the two always sees the
+    other, so no approval reads a rating before the job and writes it after.
+    Registrations of crashed workers expire after ``ttl``.
+    """
+
+    def __init__(self, db, name: str = STAT_WRITES_LEASE):
+        self.writers = db["match_reporter"].stat_writers
+        self.leases = db["match_reporter"].leases
+        self.name = name
+
+    @asynccontextmanager
+    async def writing(self, ttl_seconds: float) -> AsyncIterator[None]:
+        """Register a stat-table write for the block; raises LeaseUnavailableError while the lease is held."""
+        now = datetime.now(UTC)
+        res = await self.writers.insert_one({"owner": WORKER_ID, "expires_at": now + timedelta(seconds=ttl_seconds)})
+        try:
+            if await self.leases.find_one({"_id": self.name, "expires_at": {"$gt": now}}, {"_id": 1}):
+                raise LeaseUnavailableError(f"Lease {self.name} is held: stat tables are being rebuilt or rolled over")
+            yield
+        finally:
+            await self.writers.delete_one({"_id": res.inserted_id})
+
+    async def drain(self, timeout_seconds: float) -> None:
+        """Wait for the registered writes to finish; call while holding the lease."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout_seconds
+        while await self.writers.count_documents({"expires_at": {"$gt": datetime.now(UTC)}}):
+            if loop.time() >= deadline:
+                raise LeaseUnavailableError("Approvals still in flight, try again")
+            await asyncio.sleep(0.1)
@@ -1,18 +1,38 @@
 import logging
 from collections import defaultdict
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 from bson import ObjectId
 from bson.int64 import Int64
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError
 from app.parsers import parse_civ7_save, parse_civ6_save  # do not modify parser code
 from app.utils import get_cpl_name
 from app.config import settings
-from app.models.db_models import MatchModel, StatModel, PlayerModel
+from app.models.db_models import MatchModel, StatModel, PlayerModel, RatingSnapshot
 from trueskill import Rating
-from app.services.skill import make_ts_env
+from app.services.skill import rate, skill, ts_fingerprint
+from app.services.invalidation import invalidations
+from app.services.leases import LeaseUnavailableError, StatWriteGate
+from app.services.rating_ledger import RatingLedger
+from app.services.rating_series import Point, RatingSeries
+from app.services.head_to_head import HeadToHead
+from app.services.civ_stats import CivStats, Rollup, merge_rollups, rollup_of
+from app.services import team_balance
+from app.services.leaderboard_cache import leaderboards
+from app.services.rating_store import ratings
+from app.services.stat_tables import profile, scoped, split_name, stat_table
+from app.indexes import STAT_GAMES, stat_collections
+from app.seasons import archive_table, current_season_start, list_seasons, rollover
 import hashlib
+import json
 import asyncio
+import random
 from datetime import datetime, UTC
+from contextlib import asynccontextmanager
 import copy
+import base64
+import re
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
@@ -20,8 +40,27 @@ class MatchServiceError(Exception): ...
 class InvalidIDError(MatchServiceError): ...
 class ParseError(MatchServiceError): ...
 class NotFoundError(MatchServiceError): ...
+class ConflictError(MatchServiceError): ...
+
+# Edit operations accepted by edit_match and the fields each one requires
+EDIT_OPERATIONS = {
+    "change_order": ("new_order",),
+    "assign_discord_id": ("player_id", "player_discord_id"),
+    "assign_sub": ("sub_in_id", "sub_out_discord_id"),
+    "remove_sub": ("sub_out_id",),
+    "trigger_quit": ("quitter_discord_id",),
+}
+
+# Player field holding the rating snapshot stored next to each delta
+SNAPSHOT_FIELDS = {"delta": "rating", "season_delta": "season_rating"}
+
+# Registration of an approval with the season rollover gate; outlasts any approval or batch group
+STAT_WRITE_TTL_SECONDS = 300
+
+# Lobby size balance_teams accepts; up to 12 players every split is scored, above that
+# a local search bounded by LOCAL_SEARCH_BUDGET_SECONDS (app/services/team_balance.py)
+MAX_BALANCE_PLAYERS = 24
 
-approve_lock = asyncio.Lock()
 class MatchService:
     def __init__(self, db):
         self.db = db
@@ -29,10 +68,6 @@ class MatchService:
         self.validated_matches = db["match_reporter"].validated_matches
         self.players = db["server_members"].users
         self.subs_table = db["server_members"].subs
-        self.civ6_lifetime_stats = db["civ6_lifetime_stats"]
-        self.civ7_lifetime_stats = db["civ7_lifetime_stats"]
-        self.civ6_seasonal_stats = db["civ6_season_stats"]
-        self.civ7_seasonal_stats = db["civ7_season_stats"]
 
     @staticmethod
     def _to_oid(match_id: str) -> ObjectId:
@@ -75,77 +110,149 @@ class MatchService:
         return match
 
     def get_stat_table(self, is_cloud: bool, match_type: str, civ_version: str, is_seasonal: bool):
-        if is_seasonal:
-            if civ_version == "civ6":
-                db = self.civ6_seasonal_stats
-            else:
-                db = self.civ7_seasonal_stats
-        else:
-            if civ_version == "civ6":
-                db = self.civ6_lifetime_stats
-            else:
-                db = self.civ7_lifetime_stats
+        """The stat table of a ledger, a collection or a view of the unified layout (app/services/stat_tables.py)."""
+        database = f"{civ_version}_{'season' if is_seasonal else 'lifetime'}_stats"
         match_table = ("pbc_" if is_cloud else "rt_") + match_type
-        return getattr(db, match_table)
-
-    def get_player_stats_db(self, match, player, player_new_stats: StatModel, delta_value_name: str) -> Dict[str, Any]:
-        player_stats_db = {}
-        player_stats_db[f"mu"] = player_new_stats.mu
-        player_stats_db[f"sigma"] = player_new_stats.sigma
-        player_stats_db[f"games"] = player_new_stats.games + 1
-        player_stats_db[f"wins"] = player_new_stats.wins + (1 if getattr(player, delta_value_name) > 0 else 0)
-        player_stats_db[f"first"] = player_new_stats.first + (1 if player.placement == 0 else 0)
-        player_stats_db[f"subbedIn"] = player_new_stats.subbedIn + (1 if player.is_sub else 0)
-        player_stats_db[f"subbedOut"] = player_new_stats.subbedOut + (1 if player.subbed_out else 0)
-        player_stats_db[f"lastModified"] = datetime.now(UTC)
+        return stat_table(self.db, database, match_table)
+
+    @staticmethod
+    def get_player_stats_update(match, player, player_new_stats: StatModel, delta_value_name: str) -> Dict[str, Any]:
+        """
+        Update document for one player's stat row: counters as $inc, the new
+        rating as $set. Only the fields this match changes are sent.
+        """
+        player_stats_inc = {}
+        player_stats_inc[f"games"] = 1
+        player_stats_inc[f"wins"] = 1 if getattr(player, delta_value_name) > 0 else 0
+        player_stats_inc[f"first"] = 1 if player.placement == 0 else 0
+        player_stats_inc[f"subbedIn"] = 1 if player.is_sub else 0
+        player_stats_inc[f"subbedOut"] = 1 if player.subbed_out else 0
+        player_stats_inc[f"version"] = 1
         if player.civ:
-            civs = player_new_stats.civs
             player_civ_leader = get_cpl_name(match.game, player.civ, player.leader)
-            civs[player_civ_leader] = civs.get(player_civ_leader, 0) + 1
-            player_stats_db[f"civs"] = civs
-        return player_stats_db
+            player_stats_inc[f"civs.{player_civ_leader}"] = 1
+        player_stats_set = {}
+        player_stats_set[f"mu"] = player_new_stats.mu
+        player_stats_set[f"sigma"] = player_new_stats.sigma
+        # precomputed for the skill-ordered leaderboard; backfilled by app/migrations.py
+        player_stats_set[f"skill"] = skill(player_new_stats.mu, player_new_stats.sigma, teamer=match.game_mode == "teamer")
+        player_stats_set[f"lastModified"] = datetime.now(UTC)
+        return {"$set": player_stats_set, "$inc": player_stats_inc}
+
+    @staticmethod
+    def get_player_stats_revert(match, player, delta_value_name: str) -> Dict[str, Any]:
+        """
+        Inverse of get_player_stats_update for an approved match: counters
+        back down and the rating back to the player's snapshot. The version
+        still moves forward so concurrent writers and caches see a change.
+        """
+        snapshot = getattr(player, SNAPSHOT_FIELDS[delta_value_name])
+        update = MatchService.get_player_stats_update(match, player, Rating(snapshot.mu_before, snapshot.sigma_before), delta_value_name)
+        player_stats_inc = {field: -value for field, value in update["$inc"].items()}
+        player_stats_inc["version"] = 1
+        return {"$set": update["$set"], "$inc": player_stats_inc}
+
+    @staticmethod
+    def stat_row(pre: StatModel, update: Dict[str, Any]) -> Dict[str, Any]:
+        """The leaderboard fields of a stat document after ``update`` is applied to ``pre``."""
+        inc = update["$inc"]
+        return {
+            "_id": Int64(pre.id),
+            "mu": update["$set"]["mu"],
+            "sigma": update["$set"]["sigma"],
+            "skill": update["$set"]["skill"],
+            "games": pre.games + inc["games"],
+            "wins": pre.wins + inc["wins"],
+            "first": pre.first + inc["first"],
+            "version": pre.version + inc["version"],
+        }
+
+    @staticmethod
+    def publish_stat_rows(stat_table, rows: List[Dict[str, Any]]) -> None:
+        """Patch this worker's in-memory leaderboards and rating store with committed stat rows."""
+        leaderboards.apply(stat_table, rows)
+        ratings.apply(stat_table, rows)
+
+    @staticmethod
+    def series_points(match: MatchModel, validated_id: ObjectId, delta_value_name: str) -> List[Point]:
+        """Rating-series points of an approved match in one stat table, from its snapshots."""
+        snapshot_field = SNAPSHOT_FIELDS[delta_value_name]
+        return [
+            (p.discord_id, match.approved_at, getattr(p, snapshot_field).mu_after, getattr(p, snapshot_field).sigma_after, validated_id)
+            for p in match.players
+            if getattr(p, snapshot_field) is not None
+        ]
+
+    async def record_series(self, stat_table, points: List[Point]) -> None:
+        # derived data written after the commit; replay rebuilds it if this fails
+        try:
+            await RatingSeries(self.db).append(stat_table.full_name, points)
+        except PyMongoError as e:
+            logger.exception(f"⚠️ Could not record rating series of {stat_table.full_name}: {e}")
+
+    async def record_head_to_head(self, stat_table, matches: List[MatchModel], sign: int = 1) -> None:
+        # derived data like the rating series; `python -m app migrate head-to-head` rebuilds it
+        try:
+            await HeadToHead(self.db).record(stat_table.full_name, matches, sign=sign)
+        except PyMongoError as e:
+            logger.exception(f"⚠️ Could not record head-to-head of {stat_table.full_name}: {e}")
+
+    async def record_civ_stats(self, stat_table, rollup: Rollup) -> None:
+        # derived data; `python -m app migrate civ-stats` rebuilds it
+        try:
+            await CivStats(self.db).record(stat_table.full_name, rollup)
+        except PyMongoError as e:
+            logger.exception(f"⚠️ Could not record civ stats of {stat_table.full_name}: {e}")
+
+    @staticmethod
+    def to_stat_model(doc: Dict[str, Any], discord_id: str, player_index: int) -> StatModel:
+        if doc:
+            player = dict(doc)
+            player['id'] = player.pop('_id')
+            player['index'] = player_index
+            return StatModel(**player)
+        return StatModel(
+            index=player_index,
+            id=0 if discord_id == None else discord_id,
+            mu=settings.ts_mu,
+            sigma=settings.ts_sigma,
+            games=0,
+            wins=0,
+            first=0,
+            subbedIn=0,
+            subbedOut=0,
+            civs={},
+        )
 
     async def get_player_ranking(self, match: MatchModel, discord_id: str, player_index: int, is_seasonal: bool) -> StatModel:
         if discord_id == None:
-            return StatModel(
-                index=player_index,
-                id=0,
-                mu=settings.ts_mu,
-                sigma=settings.ts_sigma,
-                games=0,
-                wins=0,
-                first=0,
-                subbedIn=0,
-                subbedOut=0,
-                civs={},
-            )
+            return self.to_stat_model(None, discord_id, player_index)
         stat_table = self.get_stat_table(match.is_cloud, match.game_mode, match.game, is_seasonal)
         player = await stat_table.find_one({"_id": Int64(discord_id)})
-        if player:
-            player['id'] = player.pop('_id')
-            player['index'] = player_index
-            return StatModel(**player)
-        else:
-            return StatModel(
-                index=player_index,
-                id=discord_id,
-                mu=settings.ts_mu,
-                sigma=settings.ts_sigma,
-                games=0,
-                wins=0,
-                first=0,
-                subbedIn=0,
-                subbedOut=0,
-                civs={},
-            )
+        return self.to_stat_model(player, discord_id, player_index)
 
     async def get_players_ranking(self, match: MatchModel, is_seasonal: bool) -> List[StatModel]:
+        # One $in query for the whole match instead of a find_one per player
+        stat_table = self.get_stat_table(match.is_cloud, match.game_mode, match.game, is_seasonal)
+        ids = list({Int64(p.discord_id) for p in match.players if p.discord_id != None})
+        docs = {}
+        if ids:
+            async for doc in stat_table.find({"_id": {"$in": ids}}):
+                docs[doc["_id"]] = doc
         players_ranking = []
         for player_index, player in enumerate(match.players):
-            ranking = await self.get_player_ranking(match, player.discord_id, player_index, is_seasonal)
-            players_ranking.append(ranking)
+            doc = docs.get(Int64(player.discord_id)) if player.discord_id != None else None
+            players_ranking.append(self.to_stat_model(doc, player.discord_id, player_index))
         return players_ranking
 
+    async def get_match_rankings(self, match: MatchModel) -> Tuple[List[StatModel], List[StatModel]]:
+        """Lifetime and seasonal rankings for every player, loaded concurrently."""
+        players_ranking, players_season_ranking = await asyncio.gather(
+            self.get_players_ranking(match, is_seasonal=False),
+            self.get_players_ranking(match, is_seasonal=True),
+        )
+        return players_ranking, players_season_ranking
+
     def update_player_stats(self, match: MatchModel, players_ranking: List[StatModel], delta_value_name: str):
         num_teams = len(set([p.team for p in match.players]))
         if num_teams <= 1:
@@ -174,11 +281,8 @@ class MatchService:
         placements_wo_subs = [teams_wo_subs[team][0][1].placement for team in teams_wo_subs]
         placements_with_sub_ins = [teams_with_sub_ins[team][0][1].placement for team in teams_with_sub_ins]
 
-        ts_wo_subs_env = make_ts_env()
-        ts_with_sub_ins_env = make_ts_env()
-        
-        new_ts_wo_subs = ts_wo_subs_env.rate(ts_teams_wo_subs, ranks=placements_wo_subs)
-        new_ts_with_sub_ins = ts_with_sub_ins_env.rate(ts_teams_with_sub_ins, ranks=placements_with_sub_ins)
+        new_ts_wo_subs = rate(ts_teams_wo_subs, ranks=placements_wo_subs)
+        new_ts_with_sub_ins = rate(ts_teams_with_sub_ins, ranks=placements_with_sub_ins)
 
         post: List[StatModel] = list(range(len(match.players)))
         for team_idx, team in enumerate(team_wo_subs_states):
@@ -197,6 +301,7 @@ class MatchService:
                     subbedIn=player.subbedIn,
                     subbedOut=player.subbedOut,
                     civs=player.civs,
+                    version=player.version,
                 )
         for team_idx, team in enumerate(team_with_sub_ins_states):
             for player_index, player in enumerate(team):
@@ -213,6 +318,7 @@ class MatchService:
                         subbedIn=player.subbedIn,
                         subbedOut=player.subbedOut,
                         civs=player.civs,
+                        version=player.version,
                     )
         for i, p in enumerate(match.players):
             p_current_ranking = players_ranking[i]
@@ -227,8 +333,226 @@ class MatchService:
                 # Regular player
                 p.__setattr__(delta_value_name, delta)
             post[i].mu = p_current_ranking.mu + getattr(p, delta_value_name)
+            if p.discord_id != None:
+                # what unapprove_match needs to revert this match later
+                setattr(p, SNAPSHOT_FIELDS[delta_value_name], RatingSnapshot(
+                    mu_before=p_current_ranking.mu,
+                    sigma_before=p_current_ranking.sigma,
+                    mu_after=post[i].mu,
+                    sigma_after=post[i].sigma,
+                    version=p_current_ranking.version + 1,
+                ))
         return match, post
 
+    async def get_rating_versions(self, stat_tables) -> List[int]:
+        return await invalidations.versions(self.db, [table.full_name for table in stat_tables])
+
+    async def bump_rating_versions(self, stat_tables):
+        # Invalidates cached previews and other workers' in-memory rating caches
+        await invalidations.publish(self.db, [table.full_name for table in stat_tables])
+
+    @staticmethod
+    def _preview_key(match: MatchModel, versions: List[int]) -> str:
+        rating_inputs = [
+            [p.discord_id, p.team, p.placement, p.is_sub, p.subbed_out]
+            for p in match.players
+        ]
+        m = hashlib.sha256()
+        # previews rated under other TrueSkill settings are stale too
+        m.update(json.dumps([rating_inputs, versions, ts_fingerprint()]).encode('utf-8'))
+        return m.hexdigest()
+
+    async def _rate_preview(self, match: MatchModel) -> MatchModel:
+        players_ranking, players_season_ranking = await self.get_match_rankings(match)
+        match, _ = self.update_player_stats(match, players_ranking, "delta")
+        match, _ = self.update_player_stats(match, players_season_ranking, "season_delta")
+        return match
+
+    async def _current_preview_key(self, match: MatchModel) -> str:
+        stat_tables = [
+            self.get_stat_table(match.is_cloud, match.game_mode, match.game, is_seasonal=False),
+            self.get_stat_table(match.is_cloud, match.game_mode, match.game, is_seasonal=True),
+        ]
+        versions = await self.get_rating_versions(stat_tables)
+        return self._preview_key(match, versions)
+
+    async def _apply_preview(self, match: MatchModel, cached_key: str = None) -> str:
+        """Recompute match deltas in place unless ``cached_key`` is still current; returns the current key."""
+        key = await self._current_preview_key(match)
+        if cached_key != key:
+            await self._rate_preview(match)
+        return key
+
+    async def _with_preview(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Return a pending match document with up-to-date delta/season_delta.
+
+        Deltas are cached on the document under ``preview_key``, a hash of
+        the rating inputs (players, teams, placements, subs) and the rating
+        versions of the lifetime and seasonal stat tables. They are only
+        recomputed when that key no longer matches. The deltas are written
+        back only if the players are still the ones that were rated, so a
+        concurrent edit of the roster is never overwritten.
+        """
+        match = MatchModel(**doc)
+        key = await self._apply_preview(match, doc.get("preview_key"))
+        if doc.get("preview_key") != key:
+            rated_players = copy.deepcopy(doc["players"])
+            changes = {"preview_key": key}
+            for i, player in enumerate(match.players):
+                changes[f"players.{i}.delta"] = player.delta
+                changes[f"players.{i}.season_delta"] = player.season_delta
+                doc["players"][i]["delta"] = player.delta
+                doc["players"][i]["season_delta"] = player.season_delta
+            await self.pending_matches.update_one({"_id": doc["_id"], "players": rated_players}, {"$set": changes})
+            doc["preview_key"] = key
+        doc["match_id"] = str(doc.pop("_id"))
+        return doc
+
+    async def _get_with_preview(self, oid: ObjectId) -> Dict[str, Any]:
+        doc = await self.pending_matches.find_one({"_id": oid})
+        if not doc:
+            raise NotFoundError("Match not found")
+        return await self._with_preview(doc)
+
+    def _rate_ordering(self, match: MatchModel, ordering: Tuple[int, ...], players_ranking: List[StatModel],
+                       players_season_ranking: List[StatModel]) -> List[Tuple[int, int]]:
+        """(delta, season_delta) of every player if the teams finished in ``ordering``."""
+        # rating only touches the players, so the rest of the match is shared
+        projected = match.model_copy(update={"players": [p.model_copy() for p in match.players]})
+        for player in projected.players:
+            player.placement = ordering.index(player.team)
+        self.update_player_stats(projected, players_ranking, "delta")
+        self.update_player_stats(projected, players_season_ranking, "season_delta")
+        return [(p.delta, p.season_delta) for p in projected.players]
+
+    async def _placement_deltas(self, match: MatchModel) -> List[Dict[str, Any]]:
+        if any(p.placement is None for p in match.players):
+            raise MatchServiceError("Every player needs a placement")
+        teams = sorted({p.team for p in match.players}, key=lambda team: (min(p.placement for p in match.players if p.team == team), team))
+        if len(teams) < 2:
+            raise MatchServiceError("Match has less than 2 teams")
+        # ratings are read once; each distinct finishing order is rated once, on
+        # its own, since TrueSkill rates one factor graph per finishing order
+        players_ranking, players_season_ranking = await self.get_match_rankings(match)
+        outcomes: Dict[Tuple[int, ...], List[Tuple[int, int]]] = {}
+        table = []
+        for team in teams:
+            others = [t for t in teams if t != team]
+            members = [i for i, p in enumerate(match.players) if p.team == team]
+            entry = {"team": team, "players": members, "delta": [], "season_delta": []}
+            for position in range(len(teams)):
+                ordering = tuple(others[:position] + [team] + others[position:])
+                if ordering not in outcomes:
+                    outcomes[ordering] = self._rate_ordering(match, ordering, players_ranking, players_season_ranking)
+                entry["delta"].append([outcomes[ordering][i][0] for i in members])
+                entry["season_delta"].append([outcomes[ordering][i][1] for i in members])
+            table.append(entry)
+        return table
+
+    async def get_placement_deltas(self, match_id: str) -> Dict[str, Any]:
+        """
+        Projected delta/season_delta of every team's players for each finishing
+        position of the team, the other teams keeping their current order.
+
+        The table is cached on the pending match under the same key as the
+        delta preview, so it is computed once per placement, roster and
+        rating version.
+        """
+        oid = self._to_oid(match_id)
+        doc = await self.pending_matches.find_one({"_id": oid})
+        if not doc:
+            raise NotFoundError("Match not found")
+        match = MatchModel(**doc)
+        key = await self._current_preview_key(match)
+        cached = doc.get("placement_deltas") or {}
+        if cached.get("key") == key:
+            table = cached["teams"]
+        else:
+            table = await self._placement_deltas(match)
+            await self.pending_matches.update_one({"_id": oid}, {"$set": {"placement_deltas": {"key": key, "teams": table}}})
+        return {"match_id": match_id, "teams": table}
+
+    @staticmethod
+    def _apply_change_order(match: MatchModel, new_order: str) -> None:
+        num_teams = len({player.team for player in match.players})
+        new_order_list = new_order.split(' ')
+        if len(new_order_list) != num_teams:
+            raise MatchServiceError(f"New order length does not match number of players/teams ({num_teams})")
+        for player in match.players:
+            player.placement = int(new_order_list[player.team]) - 1
+
+    async def _apply_assign_discord_id(self, match: MatchModel, player_id: str, player_discord_id: str) -> int:
+        if int(player_id) < 1 or int(player_id) > len(match.players):
+            raise MatchServiceError("Player ID out of range. Must be between 1 and number of players")
+        index = int(player_id) - 1
+        match.players[index].discord_id = player_discord_id
+        match.players[index].steam_id = await self.discord_to_steam_id(player_discord_id)
+        return index
+
+    async def _apply_assign_sub(self, match: MatchModel, sub_in_id: str, sub_out_discord_id: str) -> None:
+        if int(sub_in_id) < 0 or int(sub_in_id) >= len(match.players):
+            raise MatchServiceError("Sub in Player ID out of range. Must be between 0 and number of players - 1")
+        sub_in = match.players[int(sub_in_id)]
+        sub_in.is_sub = True
+        sub_out_player_steam_id = await self.discord_to_steam_id(sub_out_discord_id)
+        match.players.insert(int(sub_in_id) + 1, PlayerModel(
+            steam_id = sub_out_player_steam_id,
+            user_name = None,
+            civ = sub_in.civ,
+            team = sub_in.team,
+            leader = sub_in.leader,
+            player_alive = sub_in.player_alive,
+            discord_id = sub_out_discord_id,
+            placement = sub_in.placement,
+            quit = False,
+            delta = 0.0,
+            is_sub = False,
+            subbed_out = True,
+        ))
+
+    @staticmethod
+    def _apply_remove_sub(match: MatchModel, sub_out_id: str) -> None:
+        if int(sub_out_id) < 1 or int(sub_out_id) >= len(match.players) or not match.players[int(sub_out_id)].subbed_out:
+            raise MatchServiceError("Sub in Player ID out of range. Must be between 1 and number of players - 1")
+        match.players[int(sub_out_id)-1].is_sub = False
+        match.players.pop(int(sub_out_id))
+
+    @staticmethod
+    def _apply_trigger_quit(match: MatchModel, quitter_discord_id: str) -> int:
+        for i, player in enumerate(match.players):
+            if player.discord_id == quitter_discord_id:
+                player.quit = not player.quit
+                return i
+        return -1
+
+    async def _apply_edit(self, match: MatchModel, operation: Dict[str, Any]) -> None:
+        op = operation.get("op")
+        required = EDIT_OPERATIONS.get(op)
+        if required is None:
+            raise MatchServiceError(f"Unknown edit operation: {op}")
+        missing = [field for field in required if operation.get(field) is None]
+        if missing:
+            raise MatchServiceError(f"Edit operation {op} is missing {', '.join(missing)}")
+        if op == "change_order":
+            self._apply_change_order(match, operation["new_order"])
+        elif op == "assign_discord_id":
+            await self._apply_assign_discord_id(match, operation["player_id"], operation["player_discord_id"])
+        elif op == "assign_sub":
+            await self._apply_assign_sub(match, operation["sub_in_id"], operation["sub_out_discord_id"])
+        elif op == "remove_sub":
+            self._apply_remove_sub(match, operation["sub_out_id"])
+        elif op == "trigger_quit":
+            self._apply_trigger_quit(match, operation["quitter_discord_id"])
+
+    @staticmethod
+    def _as_repeated(res: Dict[str, Any]) -> Dict[str, Any]:
+        match_id = str(res["_id"])
+        del res["_id"]
+        res["match_id"] = match_id
+        res['repeated'] = True
+        return res
+
     async def create_from_save(self, file_bytes: bytes, reporter_discord_id: str, is_cloud: bool, discord_message_id: str) -> Dict[str, Any]:
         parsed = self._parse_save(file_bytes)
         m = hashlib.sha256()
@@ -241,11 +565,7 @@ class MatchService:
         save_file_hash = m.hexdigest()
         res = await self.pending_matches.find_one({"save_file_hash": save_file_hash})
         if res:
-            match_id = str(res["_id"])
-            del res["_id"]
-            res["match_id"] = match_id
-            res['repeated'] = True
-            return res
+            return self._as_repeated(res)
         parsed['save_file_hash'] = save_file_hash
         parsed['repeated'] = False
         parsed['reporter_discord_id'] = reporter_discord_id
@@ -253,12 +573,14 @@ class MatchService:
         parsed['discord_messages_id_list'] = [discord_message_id]
         match = MatchModel(**parsed)
         match = await self.match_id_to_discord(match)
-        players_ranking = await self.get_players_ranking(match, is_seasonal=False)
-        players_season_ranking = await self.get_players_ranking(match, is_seasonal=True)
-        match, _ = self.update_player_stats(match, players_ranking, "delta")
-        match, _ = self.update_player_stats(match, players_season_ranking, "season_delta")
-        res = await self.pending_matches.insert_one(match.dict())
-        return {"match_id": str(res.inserted_id), **match.dict()}
+        try:
+            res = await self.pending_matches.insert_one(match.dict())
+        except DuplicateKeyError:
+            # reported concurrently; the unique save_file_hash index kept the first one
+            return self._as_repeated(await self.pending_matches.find_one({"save_file_hash": save_file_hash}))
+        created = await self._get_with_preview(res.inserted_id)
+        created.pop("preview_key", None)
+        return created
     
     async def append_discord_message_id_list(self, match_id: str, discord_message_id_list: list[str]) -> Dict[str, Any]:
         oid = self._to_oid(match_id)
@@ -268,17 +590,11 @@ class MatchService:
         current_list = res.get("discord_messages_id_list", [])
         updated_list = current_list + discord_message_id_list
         await self.pending_matches.update_one({"_id": oid}, {"$set": {"discord_messages_id_list": updated_list}})
-        updated = await self.pending_matches.find_one({"_id": oid})
-        updated["match_id"] = str(updated.pop("_id"))
-        return updated
+        return await self._get_with_preview(oid)
 
     async def get(self, match_id: str) -> Dict[str, Any]:
         oid = self._to_oid(match_id)
-        doc = await self.pending_matches.find_one({"_id": oid})
-        if not doc:
-            raise NotFoundError("Match not found")
-        doc["match_id"] = str(doc.pop("_id"))
-        return doc
+        return await self._get_with_preview(oid)
 
     async def update(self, match_id: str, update_data: Dict[str, Any]) -> Dict[str, Any]:
         if not update_data:
@@ -287,8 +603,7 @@ class MatchService:
         res = await self.pending_matches.update_one({"_id": oid}, {"$set": update_data})
         if res.matched_count == 0:
             raise NotFoundError("Match not found")
-        updated = await self.pending_matches.find_one({"_id": oid})
-        updated["match_id"] = str(updated.pop("_id"))
+        updated = await self._get_with_preview(oid)
         logger.info(f"✅ 🔄 Updated match {match_id}")
         return updated
 
@@ -298,27 +613,14 @@ class MatchService:
         if res == None:
             raise NotFoundError("Match not found")
         match = MatchModel(**res)
-        num_teams = len({player.team for player in match.players})
-        new_order_list = new_order.split(' ')
-        if len(new_order_list) != num_teams:
-            raise MatchServiceError(f"New order length does not match number of players/teams ({num_teams})")
-        for i, player in enumerate(match.players):
-            player.placement = int(new_order_list[player.team]) - 1
-        players_ranking = await self.get_players_ranking(match, is_seasonal=False)
-        players_season_ranking = await self.get_players_ranking(match, is_seasonal=True)
-        match, _ = self.update_player_stats(match, players_ranking, "delta")
-        match, _ = self.update_player_stats(match, players_season_ranking, "season_delta")
+        self._apply_change_order(match, new_order)
         changes = {}
         changes["discord_messages_id_list"] = res['discord_messages_id_list'] + [discord_message_id]
         for i, player in enumerate(match.players):
             changes[f"players.{i}.placement"] = player.placement
-            changes[f"players.{i}.delta"] = match.players[i].delta
-            changes[f"players.{i}.season_delta"] = match.players[i].season_delta
         await self.pending_matches.update_one({"_id": oid}, {"$set": changes})
         logger.info(f"✅ 🔄 Changed player order for match {match_id}")
-        updated = await self.pending_matches.find_one({"_id": oid})
-        updated["match_id"] = str(updated.pop("_id"))
-        return updated
+        return await self._get_with_preview(oid)
 
     async def delete_pending_match(self, match_id: str) -> Dict[str, Any]:
         oid = self._to_oid(match_id)
@@ -335,15 +637,14 @@ class MatchService:
         res = await self.pending_matches.find_one({"_id": oid})
         if res == None:
             raise NotFoundError("Match not found")
+        match = MatchModel(**res)
         changes = {}
-        for i, player in enumerate(res['players']):
-            if player.get('discord_id') == quitter_discord_id:
-                changes[f"players.{i}.quit"] = False if res['players'][i]['quit'] else True
-                break
+        i = self._apply_trigger_quit(match, quitter_discord_id)
+        if i >= 0:
+            changes[f"players.{i}.quit"] = match.players[i].quit
         changes["discord_messages_id_list"] = res['discord_messages_id_list'] + [discord_message_id]
         await self.pending_matches.update_one({"_id": oid}, {"$set": changes})
-        updated = await self.pending_matches.find_one({"_id": oid})
-        updated["match_id"] = str(updated.pop("_id"))
+        updated = await self._get_with_preview(oid)
         logger.info(f"✅ 🔄 Match {match_id}, player {quitter_discord_id} quit triggered")
         return updated
 
@@ -353,26 +654,14 @@ class MatchService:
         if res == None:
             raise NotFoundError("Match not found")
         match = MatchModel(**res)
-        if int(player_id) < 1 or int(player_id) > len(match.players):
-            raise MatchServiceError("Player ID out of range. Must be between 1 and number of players")
-        match.players[int(player_id)-1].discord_id = player_discord_id
-        match.players[int(player_id)-1].steam_id = await self.discord_to_steam_id(player_discord_id)
-        players_ranking = await self.get_players_ranking(match, is_seasonal=False)
-        players_season_ranking = await self.get_players_ranking(match, is_seasonal=True)
-        match, _ = self.update_player_stats(match, players_ranking, "delta")
-        match, _ = self.update_player_stats(match, players_season_ranking, "season_delta")
+        index = await self._apply_assign_discord_id(match, player_id, player_discord_id)
         changes = {}
         changes["discord_messages_id_list"] = res['discord_messages_id_list'] + [discord_message_id]
-        changes[f"players.{int(player_id)-1}.discord_id"] = player_discord_id
-        changes[f"players.{int(player_id)-1}.steam_id"] = match.players[int(player_id)-1].steam_id
-        for i, player in enumerate(res['players']):
-            changes[f"players.{i}.delta"] = match.players[i].delta
-            changes[f"players.{i}.season_delta"] = match.players[i].season_delta
+        changes[f"players.{index}.discord_id"] = player_discord_id
+        changes[f"players.{index}.steam_id"] = match.players[index].steam_id
         await self.pending_matches.update_one({"_id": oid}, {"$set": changes})
         logger.info(f"✅ 🔄 Assigned player id for match {match_id}")
-        updated = await self.pending_matches.find_one({"_id": oid})
-        updated["match_id"] = str(updated.pop("_id"))
-        return updated
+        return await self._get_with_preview(oid)
 
     async def assign_sub(self, match_id: str, sub_in_id: str, sub_out_discord_id: str, discord_message_id: str) -> Dict[str, Any]:
         oid = self._to_oid(match_id)
@@ -380,32 +669,10 @@ class MatchService:
         if res == None:
             raise NotFoundError("Match not found")
         match = MatchModel(**res)
-        if int(sub_in_id) < 0 or int(sub_in_id) >= len(match.players):
-            raise MatchServiceError("Sub in Player ID out of range. Must be between 0 and number of players - 1")
-        match.players[int(sub_in_id)].is_sub = True
-        sub_out_player_steam_id = await self.discord_to_steam_id(sub_out_discord_id)
-        match.players.insert(int(sub_in_id) + 1, PlayerModel(
-            steam_id = sub_out_player_steam_id,
-            user_name = None,
-            civ = match.players[int(sub_in_id)].civ,
-            team = match.players[int(sub_in_id)].team,
-            leader = match.players[int(sub_in_id)].leader,
-            player_alive = match.players[int(sub_in_id)].player_alive,
-            discord_id = sub_out_discord_id,
-            placement = match.players[int(sub_in_id)].placement,
-            quit = False,
-            delta = 0.0,
-            is_sub = False,
-            subbed_out = True,
-        ))
-        players_ranking = await self.get_players_ranking(match, is_seasonal=False)
-        players_season_ranking = await self.get_players_ranking(match, is_seasonal=True)
-        match, _ = self.update_player_stats(match, players_ranking, "delta")
-        match, _ = self.update_player_stats(match, players_season_ranking, "season_delta")
+        await self._apply_assign_sub(match, sub_in_id, sub_out_discord_id)
         match.discord_messages_id_list = res['discord_messages_id_list'] + [discord_message_id]
         await self.pending_matches.replace_one({"_id": oid}, match.dict())
-        updated = await self.pending_matches.find_one({"_id": oid})
-        updated["match_id"] = str(updated.pop("_id"))
+        updated = await self._get_with_preview(oid)
         logger.info(f"✅ 🔄 Match {match_id}, sub_in: {sub_in_id}, sub_out: {sub_out_discord_id}")
         return updated
     
@@ -415,78 +682,781 @@ class MatchService:
         if res == None:
             raise NotFoundError("Match not found")
         match = MatchModel(**res)
-        if int(sub_out_id) < 1 or int(sub_out_id) >= len(match.players) or not match.players[int(sub_out_id)].subbed_out:
-            raise MatchServiceError("Sub in Player ID out of range. Must be between 1 and number of players - 1")
-        match.players[int(sub_out_id)-1].is_sub = False
-        match.players.pop(int(sub_out_id))
-        players_ranking = await self.get_players_ranking(match, is_seasonal=False)
-        players_season_ranking = await self.get_players_ranking(match, is_seasonal=True)
-        match, _ = self.update_player_stats(match, players_ranking, "delta")
-        match, _ = self.update_player_stats(match, players_season_ranking, "season_delta")
+        self._apply_remove_sub(match, sub_out_id)
         match.discord_messages_id_list = res['discord_messages_id_list'] + [discord_message_id]
         await self.pending_matches.replace_one({"_id": oid}, match.dict())
-        updated = await self.pending_matches.find_one({"_id": oid})
-        updated["match_id"] = str(updated.pop("_id"))
+        updated = await self._get_with_preview(oid)
         logger.info(f"✅ 🔄 Match {match_id}, sub_out_id: {sub_out_id}")
         return updated
 
-    async def approve_match(self, match_id: str, approver_discord_id: str) -> Dict[str, Any]:
-        # Use a lock to make sure only one approval happens at a time
-        async with approve_lock:
-            oid = self._to_oid(match_id)
-            res = await self.pending_matches.find_one({"_id": oid})
-            if res == None:
+    async def edit_match(self, match_id: str, operations: List[Dict[str, Any]], discord_message_id: str) -> Dict[str, Any]:
+        """
+        Apply an ordered list of edit operations to a pending match.
+
+        All operations are applied to one in-memory ``MatchModel``; ratings
+        are recomputed once at the end and the document is replaced in a
+        single write. Any invalid operation rejects the whole batch.
+        """
+        if not operations:
+            raise MatchServiceError("Empty edit operation list")
+        oid = self._to_oid(match_id)
+        for attempt in range(settings.approve_max_retries):
+            try:
+                doc = await self._edit_once(oid, operations, discord_message_id)
+                break
+            except ConflictError as e:
+                logger.info(f"🔁 Edit of match {match_id} conflicted (attempt {attempt + 1}): {e}")
+                await asyncio.sleep(random.uniform(0, 0.05 * (attempt + 1)))
+        else:
+            raise ConflictError(f"Match {match_id} could not be edited after {settings.approve_max_retries} conflicting attempts")
+        logger.info(f"✅ 🔄 Match {match_id}, applied {len(operations)} edit operations")
+        doc["match_id"] = match_id
+        return doc
+
+    async def _edit_once(self, oid: ObjectId, operations: List[Dict[str, Any]], discord_message_id: str) -> Dict[str, Any]:
+        res = await self.pending_matches.find_one({"_id": oid})
+        if res == None:
+            raise NotFoundError("Match not found")
+        match = MatchModel(**res)
+        for operation in operations:
+            await self._apply_edit(match, operation)
+        match.discord_messages_id_list = res['discord_messages_id_list'] + [discord_message_id]
+        key = await self._apply_preview(match)
+        doc = match.dict()
+        doc["preview_key"] = key
+        # only over the state the edits were applied to
+        replaced = await self.pending_matches.replace_one(
+            {"_id": oid, "players": res["players"], "discord_messages_id_list": res["discord_messages_id_list"]}, doc,
+        )
+        if replaced.matched_count == 0:
+            if await self.pending_matches.find_one({"_id": oid}, {"_id": 1}) is None:
+                # approved or deleted meanwhile
                 raise NotFoundError("Match not found")
-            match = MatchModel(**res)
-            for i, player in enumerate(match.players):
-                if player.discord_id == None:
-                    raise MatchServiceError(f"Player {player.user_name} has no linked Discord ID")
-            players_ranking = await self.get_players_ranking(match, is_seasonal=False)
-            players_season_ranking = await self.get_players_ranking(match, is_seasonal=True)
-            match, post = self.update_player_stats(match, players_ranking, "delta")
-            match, season_post = self.update_player_stats(match, players_season_ranking, "season_delta")
+            raise ConflictError("Match changed while editing")
+        return doc
+
+    @staticmethod
+    def version_filter(discord_id: str, expected_version: int) -> Dict[str, Any]:
+        """
+        Compare-and-swap filter: matches the stat document only if nobody
+        rated it since it was read, i.e. the prior rating is still current.
+        """
+        if expected_version:
+            return {"_id": Int64(discord_id), "version": expected_version}
+        # new players and documents written before versioning was introduced
+        return {"_id": Int64(discord_id), "version": {"$in": [None, 0]}}
+
+    @asynccontextmanager
+    async def _stat_write(self):
+        """Approve or unapprove in the block; replay and season rollover wait for it, or it fails with ConflictError while one runs."""
+        try:
+            async with StatWriteGate(self.db).writing(STAT_WRITE_TTL_SECONDS):
+                yield
+        except LeaseUnavailableError as e:
+            raise ConflictError(str(e))
+
+    @staticmethod
+    def _is_conflict(e: PyMongoError) -> bool:
+        # a version-filtered upsert on a stat table (always a bulk write) whose document
+        # was rated meanwhile misses the filter and collides on the player's key
+        if isinstance(e, BulkWriteError):
+            return any(err.get("code") == 11000 for err in e.details.get("writeErrors", []))
+        return e.has_error_label("TransientTransactionError")
+
+    @staticmethod
+    async def _commit(session) -> None:
+        """
+        Commit a transaction, retrying while its outcome is unknown (the
+        server deduplicates the retried commit). Other errors are raised
+        as-is: the ``start_transaction`` block aborts on exception, except
+        after a commit, which must not be aborted.
+        """
+        for attempt in range(settings.approve_max_retries):
+            try:
+                return await session.commit_transaction()
+            except PyMongoError as e:
+                if not e.has_error_label("UnknownTransactionCommitResult") or attempt == settings.approve_max_retries - 1:
+                    raise
+
+    async def approve_match(self, match_id: str, approver_discord_id: str) -> Dict[str, Any]:
+        """
+        Approve a pending match and apply its rating changes.
+
+        Stat documents carry a ``version`` that every approval increments;
+        writes are conditioned on the version that was read, so approvals on
+        disjoint players proceed in parallel (across processes too) and a
+        conflicting one is retried from fresh reads.
+        """
+        oid = self._to_oid(match_id)
+        for attempt in range(settings.approve_max_retries):
+            try:
+                async with self._stat_write():
+                    return await self._approve_once(oid, approver_discord_id)
+            except ConflictError as e:
+                logger.info(f"🔁 Approval of match {match_id} conflicted (attempt {attempt + 1}): {e}")
+                await asyncio.sleep(random.uniform(0, 0.05 * (attempt + 1)))
+        raise ConflictError(f"Match {match_id} could not be approved after {settings.approve_max_retries} conflicting attempts")
+
+    async def _approve_once(self, oid: ObjectId, approver_discord_id: str) -> Dict[str, Any]:
+        res = await self.pending_matches.find_one({"_id": oid})
+        if res == None:
+            raise NotFoundError("Match not found")
+        match = MatchModel(**res)
+        for i, player in enumerate(match.players):
+            if player.discord_id == None:
+                raise MatchServiceError(f"Player {player.user_name} has no linked Discord ID")
+        players_ranking, players_season_ranking = await self.get_match_rankings(match)
+        match, post = self.update_player_stats(match, players_ranking, "delta")
+        match, season_post = self.update_player_stats(match, players_season_ranking, "season_delta")
+        match.approved_at = datetime.now(UTC)
+        match.approver_discord_id = approver_discord_id
+        stats_table = self.get_stat_table(match.is_cloud, match.game_mode, match.game, is_seasonal=False)
+        season_stats_table = self.get_stat_table(match.is_cloud, match.game_mode, match.game, is_seasonal=True)
+        # Build every write up front so the transaction is only round trips.
+        # Keyed by player so a Discord ID listed twice is written once (last wins).
+        stats_ops = {}
+        season_stats_ops = {}
+        rows, season_rows = {}, {}
+        subs_in = defaultdict(int)
+        for i, player in enumerate(match.players):
+            player_stats_update = self.get_player_stats_update(match, player, post[i], "delta")
+            player_season_stats_update = self.get_player_stats_update(match, player, season_post[i], "season_delta")
+            stats_ops[player.discord_id] = UpdateOne(
+                scoped(stats_table, self.version_filter(player.discord_id, players_ranking[i].version)), player_stats_update, upsert=True
+            )
+            season_stats_ops[player.discord_id] = UpdateOne(
+                scoped(season_stats_table, self.version_filter(player.discord_id, players_season_ranking[i].version)), player_season_stats_update, upsert=True
+            )
+            rows[player.discord_id] = self.stat_row(players_ranking[i], player_stats_update)
+            season_rows[player.discord_id] = self.stat_row(players_season_ranking[i], player_season_stats_update)
+            if player.is_sub:
+                subs_in[player.discord_id] += 1
+        subs_ops = [
+            UpdateOne({"_id": discord_id}, {"$inc": {"subs_in": count}}, upsert=True)
+            for discord_id, count in subs_in.items()
+        ]
+        # A session must not be used by concurrent operations, so the
+        # bulk writes are issued back to back rather than gathered.
+        session = await self.db.start_session()
+        async with session:
+            async with session.start_transaction():
+                try:
+                    await stats_table.bulk_write(list(stats_ops.values()), session=session)
+                    await season_stats_table.bulk_write(list(season_stats_ops.values()), session=session)
+                    if subs_ops:
+                        await self.subs_table.bulk_write(subs_ops, ordered=False, session=session)
+                    validated = await self.validated_matches.insert_one(match.dict(), session=session)
+                    deleted = await self.pending_matches.delete_one({"_id": oid}, session=session)
+                    if deleted.deleted_count == 0:
+                        # approved (or deleted) concurrently by someone else
+                        raise NotFoundError("Match not found")
+                    await self._commit(session)
+                except PyMongoError as e:
+                    if self._is_conflict(e):
+                        raise ConflictError(f"Ratings changed while approving: {e}")
+                    logger.exception(f"🔴 An error occurred while writing to DB: {e}")
+                    raise MatchServiceError(f"An error occured during writing to DB: {e}")
+        # Outside the transaction on purpose: a shared counter would make every
+        # approval on the same stat table conflict. A preview read in between
+        # keeps the old version in its key and is recomputed after the bump.
+        # The version check guarantees pre + update is exactly what was stored
+        self.publish_stat_rows(stats_table, list(rows.values()))
+        self.publish_stat_rows(season_stats_table, list(season_rows.values()))
+        await self.bump_rating_versions([stats_table, season_stats_table])
+        await self.record_series(stats_table, self.series_points(match, validated.inserted_id, "delta"))
+        await self.record_series(season_stats_table, self.series_points(match, validated.inserted_id, "season_delta"))
+        await self.record_head_to_head(stats_table, [match])
+        await self.record_head_to_head(season_stats_table, [match])
+        await self.record_civ_stats(stats_table, rollup_of([match], "delta"))
+        await self.record_civ_stats(season_stats_table, rollup_of([match], "season_delta"))
+        logger.info(f"✅ 🔄 Match {oid} approved")
+        return {"match_id": str(validated.inserted_id), **match.dict()}
+
+    @staticmethod
+    def _batch_filter(filters: Dict[str, Any]) -> Dict[str, Any]:
+        query = {}
+        for field in ("game", "game_mode", "is_cloud"):
+            if filters.get(field) is not None:
+                query[field] = filters[field]
+        created = {}
+        if filters.get("created_after") is not None:
+            created["$gte"] = filters["created_after"]
+        if filters.get("created_before") is not None:
+            created["$lt"] = filters["created_before"]
+        if created:
+            query["created_at"] = created
+        return query
+
+    async def approve_matches(self, approver_discord_id: str, match_ids: List[str] = None, filters: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Approve many pending matches, oldest first.
+
+        Matches are grouped by the stat tables they rate (game, mode, cloud).
+        Within a group every match is rated on top of the previous ones
+        through a RatingLedger, and each chunk of
+        ``settings.batch_approve_chunk_size`` matches is committed in one
+        transaction with one versioned update per player and table. A
+        conflicting chunk is re-read and retried like a single approval.
+        Returns one outcome per match instead of failing the whole batch.
+        """
+        outcomes: Dict[str, Dict[str, Any]] = {}
+        order: List[str] = []
+        if match_ids is not None:
+            oids = []
+            for match_id in match_ids:
+                order.append(match_id)
+                try:
+                    oids.append(self._to_oid(match_id))
+                except InvalidIDError:
+                    outcomes[match_id] = {"match_id": match_id, "status": "invalid_id", "detail": "Invalid match ID"}
+            query = {"_id": {"$in": oids}}
+        else:
+            query = self._batch_filter(filters or {})
+        cursor = self.pending_matches.find(query).sort([("created_at", 1), ("_id", 1)]).limit(settings.batch_approve_max_matches)
+        docs = await cursor.to_list(length=None)
+        groups = defaultdict(list)
+        for doc in docs:
+            groups[(doc.get("game"), doc.get("game_mode"), doc.get("is_cloud"))].append(doc)
+            if match_ids is None:
+                order.append(str(doc["_id"]))
+        for group_docs in groups.values():
+            try:
+                # one registration for the whole group: its ledgers carry ratings read by earlier chunks
+                async with self._stat_write():
+                    await self._approve_group(group_docs, approver_discord_id, outcomes)
+            except ConflictError as e:
+                for doc in group_docs:
+                    match_id = str(doc["_id"])
+                    outcomes.setdefault(match_id, {"match_id": match_id, "status": "conflict", "detail": str(e)})
+        results = []
+        for match_id in order:
+            results.append(outcomes.get(match_id) or {"match_id": match_id, "status": "not_found", "detail": "Match not found"})
+        approved = sum(1 for r in results if r["status"] == "approved")
+        logger.info(f"✅ 🔄 Batch approval: {approved}/{len(results)} matches approved")
+        return {"results": results}
+
+    async def _approve_group(self, docs: List[Dict[str, Any]], approver_discord_id: str, outcomes: Dict[str, Dict[str, Any]]) -> None:
+        first = MatchModel(**docs[0])
+        stats_table = self.get_stat_table(first.is_cloud, first.game_mode, first.game, is_seasonal=False)
+        season_stats_table = self.get_stat_table(first.is_cloud, first.game_mode, first.game, is_seasonal=True)
+        ledger = RatingLedger(stats_table)
+        season_ledger = RatingLedger(season_stats_table)
+        chunk_size = settings.batch_approve_chunk_size
+        for start in range(0, len(docs), chunk_size):
+            chunk = docs[start:start + chunk_size]
+            failure = None
+            for attempt in range(settings.approve_max_retries):
+                try:
+                    if attempt:
+                        # re-read: matches may have been edited, approved or deleted meanwhile
+                        cursor = self.pending_matches.find({"_id": {"$in": [d["_id"] for d in chunk]}})
+                        chunk = await cursor.sort([("created_at", 1), ("_id", 1)]).to_list(length=None)
+                    await self._approve_chunk(chunk, ledger, season_ledger, approver_discord_id, outcomes)
+                    failure = None
+                    break
+                except ConflictError as e:
+                    logger.info(f"🔁 Batch approval chunk conflicted (attempt {attempt + 1}): {e}")
+                    ledger.reset()
+                    season_ledger.reset()
+                    failure = ("conflict", str(e))
+                    await asyncio.sleep(random.uniform(0, 0.05 * (attempt + 1)))
+                except MatchServiceError as e:
+                    failure = ("error", str(e))
+                    break
+            if failure:
+                # later matches must not be rated without the ones before them
+                status, detail = failure
+                for doc in docs[start:]:
+                    match_id = str(doc["_id"])
+                    outcomes.setdefault(match_id, {"match_id": match_id, "status": status, "detail": detail})
+                return
+
+    @staticmethod
+    def approval_problem(match: MatchModel) -> Optional[str]:
+        """Why ``match`` cannot be rated, or None."""
+        missing = [p.user_name for p in match.players if p.discord_id == None]
+        if missing:
+            return f"Players without linked Discord ID: {missing}"
+        if len({p.team for p in match.players}) < 2:
+            return "Match has less than 2 teams"
+        return None
+
+    def rate_into_ledger(self, match: MatchModel, ledger: RatingLedger, delta_value_name: str, modified_at: datetime = None) -> None:
+        """
+        Rate ``match`` on the ratings held in ``ledger`` and apply the updates
+        to it, so the next match sees the post ratings. Sets the match's
+        ``delta_value_name`` on each player, like update_player_stats.
+        """
+        players_ranking = [self.to_stat_model(ledger.get(p.discord_id), p.discord_id, i) for i, p in enumerate(match.players)]
+        match, post = self.update_player_stats(match, players_ranking, delta_value_name)
+        # keyed by player so a Discord ID listed twice is applied once, like approve_match
+        updates = {}
+        for i, player in enumerate(match.players):
+            updates[player.discord_id] = self.get_player_stats_update(match, player, post[i], delta_value_name)
+            if modified_at is not None:
+                updates[player.discord_id]["$set"]["lastModified"] = modified_at
+        for discord_id, update in updates.items():
+            ledger.apply(discord_id, update)
+
+    async def _approve_chunk(self, docs: List[Dict[str, Any]], ledger: RatingLedger, season_ledger: RatingLedger,
+                             approver_discord_id: str, outcomes: Dict[str, Dict[str, Any]]) -> None:
+        discord_ids = {p.get("discord_id") for doc in docs for p in doc["players"]}
+        await asyncio.gather(ledger.load(discord_ids), season_ledger.load(discord_ids))
+        chunk_outcomes = {}
+        approved: List[Tuple[ObjectId, MatchModel]] = []
+        subs_in = defaultdict(int)
+        for doc in docs:
+            match_id = str(doc["_id"])
+            match = MatchModel(**doc)
+            problem = self.approval_problem(match)
+            if problem:
+                chunk_outcomes[match_id] = {"match_id": match_id, "status": "error", "detail": problem}
+                continue
+            self.rate_into_ledger(match, ledger, "delta")
+            self.rate_into_ledger(match, season_ledger, "season_delta")
             match.approved_at = datetime.now(UTC)
             match.approver_discord_id = approver_discord_id
-            stats_table = self.get_stat_table(match.is_cloud, match.game_mode, match.game, is_seasonal=False)
-            season_stats_table = self.get_stat_table(match.is_cloud, match.game_mode, match.game, is_seasonal=True)
+            for player in match.players:
+                if player.is_sub:
+                    subs_in[player.discord_id] += 1
+            approved.append((doc["_id"], match))
+        if approved:
+            stats_ops = [UpdateOne(scoped(ledger.stat_table, self.version_filter(d, v)), u, upsert=True) for d, v, u in ledger.changes()]
+            season_stats_ops = [UpdateOne(scoped(season_ledger.stat_table, self.version_filter(d, v)), u, upsert=True) for d, v, u in season_ledger.changes()]
+            subs_ops = [
+                UpdateOne({"_id": discord_id}, {"$inc": {"subs_in": count}}, upsert=True)
+                for discord_id, count in subs_in.items()
+            ]
             session = await self.db.start_session()
             async with session:
                 async with session.start_transaction():
                     try:
-                        for i, player in enumerate(match.players):
-                            player_stats_db = self.get_player_stats_db(match, player, post[i], "delta")
-                            player_season_stats_db = self.get_player_stats_db(match, player, season_post[i], "season_delta")
-                            await stats_table.replace_one({"_id": Int64(player.discord_id)}, player_stats_db, upsert=True, session=session)
-                            await season_stats_table.replace_one({"_id": Int64(player.discord_id)}, player_season_stats_db, upsert=True, session=session)
-                            if player.is_sub:
-                                await self.subs_table.update_one(
-                                    {"_id": player.discord_id},
-                                    {"$inc": {"subs_in": 1}},
-                                    upsert=True,
-                                    session=session
-                                )
-                        validated = await self.validated_matches.insert_one(match.dict(), session=session)
-                        await self.pending_matches.delete_one({"_id": oid}, session=session)
-                        # Commit the transaction
-                        await session.commit_transaction()
-                    except Exception as e:
-                        # Abort the transaction in case of an error
-                        print("An error occurred while writing to DB:", e)
-                        await session.abort_transaction()
+                        await ledger.stat_table.bulk_write(stats_ops, session=session)
+                        await season_ledger.stat_table.bulk_write(season_stats_ops, session=session)
+                        if subs_ops:
+                            await self.subs_table.bulk_write(subs_ops, ordered=False, session=session)
+                        validated = await self.validated_matches.insert_many([m.dict() for _, m in approved], session=session)
+                        deleted = await self.pending_matches.delete_many({"_id": {"$in": [oid for oid, _ in approved]}}, session=session)
+                        if deleted.deleted_count != len(approved):
+                            raise ConflictError("Some matches were approved or deleted concurrently")
+                        await self._commit(session)
+                    except PyMongoError as e:
+                        if self._is_conflict(e):
+                            raise ConflictError(f"Ratings changed while approving: {e}")
+                        logger.exception(f"🔴 An error occurred while writing to DB: {e}")
                         raise MatchServiceError(f"An error occured during writing to DB: {e}")
-            logger.info(f"✅ 🔄 Match {match_id} approved")
-            return {"match_id": str(validated.inserted_id), **match.dict()}
-        
-    async def get_leaderboard(self, is_cloud: str, game: str, game_mode: str, is_seasonal: bool) -> Dict[str, Any]:
+            touched = [discord_id for discord_id, _, _ in ledger.changes()]
+            season_touched = [discord_id for discord_id, _, _ in season_ledger.changes()]
+            ledger.commit()
+            season_ledger.commit()
+            self.publish_stat_rows(ledger.stat_table, [ledger.get(d) for d in touched])
+            self.publish_stat_rows(season_ledger.stat_table, [season_ledger.get(d) for d in season_touched])
+            await self.bump_rating_versions([ledger.stat_table, season_ledger.stat_table])
+            validated_ids = list(zip(approved, validated.inserted_ids))
+            await self.record_series(ledger.stat_table, [point for (_, m), v in validated_ids for point in self.series_points(m, v, "delta")])
+            await self.record_series(season_ledger.stat_table, [point for (_, m), v in validated_ids for point in self.series_points(m, v, "season_delta")])
+            await self.record_head_to_head(ledger.stat_table, [m for _, m in approved])
+            await self.record_head_to_head(season_ledger.stat_table, [m for _, m in approved])
+            await self.record_civ_stats(ledger.stat_table, rollup_of([m for _, m in approved], "delta"))
+            await self.record_civ_stats(season_ledger.stat_table, rollup_of([m for _, m in approved], "season_delta"))
+            for (oid, match), validated_id in validated_ids:
+                chunk_outcomes[str(oid)] = {
+                    "match_id": str(oid),
+                    "status": "approved",
+                    "validated_match_id": str(validated_id),
+                    "players": [p.dict() for p in match.players],
+                }
+        outcomes.update(chunk_outcomes)
+
+    async def unapprove_match(self, match_id: str, approver_discord_id: str) -> Dict[str, Any]:
+        """
+        Revert an approved match and move it back to pending.
+
+        Approvals store each player's rating before and after the match
+        (``rating``/``season_rating``). When no later match touched the
+        players, their stat documents are put back from those snapshots in
+        one write per player. Otherwise the later matches of the affected
+        players, and transitively of everyone they played with, are unwound
+        newest first and rated again without the reverted match, and their
+        deltas and snapshots are rewritten. Writes are versioned and retried
+        on conflict like approvals.
+        """
+        oid = self._to_oid(match_id)
+        for attempt in range(settings.approve_max_retries):
+            try:
+                async with self._stat_write():
+                    return await self._unapprove_once(oid, approver_discord_id)
+            except ConflictError as e:
+                logger.info(f"🔁 Unapproval of match {match_id} conflicted (attempt {attempt + 1}): {e}")
+                await asyncio.sleep(random.uniform(0, 0.05 * (attempt + 1)))
+        raise ConflictError(f"Match {match_id} could not be unapproved after {settings.approve_max_retries} conflicting attempts")
+
+    async def _revert_ledgers(self, match: MatchModel) -> List[Tuple[str, RatingLedger]]:
+        """``(delta_value_name, ledger)`` of every stat table ``match`` was rated in."""
+        if match.approved_at is None or any(p.rating is None for p in match.players):
+            raise MatchServiceError("Match was approved before rating snapshots were recorded; rebuild its stat table with `python -m app replay`")
+        ledgers = [("delta", RatingLedger(self.get_stat_table(match.is_cloud, match.game_mode, match.game, is_seasonal=False)))]
+        # matches of archived seasons are no longer in the live seasonal table
+        season_started_at = await current_season_start(self.db)
+        if season_started_at is not None and season_started_at.tzinfo is not None:
+            season_started_at = season_started_at.astimezone(UTC).replace(tzinfo=None)
+        in_season = season_started_at is None or match.approved_at.replace(tzinfo=None) >= season_started_at
+        if in_season and all(p.season_rating is not None for p in match.players):
+            ledgers.append(("season_delta", RatingLedger(self.get_stat_table(match.is_cloud, match.game_mode, match.game, is_seasonal=True))))
+        return ledgers
+
+    async def _later_matches(self, match: MatchModel, oid: ObjectId) -> List[Tuple[ObjectId, MatchModel]]:
+        """Matches rated after ``match`` that depend on its players' ratings, in approval order."""
+        query = {
+            "game": match.game, "game_mode": match.game_mode, "is_cloud": match.is_cloud,
+            "$or": [{"approved_at": {"$gt": match.approved_at}}, {"approved_at": match.approved_at, "_id": {"$gt": oid}}],
+        }
+        affected = {p.discord_id for p in match.players}
+        later = []
+        async for doc in self.validated_matches.find(query).sort([("approved_at", 1), ("_id", 1)]):
+            players = {p.get("discord_id") for p in doc["players"]}
+            if players & affected:
+                if len(later) >= settings.unapprove_max_replay_matches:
+                    raise MatchServiceError(f"Reverting this match would re-rate more than {settings.unapprove_max_replay_matches} later matches; use `python -m app replay`")
+                affected |= players
+                later.append((doc["_id"], MatchModel(**doc)))
+        return later
+
+    async def _unapprove_once(self, oid: ObjectId, approver_discord_id: str) -> Dict[str, Any]:
+        doc = await self.validated_matches.find_one({"_id": oid})
+        if doc == None:
+            raise NotFoundError("Match not found")
+        match = MatchModel(**doc)
+        ledgers = await self._revert_ledgers(match)
+        discord_ids = {p.discord_id for p in match.players}
+        await asyncio.gather(*(ledger.load(discord_ids) for _, ledger in ledgers))
+        touched_later = any(
+            (ledger.get(p.discord_id) or {}).get("version") != getattr(p, SNAPSHOT_FIELDS[delta_value_name]).version
+            for delta_value_name, ledger in ledgers
+            for p in match.players
+        )
+        later = await self._later_matches(match, oid) if touched_later else []
+        if later:
+            discord_ids = {p.discord_id for _, m in later for p in m.players}
+            await asyncio.gather(*(ledger.load(discord_ids) for _, ledger in ledgers))
+        # civ stats counted the stored deltas, which re-rating changes
+        civ_stats_before = {name: rollup_of([match] + [m for _, m in later], name, sign=-1) for name, _ in ledgers}
+        for delta_value_name, ledger in ledgers:
+            # newest first back to each player's rating before their first affected match
+            for m in [m for _, m in reversed(later)] + [match]:
+                reverts = {}
+                for player in m.players:
+                    if getattr(player, SNAPSHOT_FIELDS[delta_value_name]) is None:
+                        raise MatchServiceError("A later match was approved before rating snapshots were recorded; use `python -m app replay`")
+                    reverts[player.discord_id] = self.get_player_stats_revert(m, player, delta_value_name)
+                for discord_id, update in reverts.items():
+                    ledger.apply(discord_id, update)
+            for _, m in later:
+                self.rate_into_ledger(m, ledger, delta_value_name)
+        subs_ops = [
+            UpdateOne({"_id": player.discord_id}, {"$inc": {"subs_in": -1}})
+            for player in match.players if player.is_sub
+        ]
+        later_ops = [UpdateOne({"_id": later_oid}, {"$set": {"players": [p.dict() for p in m.players]}}) for later_oid, m in later]
+        pending = MatchModel(**{**match.dict(), "approved_at": None, "approver_discord_id": None})
+        for player in pending.players:
+            player.rating = None
+            player.season_rating = None
+        session = await self.db.start_session()
+        async with session:
+            async with session.start_transaction():
+                try:
+                    for _, ledger in ledgers:
+                        ops = [UpdateOne(scoped(ledger.stat_table, self.version_filter(d, v)), u, upsert=True) for d, v, u in ledger.changes()]
+                        await ledger.stat_table.bulk_write(ops, session=session)
+                    if subs_ops:
+                        await self.subs_table.bulk_write(subs_ops, ordered=False, session=session)
+                    if later_ops:
+                        await self.validated_matches.bulk_write(later_ops, ordered=False, session=session)
+                    deleted = await self.validated_matches.delete_one({"_id": oid}, session=session)
+                    if deleted.deleted_count == 0:
+                        # unapproved concurrently by someone else
+                        raise NotFoundError("Match not found")
+                    try:
+                        inserted = await self.pending_matches.insert_one(pending.dict(), session=session)
+                    except DuplicateKeyError:
+                        # the same save was reported again after the approval
+                        duplicate = await self.pending_matches.find_one({"save_file_hash": pending.save_file_hash}, {"_id": 1}, session=session)
+                        raise MatchServiceError(f"The same save is pending as match {duplicate['_id'] if duplicate else 'unknown'}; delete that report first")
+                    await self._commit(session)
+                except PyMongoError as e:
+                    if self._is_conflict(e):
+                        raise ConflictError(f"Ratings changed while unapproving: {e}")
+                    logger.exception(f"🔴 An error occurred while writing to DB: {e}")
+                    raise MatchServiceError(f"An error occured during writing to DB: {e}")
+        series = RatingSeries(self.db)
+        for delta_value_name, ledger in ledgers:
+            touched = [discord_id for discord_id, _, _ in ledger.changes()]
+            ledger.commit()
+            self.publish_stat_rows(ledger.stat_table, [ledger.get(d) for d in touched])
+            rerated = {(later_oid, d): (mu, sigma) for later_oid, m in later for d, _, mu, sigma, _ in self.series_points(m, later_oid, delta_value_name)}
+            try:
+                await series.revise(ledger.stat_table.full_name, touched, oid, rerated)
+            except PyMongoError as e:
+                logger.exception(f"⚠️ Could not revise rating series of {ledger.stat_table.full_name}: {e}")
+            await self.record_head_to_head(ledger.stat_table, [match], sign=-1)
+            await self.record_civ_stats(ledger.stat_table, merge_rollups(civ_stats_before[delta_value_name], rollup_of([m for _, m in later], delta_value_name)))
+        await self.bump_rating_versions([ledger.stat_table for _, ledger in ledgers])
+        logger.info(f"✅ ↩️ Match {oid} unapproved by {approver_discord_id}, {len(later)} later matches re-rated")
+        return {"match_id": str(inserted.inserted_id), **pending.dict()}
+
+    async def get_seasons(self) -> Dict[str, Any]:
+        return {"seasons": [self._season_response(doc) for doc in await list_seasons(self.db)]}
+
+    async def rollover_season(self, approver_discord_id: str, name: Optional[str] = None) -> Dict[str, Any]:
+        """Archive the seasonal stat tables and start the next season (see app/seasons.py)."""
+        try:
+            res = await rollover(self.db, name=name)
+        except LeaseUnavailableError as e:
+            raise ConflictError(f"Stat tables are being rebuilt or rolled over, or approvals are in flight: {e}")
+        # publish() does not call back into this worker for its own bump
+        for database, collection in stat_collections():
+            if database.endswith("_season_stats"):
+                leaderboards.invalidate(f"{database}.{collection}")
+                ratings.invalidate(f"{database}.{collection}")
+        logger.info(f"✅ 🗓️ Season rollover by {approver_discord_id}")
+        return {"archived": self._season_response(res["archived"]), "current": self._season_response(res["current"])}
+
+    @staticmethod
+    def _season_response(doc: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "season": doc["_id"],
+            "name": doc.get("name"),
+            "started_at": doc.get("started_at"),
+            "ended_at": doc.get("ended_at"),
+            "tables": doc.get("tables"),
+        }
+
+    async def _resolve_stat_table(self, is_cloud: str, game: str, game_mode: str, is_seasonal: bool, season: Optional[int] = None):
+        """The live stat table, or the archived one of a past ``season``."""
         stats_table = self.get_stat_table(is_cloud == "PBC", game_mode, game, is_seasonal=is_seasonal)
-        cursor = stats_table.find({ "games": { "$gt": 2 } }).sort([("mu", -1), ("sigma", 1)]).limit(100)
-        leaderboard = []
-        async for doc in cursor:
-            leaderboard.append({
-                "discord_id": str(doc["_id"]),
+        # only known tables: each one read gets a leaderboard kept in memory
+        if split_name(stats_table.full_name) not in stat_collections():
+            raise MatchServiceError(f"Unknown game or game mode: {game} {game_mode}")
+        if season is None:
+            return stats_table
+        if not is_seasonal:
+            raise MatchServiceError("A season can only be given for seasonal stats")
+        seasons = {doc["_id"]: doc for doc in await list_seasons(self.db)}
+        if season not in seasons:
+            raise MatchServiceError(f"Unknown season {season}")
+        if seasons[season].get("ended_at") is None:
+            return stats_table
+        database, collection = split_name(stats_table.full_name)
+        archive = archive_table(self.db, database, season, collection)
+        return stat_table(self.db, archive.database.name, archive.name)
+
+    async def get_leaderboard(self, is_cloud: str, game: str, game_mode: str, is_seasonal: bool, order: str = "mu", season: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Top players of a stat table by ``order`` ("mu" or "skill"), served from
+        the in-memory leaderboard, with its ETag. Archived seasons are cached
+        the same way and never change.
+        """
+        stats_table = await self._resolve_stat_table(is_cloud, game, game_mode, is_seasonal, season)
+        leaderboard, etag = await leaderboards.get(stats_table, order)
+        return {**leaderboard, "etag": etag}
+
+    @staticmethod
+    def _cursor_scope(stats_table, min_games: int, active_since: Optional[datetime], civ: Optional[str]) -> str:
+        # ties a continuation token to the table and filters it was issued for
+        scope = [stats_table.full_name, min_games, active_since.isoformat() if active_since else None, civ]
+        return hashlib.sha256(json.dumps(scope).encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def _encode_cursor(doc: Dict[str, Any], scope: str) -> str:
+        payload = json.dumps({"mu": doc["mu"], "sigma": doc["sigma"], "id": int(doc["_id"]), "scope": scope})
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def _decode_cursor(cursor: str, scope: str) -> Dict[str, Any]:
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            valid = position["scope"] == scope
+            mu, sigma, discord_id = float(position["mu"]), float(position["sigma"]), Int64(position["id"])
+        except Exception:
+            valid = False
+        if not valid:
+            raise MatchServiceError("Invalid or expired cursor")
+        # strictly after the last row of the previous page in (mu desc, sigma asc, _id asc)
+        return {"$or": [
+            {"mu": {"$lt": mu}},
+            {"mu": mu, "sigma": {"$gt": sigma}},
+            {"mu": mu, "sigma": sigma, "_id": {"$gt": discord_id}},
+        ]}
+
+    async def browse_leaderboard(self, is_cloud: str, game: str, game_mode: str, is_seasonal: bool, page_size: int,
+                                 min_games: int, active_since: Optional[datetime] = None, civ: Optional[str] = None,
+                                 cursor: Optional[str] = None, season: Optional[int] = None) -> Dict[str, Any]:
+        """
+        One page of the full leaderboard, ordered by mu desc, sigma asc, _id asc.
+
+        Keyset pagination: the continuation token is the last row's sort key,
+        so every page is an index range scan (see the ``leaderboard_keyset``
+        and ``civs`` indexes, also built on archived seasons) whatever its
+        depth, instead of a skip.
+        """
+        stats_table = await self._resolve_stat_table(is_cloud, game, game_mode, is_seasonal, season)
+        query: Dict[str, Any] = {"games": {"$gte": min_games}}
+        if active_since is not None:
+            query["lastModified"] = {"$gte": active_since}
+        if civ is not None:
+            if not re.fullmatch(r"\w+", civ):
+                raise MatchServiceError("Invalid civ")
+            query[f"civs.{civ}"] = {"$gt": 0}
+        scope = self._cursor_scope(stats_table, min_games, active_since, civ)
+        if cursor:
+            query = {"$and": [query, self._decode_cursor(cursor, scope)]}
+        docs = await stats_table.find(
+            query, {"mu": 1, "sigma": 1, "skill": 1, "games": 1, "wins": 1, "first": 1},
+        ).sort([("mu", -1), ("sigma", 1), ("_id", 1)]).limit(page_size + 1).to_list(length=None)
+        page = docs[:page_size]
+        return {
+            "rankings": [
+                {
+                    "discord_id": str(doc["_id"]),
+                    "rating": int(doc["mu"]),
+                    "games_played": doc["games"],
+                    "wins": doc["wins"],
+                    "first": doc["first"],
+                    "skill": None if doc.get("skill") is None else int(doc["skill"]),
+                }
+                for doc in page
+            ],
+            "next_cursor": self._encode_cursor(page[-1], scope) if len(docs) > page_size else None,
+        }
+
+    async def _rating_table(self, is_cloud: str, game: str, game_mode: str, is_seasonal: bool, season: Optional[int] = None):
+        stats_table = await self._resolve_stat_table(is_cloud, game, game_mode, is_seasonal, season)
+        return await ratings.get(stats_table)
+
+    async def get_rating_series(self, is_cloud: str, game: str, game_mode: str, is_seasonal: bool, discord_id: str,
+                                since: Optional[datetime] = None, max_points: Optional[int] = None, season: Optional[int] = None) -> Dict[str, Any]:
+        """A player's rating after each approved match in a stat table, oldest first, optionally downsampled."""
+        stats_table = await self._resolve_stat_table(is_cloud, game, game_mode, is_seasonal, season)
+        self._to_discord_key(discord_id)
+        series = await RatingSeries(self.db).read(stats_table.full_name, discord_id, since=since, max_points=max_points)
+        return {"discord_id": discord_id, **series}
+
+    async def get_head_to_head(self, is_cloud: str, game: str, game_mode: str, is_seasonal: bool, discord_id: str, opponent_discord_id: str,
+                               season: Optional[int] = None) -> Dict[str, Any]:
+        stats_table = await self._resolve_stat_table(is_cloud, game, game_mode, is_seasonal, season)
+        self._to_discord_key(discord_id)
+        self._to_discord_key(opponent_discord_id)
+        record = await HeadToHead(self.db).pair(stats_table.full_name, discord_id, opponent_discord_id)
+        if record is None:
+            record = {"discord_id": opponent_discord_id, "games": 0, "wins": 0, "losses": 0, "draws": 0}
+        return {"discord_id": discord_id, "opponent": record}
+
+    async def get_rivals(self, is_cloud: str, game: str, game_mode: str, is_seasonal: bool, discord_id: str, limit: int,
+                         season: Optional[int] = None) -> Dict[str, Any]:
+        stats_table = await self._resolve_stat_table(is_cloud, game, game_mode, is_seasonal, season)
+        self._to_discord_key(discord_id)
+        return {"discord_id": discord_id, "rivals": await HeadToHead(self.db).rivals(stats_table.full_name, discord_id, limit)}
+
+    async def get_civ_stats(self, is_cloud: str, game: str, game_mode: str, is_seasonal: bool, map_type: Optional[str] = None,
+                            season: Optional[int] = None) -> Dict[str, Any]:
+        stats_table = await self._resolve_stat_table(is_cloud, game, game_mode, is_seasonal, season)
+        return await CivStats(self.db).summary(stats_table.full_name, map_type=map_type)
+
+    async def get_player_profile(self, game: str, discord_id: str) -> Dict[str, Any]:
+        """
+        A player's rating in every stat table of ``game``, archived seasons
+        included: one indexed query in the unified stats layout, one per
+        table otherwise.
+        """
+        if game not in STAT_GAMES:
+            raise MatchServiceError(f"Unknown game {game}")
+        self._to_discord_key(discord_id)
+        tables = [(database, collection) for database, collection in stat_collections() if database.startswith(f"{game}_")]
+        for season in await list_seasons(self.db):
+            if season.get("ended_at") is None:
+                continue
+            for name in season.get("tables") or {}:
+                database, collection = split_name(name)
+                if database.startswith(f"{game}_"):
+                    archive = archive_table(self.db, database, season["_id"], collection)
+                    tables.append((archive.database.name, archive.name))
+        docs = await profile(self.db, game, discord_id, tables)
+        rows = [
+            {
+                "table": doc["ledger"],
                 "rating": int(doc["mu"]),
-                "games_played": doc["games"],
-                "wins": doc["wins"],
-                "first": doc["first"],
-            })
-        return {"rankings": leaderboard}
\ No newline at end of file
+                "sigma": doc["sigma"],
+                "games_played": doc.get("games", 0),
+                "wins": doc.get("wins", 0),
+                "first": doc.get("first", 0),
+                "skill": None if doc.get("skill") is None else int(doc["skill"]),
+            }
+            for doc in docs
+            if doc.get("mu") is not None
+        ]
+        return {"discord_id": discord_id, "ratings": sorted(rows, key=lambda row: row["table"])}
+
+    async def balance_teams(self, is_cloud: str, game: str, game_mode: str, is_seasonal: bool, discord_ids: List[str], teams: int, limit: int = 5) -> Dict[str, Any]:
+        """
+        The ``limit`` splits of ``discord_ids`` into ``teams`` equal teams with
+        the highest TrueSkill quality, by the players' ratings in a stat table
+        (app/services/team_balance.py). Unrated players count as new ones.
+        """
+        if len(set(discord_ids)) != len(discord_ids):
+            raise MatchServiceError("Duplicate discord ID")
+        if not 2 <= teams <= len(discord_ids) or len(discord_ids) % teams:
+            raise MatchServiceError(f"{len(discord_ids)} players can not be split into {teams} equal teams")
+        if len(discord_ids) > MAX_BALANCE_PLAYERS:
+            raise MatchServiceError(f"At most {MAX_BALANCE_PLAYERS} players can be balanced")
+        for discord_id in discord_ids:
+            self._to_discord_key(discord_id)
+        ledger = RatingLedger(self.get_stat_table(is_cloud == "PBC", game_mode, game, is_seasonal=is_seasonal))
+        await ledger.load(discord_ids)
+        docs = [ledger.get(d) or {} for d in discord_ids]
+        mu = np.array([doc.get("mu", settings.ts_mu) for doc in docs], dtype=np.float64)
+        sigma = np.array([doc.get("sigma", settings.ts_sigma) for doc in docs], dtype=np.float64)
+        res = team_balance.balance(mu, sigma, teams, settings.ts_beta, limit)
+        return {
+            "lineups": [
+                {
+                    "teams": team_balance.lineup_teams(assignment, discord_ids, teams),
+                    "quality": score,
+                    "team_mu": [float(mu[assignment == team].sum()) for team in range(teams)],
+                }
+                for assignment, score in res["lineups"]
+            ],
+            "exhaustive": res["exhaustive"],
+            "evaluated": res["evaluated"],
+        }
+
+    @staticmethod
+    def _to_discord_key(discord_id: str) -> int:
+        try:
+            return int(discord_id)
+        except ValueError:
+            raise InvalidIDError("Invalid discord ID")
+
+    async def get_player_rank(self, is_cloud: str, game: str, game_mode: str, is_seasonal: bool, discord_id: str, season: Optional[int] = None) -> Dict[str, Any]:
+        table = await self._rating_table(is_cloud, game, game_mode, is_seasonal, season)
+        pos = table.position(self._to_discord_key(discord_id))
+        if pos is None:
+            raise NotFoundError("Player is not ranked")
+        ranked = len(table)
+        return {
+            **table.rows(pos, pos + 1)[0],
+            "ranked_players": ranked,
+            # share of ranked players rated below this one
+            "percentile": round(100.0 * (ranked - pos - 1) / ranked, 2),
+        }
+
+    async def get_leaderboard_page(self, is_cloud: str, game: str, game_mode: str, is_seasonal: bool, discord_id: str, radius: int, season: Optional[int] = None) -> Dict[str, Any]:
+        table = await self._rating_table(is_cloud, game, game_mode, is_seasonal, season)
+        pos = table.position(self._to_discord_key(discord_id))
+        if pos is None:
+            raise NotFoundError("Player is not ranked")
+        return {"rankings": table.rows(pos - radius, pos + radius + 1), "ranked_players": len(table)}
+
+    async def get_rating_histogram(self, is_cloud: str, game: str, game_mode: str, is_seasonal: bool, bucket_size: int, season: Optional[int] = None) -> Dict[str, Any]:
+        table = await self._rating_table(is_cloud, game, game_mode, is_seasonal, season)
+        return {"buckets": table.histogram(bucket_size), "ranked_players": len(table)}
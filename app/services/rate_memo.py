@@ -0,0 +1,83 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Sequence, Tuple
+
+from trueskill import Rating
+
+class RateMemo:
+    """Bounded LRU cache in front of a TrueSkill environment's ``rate()``.
+
+    Entries are keyed on the team structure, the ranks and the quantized
+    ``(mu, sigma)`` of every player. ``fingerprint`` is evaluated on every
+    call; when it changes (e.g. TrueSkill settings were reloaded) the cache
+    is dropped and a fresh environment is built with ``env_factory``.
+    """
+
+    def __init__(
+        self,
+        env_factory: Callable[[], Any],
+        fingerprint: Callable[[], Hashable],
+        maxsize: int = 4096,
+        quantum: float = 1e-6,
+    ) -> None:
+        self._env_factory = env_factory
+        self._fingerprint = fingerprint
+        self.maxsize = maxsize
+        self.quantum = quantum
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[Hashable, Tuple[Tuple[Tuple[float, float], ...], ...]]" = OrderedDict()
+        self._env = None
+        self._env_fingerprint: Hashable = None
+        self.hits = 0
+        self.misses = 0
+
+    def _current_env(self):
+        fp = self._fingerprint()
+        if self._env is None or fp != self._env_fingerprint:
+            self._env = self._env_factory()
+            self._env_fingerprint = fp
+            self._cache.clear()
+        return self._env
+
+    def _key(self, rating_groups: Sequence[Sequence[Rating]], ranks: Sequence[int]) -> Hashable:
+        q = self.quantum
+        return (
+            tuple(len(g) for g in rating_groups),
+            tuple(ranks),
+            tuple((round(r.mu / q), round(r.sigma / q)) for g in rating_groups for r in g),
+        )
+
+    def rate(self, rating_groups: Sequence[Sequence[Rating]], ranks: Sequence[int]) -> List[Tuple[Rating, ...]]:
+        with self._lock:
+            env = self._current_env()
+            if self.maxsize <= 0:
+                return env.rate(rating_groups, ranks=ranks)
+            key = self._key(rating_groups, ranks)
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+                rated = env.rate(rating_groups, ranks=ranks)
+                cached = tuple(tuple((float(r.mu), float(r.sigma)) for r in team) for team in rated)
+                self._cache[key] = cached
+                if len(self._cache) > self.maxsize:
+                    self._cache.popitem(last=False)
+        return [tuple(Rating(mu, sigma) for mu, sigma in team) for team in cached]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._cache),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+        }
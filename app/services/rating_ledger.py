@@ -0,0 +1,88 @@
+"""
+In-memory view of one stat table used to chain rating updates.
+
+Approving matches in bulk rates match k+1 on top of match k's results.
+The ledger loads each player's stat document once, applies every
+``$inc``/``$set`` update to that copy so the next match reads the post
+ratings from memory, and folds the updates into a single write per
+player, conditioned on the version it loaded.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from bson.int64 import Int64
+
+
+class RatingLedger:
+    def __init__(self, stat_table):
+        self.stat_table = stat_table
+        self.docs: Dict[str, Dict[str, Any]] = {}
+        self.loaded = set()
+        # version each document had when last read from / written to the DB
+        self.base_versions: Dict[str, int] = {}
+        self.incs: Dict[str, Dict[str, int]] = {}
+        self.sets: Dict[str, Dict[str, Any]] = {}
+
+    async def load(self, discord_ids: Iterable[str]) -> None:
+        """Read the stat documents of players not seen yet, in one query."""
+        missing = {d for d in discord_ids if d != None and d not in self.loaded}
+        if not missing:
+            return
+        async for doc in self.stat_table.find({"_id": {"$in": [Int64(d) for d in missing]}}):
+            discord_id = str(doc["_id"])
+            self.docs[discord_id] = doc
+            self.base_versions[discord_id] = doc.get("version") or 0
+        for discord_id in missing:
+            self.base_versions.setdefault(discord_id, 0)
+        self.loaded |= missing
+
+    def get(self, discord_id: str) -> Optional[Dict[str, Any]]:
+        return self.docs.get(discord_id)
+
+    def apply(self, discord_id: str, update: Dict[str, Any]) -> None:
+        """Apply an update to the in-memory document and queue it for writing."""
+        doc = self.docs.setdefault(discord_id, {"_id": Int64(discord_id)})
+        incs = self.incs.setdefault(discord_id, {})
+        for field, value in update.get("$inc", {}).items():
+            incs[field] = incs.get(field, 0) + value
+            parent, key = self._resolve(doc, field)
+            parent[key] = (parent.get(key) or 0) + value
+        sets = self.sets.setdefault(discord_id, {})
+        for field, value in update.get("$set", {}).items():
+            sets[field] = value
+            parent, key = self._resolve(doc, field)
+            parent[key] = value
+
+    @staticmethod
+    def _resolve(doc: Dict[str, Any], field: str) -> Tuple[Dict[str, Any], str]:
+        *path, key = field.split(".")
+        for part in path:
+            if doc.get(part) is None:
+                doc[part] = {}
+            doc = doc[part]
+        return doc, key
+
+    def changes(self) -> List[Tuple[str, int, Dict[str, Any]]]:
+        """``(discord_id, expected_version, update)`` for every player touched since the last commit."""
+        changes = []
+        for discord_id in self.incs.keys() | self.sets.keys():
+            update = {}
+            if self.incs.get(discord_id):
+                update["$inc"] = self.incs[discord_id]
+            if self.sets.get(discord_id):
+                update["$set"] = self.sets[discord_id]
+            changes.append((discord_id, self.base_versions.get(discord_id, 0), update))
+        return changes
+
+    def commit(self) -> None:
+        """The queued changes were written: the in-memory state is now the stored state."""
+        for discord_id in self.incs.keys() | self.sets.keys():
+            self.base_versions[discord_id] = self.docs[discord_id].get("version") or 0
+        self.incs.clear()
+        self.sets.clear()
+
+    def reset(self) -> None:
+        """Drop everything, e.g. after a conflicting write; the next load re-reads from the DB."""
+        self.docs.clear()
+        self.loaded.clear()
+        self.base_versions.clear()
+        self.incs.clear()
+        self.sets.clear()
@@ -0,0 +1,109 @@
+import logging
+from collections import defaultdict
+from datetime import datetime, UTC
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from bson import ObjectId
+from bson.int64 import Int64
+from pymongo import ReplaceOne, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+# (discord_id, approved_at, mu, sigma, validated match id)
+Point = Tuple[str, datetime, float, float, ObjectId]
+
+def month_of(at: datetime) -> str:
+    return at.strftime("%Y-%m")
+
+def bucket_docs(table: str, points: Iterable[Point]) -> List[Dict[str, Any]]:
+    """Bucket documents for ``points`` given in chronological order."""
+    buckets: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for discord_id, at, mu, sigma, match_id in points:
+        key = (discord_id, month_of(at))
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = {"table": table, "player": Int64(discord_id), "month": key[1], "n": 0, "t": [], "mu": [], "sigma": [], "match": []}
+        bucket["t"].append(at)
+        bucket["mu"].append(mu)
+        bucket["sigma"].append(sigma)
+        bucket["match"].append(match_id)
+        bucket["n"] += 1
+    return list(buckets.values())
+
+def downsample(series: Dict[str, List[Any]], max_points: int) -> Dict[str, List[Any]]:
+    """At most ``max_points`` evenly spaced points, always keeping the first and the last."""
+    n = len(series["t"])
+    if n <= max_points:
+        return series
+    keep = np.unique(np.linspace(0, n - 1, max_points).round().astype(int)).tolist()
+    return {field: [values[i] for i in keep] for field, values in series.items()}
+
+class RatingSeries:
+    """
+    Rating over time per player and stat table, in ``match_reporter.rating_series``.
+
+    One document per (table, player, month) holds parallel arrays of
+    approval times, mu, sigma and the validated match that produced each
+    point, in approval order. Approvals append with ``$push``; a player's
+    whole series is one indexed range read (``rating_series`` index).
+    Points are derived data: replay rebuilds them with the stat table.
+    """
+
+    def __init__(self, db):
+        self.collection = db["match_reporter"].rating_series
+
+    async def append(self, table: str, points: List[Point]) -> None:
+        ops = []
+        for bucket in bucket_docs(table, points):
+            ops.append(UpdateOne(
+                {"table": table, "player": bucket["player"], "month": bucket["month"]},
+                {
+                    "$push": {field: {"$each": bucket[field]} for field in ("t", "mu", "sigma", "match")},
+                    "$inc": {"n": bucket["n"]},
+                },
+                upsert=True,
+            ))
+        if ops:
+            await self.collection.bulk_write(ops, ordered=False)
+
+    async def revise(self, table: str, discord_ids: Iterable[str], removed: ObjectId, rerated: Dict[Tuple[ObjectId, str], Tuple[float, float]]) -> None:
+        """
+        After an unapproval: drop the points of match ``removed`` and replace
+        the ratings of re-rated matches (``(match id, discord_id) -> (mu, sigma)``).
+        Each bucket is rewritten only if no approval appended to it meanwhile.
+        """
+        match_ids = [removed] + list({match_id for match_id, _ in rerated})
+        query = {"table": table, "player": {"$in": [Int64(d) for d in discord_ids]}, "match": {"$in": match_ids}}
+        ops = []
+        async for doc in self.collection.find(query):
+            discord_id = str(doc["player"])
+            kept = {"t": [], "mu": [], "sigma": [], "match": []}
+            for at, mu, sigma, match_id in zip(doc["t"], doc["mu"], doc["sigma"], doc["match"]):
+                if match_id == removed:
+                    continue
+                mu, sigma = rerated.get((match_id, discord_id), (mu, sigma))
+                for field, value in (("t", at), ("mu", mu), ("sigma", sigma), ("match", match_id)):
+                    kept[field].append(value)
+            ops.append(ReplaceOne({"_id": doc["_id"], "n": doc["n"]}, {**doc, **kept, "n": len(kept["t"])}))
+        if ops:
+            res = await self.collection.bulk_write(ops, ordered=False)
+            if res.matched_count != len(ops):
+                logger.warning(f"⚠️ {len(ops) - res.matched_count} rating series buckets of {table} changed while revising; replay to rebuild them")
+
+    async def read(self, table: str, discord_id: str, since: Optional[datetime] = None, max_points: Optional[int] = None) -> Dict[str, List[Any]]:
+        if since is not None and since.tzinfo is not None:
+            # stored times are naive UTC
+            since = since.astimezone(UTC).replace(tzinfo=None)
+        query: Dict[str, Any] = {"table": table, "player": Int64(discord_id)}
+        if since is not None:
+            query["month"] = {"$gte": month_of(since)}
+        series: Dict[str, List[Any]] = defaultdict(list)
+        async for doc in self.collection.find(query, {"t": 1, "mu": 1, "sigma": 1}).sort([("month", 1)]):
+            for at, mu, sigma in zip(doc["t"], doc["mu"], doc["sigma"]):
+                if since is None or at >= since:
+                    series["t"].append(at)
+                    series["mu"].append(mu)
+                    series["sigma"].append(sigma)
+        series = {field: series[field] for field in ("t", "mu", "sigma")}
+        return downsample(series, max_points) if max_points else series
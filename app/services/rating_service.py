@@ -2,152 +2,185 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 from bson import ObjectId
+from pymongo import UpdateOne
 from trueskill import Rating
 
-from app.db import players_col, matches_col, history_col
 from app.config import settings
-from app.services.skill import make_ts_env
+from app.services.skill import rate
+
+
+class RatingServiceError(ValueError): ...
+class MatchNotFoundError(RatingServiceError): ...
 
 
 @dataclass(frozen=True)
 class PlayerState:
-    player_id: str            
+    player_id: str
     mu: float
     sigma: float
 
 
 class TrueSkillService:
-    def __init__(self) -> None:
-        # Build a TrueSkill environment using values from .env / config.py
-        self.env = make_ts_env()
+    """
+    Placement confirmation and delayed approval for the ``players`` /
+    ``matches`` / ``rating_history`` collections of the app database.
+
+    Takes the motor client opened by ``db_lifespan`` (``get_database``).
+    """
+
+    def __init__(self, db) -> None:
+        database = db[settings.mongo_db_name]
+        self.players = database.players
+        self.matches = database.matches
+        self.history = database.rating_history
 
     # --------------------------- Public API ---------------------------
 
-    def confirm_placements_and_rate(
+    async def confirm_placements_and_rate(
         self,
         match_id: str,
         teams: List[List[str]],
         placements: List[int],
     ) -> Dict[str, Any]:
 
-        self._validate_inputs(match_id, teams, placements)
+        await self._validate_inputs(match_id, teams, placements)
 
-        # Pre states for all participants (single pass)
-        pre_states = self._load_pre_states(teams)
+        # Pre states for all participants (one $in query)
+        pre_states = await self._load_pre_states(teams)
 
-        # Compute TrueSkill post states using TS env from __init__
-        post_states = self._compute_post_states(teams, placements)
+        # Post states computed from the same pre states, no second read
+        post_states = self._compute_post_states(teams, placements, pre_states)
 
         # Deltas for Discord bot display
         deltas = self._compute_deltas(pre_states, post_states)
 
         # Persist immutable per-player history rows
-        self._write_history(match_id, pre_states, post_states)
+        await self._write_history(match_id, pre_states, post_states)
 
         # Update match doc with placements and start 48h hold
-        self._persist_match_status(match_id, teams, placements)
+        await self._persist_match_status(match_id, teams, placements)
 
         return {"matchId": match_id, "ratingDeltas": deltas}
 
-    def approve_eligible_matches(self) -> int:
-        cutoff = datetime.utcnow() - timedelta(hours=48)
-        candidates = list(
-            matches_col.find(
-                {
-                    "status": "pending-approval",
-                    "confirmedAt": {"$lte": cutoff},
-                    "$or": [{"flags.count": {"$exists": False}}, {"flags.count": 0}],
-                },
-                {"_id": 1},
-            )
-        )
-
-        for m in candidates:
-            # For this match, write each player's post rating into players.rating
-            rows = list(history_col.find({"matchId": m["_id"]}))
-            for row in rows:
-                players_col.update_one(
-                    {"_id": row["playerId"]},
-                    {"$set": {
-                        "rating": {
-                            "mu": float(row["post"]["mu"]),
-                            "sigma": float(row["post"]["sigma"]),
-                        }
-                    }},
-                )
-
-            matches_col.update_one(
-                {"_id": m["_id"]},
-                {"$set": {"status": "approved", "approvedAt": datetime.utcnow()}},
+    async def approve_eligible_matches(self, limit: Optional[int] = None) -> int:
+        """
+        Approve matches whose hold has passed, oldest confirmation first, and
+        return how many. Post ratings are written in one ordered bulk write in
+        that order, so a player's most recent match is written last.
+        """
+        cursor = self.matches.find(self._eligible(), {"_id": 1}).sort([("confirmedAt", 1), ("_id", 1)])
+        if limit:
+            cursor = cursor.limit(limit)
+        candidates = await cursor.to_list(length=None)
+        if not candidates:
+            return 0
+        match_ids = [m["_id"] for m in candidates]
+        position = {match_id: i for i, match_id in enumerate(match_ids)}
+
+        # Every player's post rating of every candidate, in chronological order
+        rows = await self.history.find({"matchId": {"$in": match_ids}}, {"matchId": 1, "playerId": 1, "post": 1}).to_list(length=None)
+        rows.sort(key=lambda row: position[row["matchId"]])
+        if rows:
+            await self.players.bulk_write(
+                [
+                    UpdateOne(
+                        {"_id": row["playerId"]},
+                        {"$set": {
+                            "rating": {
+                                "mu": float(row["post"]["mu"]),
+                                "sigma": float(row["post"]["sigma"]),
+                            }
+                        }},
+                    )
+                    for row in rows
+                ],
+                ordered=True,
             )
 
+        await self.matches.update_many(
+            {"_id": {"$in": match_ids}, "status": "pending-approval"},
+            {"$set": {"status": "approved", "approvedAt": datetime.utcnow()}},
+        )
         return len(candidates)
 
+    async def oldest_eligible(self) -> Optional[datetime]:
+        """``confirmedAt`` of the longest-waiting eligible match, or None."""
+        doc = await self.matches.find_one(self._eligible(), {"confirmedAt": 1}, sort=[("confirmedAt", 1)])
+        return doc["confirmedAt"] if doc else None
+
     # --------------------------- Internals ---------------------------
 
-    def _validate_inputs(self, match_id: str, teams: List[List[str]], placements: List[int]) -> None:
+    @staticmethod
+    def _eligible() -> Dict[str, Any]:
+        # served by the matches "auto_approval" index (status, confirmedAt)
+        cutoff = datetime.utcnow() - timedelta(hours=settings.auto_approve_hold_hours)
+        return {
+            "status": "pending-approval",
+            "confirmedAt": {"$lte": cutoff},
+            "$or": [{"flags.count": {"$exists": False}}, {"flags.count": 0}],
+        }
+
+    async def _validate_inputs(self, match_id: str, teams: List[List[str]], placements: List[int]) -> None:
         if not match_id or not ObjectId.is_valid(match_id):
-            raise ValueError("invalid match_id")
-
-        match = matches_col.find_one({"_id": ObjectId(match_id)}, {"_id": 1, "status": 1})
-        if not match:
-            raise ValueError("match not found")
-        if match.get("status") not in (None, "draft", "pending", "uploaded"):
-            # Prevent re-confirming an already confirmed/approved match
-            pass
+            raise RatingServiceError("invalid match_id")
 
         if not teams or len(teams) < 2:
-            raise ValueError("at least two teams are required")
+            raise RatingServiceError("at least two teams are required")
 
         if len(placements) != len(teams):
-            raise ValueError("placements length must equal number of teams")
+            raise RatingServiceError("placements length must equal number of teams")
 
         # placements must be positive integers; exactly one winner (rank 1)
         winners = sum(1 for r in placements if isinstance(r, int) and r == 1)
         if winners != 1:
-            raise ValueError("exactly one winning team (rank=1) is required")
+            raise RatingServiceError("exactly one winning team (rank=1) is required")
         if any((not isinstance(r, int)) or r < 1 for r in placements):
-            raise ValueError("all placements must be positive integers (1..k)")
+            raise RatingServiceError("all placements must be positive integers (1..k)")
 
         # If it's a team game (any team size > 1), enforce equal team sizes
         team_sizes = [len(t) for t in teams]
         if any(sz > 1 for sz in team_sizes) and len(set(team_sizes)) != 1:
-            raise ValueError("team games must have equal team sizes")
+            raise RatingServiceError("team games must have equal team sizes")
 
-    def _get_player_state(self, pid: str) -> PlayerState:
-        doc = players_col.find_one({"_id": ObjectId(pid)}, {"rating": 1})
-        rating = (doc or {}).get("rating") or {"mu": settings.ts_mu, "sigma": settings.ts_sigma}
-        return PlayerState(player_id=pid, mu=float(rating["mu"]), sigma=float(rating["sigma"]))
+        if any(not ObjectId.is_valid(pid) for team in teams for pid in team):
+            raise RatingServiceError("invalid player id")
 
-    def _load_pre_states(self, teams: List[List[str]]) -> Dict[str, PlayerState]:
+        match = await self.matches.find_one({"_id": ObjectId(match_id)}, {"_id": 1, "status": 1})
+        if not match:
+            raise MatchNotFoundError("match not found")
+
+    async def _load_pre_states(self, teams: List[List[str]]) -> Dict[str, PlayerState]:
+        pids = list(dict.fromkeys(pid for team in teams for pid in team))
+        ratings: Dict[str, Dict[str, float]] = {}
+        async for doc in self.players.find({"_id": {"$in": [ObjectId(pid) for pid in pids]}}, {"rating": 1}):
+            if doc.get("rating"):
+                ratings[str(doc["_id"])] = doc["rating"]
+        default = {"mu": settings.ts_mu, "sigma": settings.ts_sigma}
         pre: Dict[str, PlayerState] = {}
-        for team in teams:
-            for pid in team:
-                if pid not in pre:
-                    pre[pid] = self._get_player_state(pid)
+        for pid in pids:
+            rating = ratings.get(pid, default)
+            pre[pid] = PlayerState(player_id=pid, mu=float(rating["mu"]), sigma=float(rating["sigma"]))
         return pre
 
     def _compute_post_states(
-        self, teams: List[List[str]], placements: List[int]
+        self, teams: List[List[str]], placements: List[int], pre: Dict[str, PlayerState]
     ) -> Dict[str, PlayerState]:
-        # Build Rating objects per team/player using current mu/sigma
-        team_states: List[List[PlayerState]] = [
-            [self._get_player_state(pid) for pid in team] for team in teams
-        ]
+        # Build Rating objects per team/player from the loaded pre states
+        team_states: List[List[PlayerState]] = [[pre[pid] for pid in team] for team in teams]
         ts_teams = [[Rating(p.mu, p.sigma) for p in team] for team in team_states]
 
-        # Use the environment instance (avoids relying on global env)
-        new_ts = self.env.rate(ts_teams, ranks=placements)
+        # Same engine (TS_ENGINE) and memo as match approvals
+        new_ts = rate(ts_teams, ranks=placements)
 
         # Convert back to PlayerState and return dict keyed by player id
         post: Dict[str, PlayerState] = {}
         for t_idx, team in enumerate(team_states):
-            for i, pre in enumerate(team):
+            for i, before in enumerate(team):
                 r = new_ts[t_idx][i]
-                post[pre.player_id] = PlayerState(pre.player_id, float(r.mu), float(r.sigma))
+                post[before.player_id] = PlayerState(before.player_id, float(r.mu), float(r.sigma))
         return post
 
     def _compute_deltas(
@@ -162,7 +195,7 @@ class TrueSkillService:
             }
         return out
 
-    def _write_history(
+    async def _write_history(
         self,
         match_id: str,
         pre: Dict[str, PlayerState],
@@ -184,12 +217,13 @@ class TrueSkillService:
                 }
             )
         if docs:
-            history_col.insert_many(docs)
+            # one ordered batch: rows land in team order, a failure stops the rest
+            await self.history.insert_many(docs, ordered=True)
 
-    def _persist_match_status(
+    async def _persist_match_status(
         self, match_id: str, teams: List[List[str]], placements: List[int]
     ) -> None:
-        matches_col.update_one(
+        await self.matches.update_one(
             {"_id": ObjectId(match_id)},
             {
                 "$set": {
@@ -202,7 +236,3 @@ class TrueSkillService:
                 }
             },
         )
-
-
-# Simple DI singleton
-ts_service = TrueSkillService()
\ No newline at end of file
@@ -0,0 +1,159 @@
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.metrics import metrics
+from app.services.invalidation import invalidations
+from app.services.leaderboard_cache import MIN_GAMES
+
+logger = logging.getLogger(__name__)
+
+class RatingTable:
+    """
+    Ranked players of one stat table as parallel NumPy arrays, sorted like
+    the leaderboard: mu desc, sigma asc, then discord id. Only players with
+    ``MIN_GAMES`` or more are ranked. Lookups are binary searches; an update
+    moves one player with an array delete + insert.
+    """
+
+    def __init__(self, ids: np.ndarray, mu: np.ndarray, sigma: np.ndarray, games: np.ndarray, versions: Dict[int, int] = None):
+        order = np.lexsort((ids, sigma, -mu))
+        self.ids = ids[order].astype(np.int64)
+        self.neg_mu = -mu[order].astype(np.float64)
+        self.sigma = sigma[order].astype(np.float64)
+        self.games = games[order].astype(np.int64)
+        self.keys: Dict[int, Tuple[float, float]] = {
+            int(i): (float(-n), float(s)) for i, n, s in zip(self.ids, self.neg_mu, self.sigma)
+        }
+        self.versions: Dict[int, int] = dict(versions or {})
+        self.stale = False
+
+    @classmethod
+    def from_docs(cls, docs: List[Dict[str, Any]]) -> "RatingTable":
+        versions = {int(d["_id"]): d.get("version") or 0 for d in docs}
+        docs = [d for d in docs if d["games"] >= MIN_GAMES]
+        return cls(
+            np.array([int(d["_id"]) for d in docs], dtype=np.int64),
+            np.array([d["mu"] for d in docs], dtype=np.float64),
+            np.array([d["sigma"] for d in docs], dtype=np.float64),
+            np.array([d["games"] for d in docs], dtype=np.int64),
+            versions,
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _position(self, mu: float, sigma: float, discord_id: int) -> int:
+        """Index of ``(mu, sigma, discord_id)`` in sort order (insertion point if absent)."""
+        lo, hi = 0, len(self.ids)
+        for column, value in ((self.neg_mu, -mu), (self.sigma, sigma), (self.ids, discord_id)):
+            window = column[lo:hi]
+            lo, hi = lo + int(np.searchsorted(window, value, "left")), lo + int(np.searchsorted(window, value, "right"))
+        return lo
+
+    def position(self, discord_id: int) -> Optional[int]:
+        """0-based rank of a player, or None if unranked."""
+        key = self.keys.get(discord_id)
+        if key is None:
+            return None
+        return self._position(key[0], key[1], discord_id)
+
+    def apply(self, row: Dict[str, Any]) -> None:
+        discord_id = int(row["_id"])
+        version = row.get("version") or 0
+        if self.versions.get(discord_id, -1) > version:
+            # an older write finishing after a newer one
+            return
+        self.versions[discord_id] = version
+        pos = self.position(discord_id)
+        if pos is not None:
+            self.ids = np.delete(self.ids, pos)
+            self.neg_mu = np.delete(self.neg_mu, pos)
+            self.sigma = np.delete(self.sigma, pos)
+            self.games = np.delete(self.games, pos)
+            del self.keys[discord_id]
+        if row["games"] >= MIN_GAMES:
+            mu, sigma = float(row["mu"]), float(row["sigma"])
+            pos = self._position(mu, sigma, discord_id)
+            self.ids = np.insert(self.ids, pos, discord_id)
+            self.neg_mu = np.insert(self.neg_mu, pos, -mu)
+            self.sigma = np.insert(self.sigma, pos, sigma)
+            self.games = np.insert(self.games, pos, row["games"])
+            self.keys[discord_id] = (mu, sigma)
+
+    def rows(self, start: int, stop: int) -> List[Dict[str, Any]]:
+        start, stop = max(start, 0), min(stop, len(self.ids))
+        return [
+            {"rank": start + i + 1, "discord_id": str(d), "rating": int(-m), "games_played": int(g)}
+            for i, (d, m, g) in enumerate(zip(self.ids[start:stop].tolist(), self.neg_mu[start:stop].tolist(), self.games[start:stop].tolist()))
+        ]
+
+    def histogram(self, bucket_size: float) -> List[Dict[str, Any]]:
+        """Ranked players per rating bucket ``[min_rating, min_rating + bucket_size)``, lowest first."""
+        buckets, counts = np.unique(np.floor(-self.neg_mu / bucket_size), return_counts=True)
+        return [
+            {"min_rating": int(b * bucket_size), "count": int(c)}
+            for b, c in zip(buckets.tolist(), counts.tolist())
+        ]
+
+class RatingStore:
+    """
+    A RatingTable per stat table, kept current like the leaderboards: loaded
+    at startup or on first use, patched with the rows approvals write, and
+    reloaded after another worker publishes a change to the table.
+    """
+
+    def __init__(self):
+        self._tables: Dict[str, RatingTable] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._stats = {"hits": 0, "loads": 0, "applied": 0, "invalidated": 0}
+
+    async def load(self, stat_table) -> RatingTable:
+        cursor = stat_table.find({"games": {"$gte": MIN_GAMES}}, {"mu": 1, "sigma": 1, "games": 1, "version": 1})
+        table = RatingTable.from_docs(await cursor.to_list(length=None))
+        self._tables[stat_table.full_name] = table
+        self._stats["loads"] += 1
+        return table
+
+    async def load_all(self, stat_tables) -> None:
+        for stat_table in stat_tables:
+            try:
+                await self.load(stat_table)
+            except Exception:
+                logger.exception(f"⚠️ Could not load ratings of {stat_table.full_name}")
+        logger.info(f"🟢 Loaded ratings of {len(self._tables)} stat tables")
+
+    async def get(self, stat_table) -> RatingTable:
+        name = stat_table.full_name
+        table = self._tables.get(name)
+        if table is None or table.stale:
+            async with self._locks.setdefault(name, asyncio.Lock()):
+                table = self._tables.get(name)
+                if table is None or table.stale:
+                    table = await self.load(stat_table)
+        else:
+            self._stats["hits"] += 1
+        return table
+
+    def apply(self, stat_table, rows: Iterable[Dict[str, Any]]) -> None:
+        table = self._tables.get(stat_table.full_name)
+        if table is None:
+            return
+        for row in rows:
+            table.apply(row)
+            self._stats["applied"] += 1
+
+    def invalidate(self, topic: str, version: int = None) -> None:
+        table = self._tables.get(topic)
+        if table is not None:
+            table.stale = True
+            self._stats["invalidated"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "tables": len(self._tables), "players": sum(len(t) for t in self._tables.values())}
+
+ratings = RatingStore()
+invalidations.subscribe(ratings.invalidate)
+metrics.register("ratings", ratings.stats)
@@ -1,7 +1,19 @@
+from typing import Any, Dict
 from trueskill import TrueSkill, Rating
 from app.config import settings
+from app.metrics import metrics
+from app.services.rate_memo import RateMemo
 
 def make_ts_env() -> TrueSkill:
+    if settings.ts_engine == "numpy":
+        from app.services.trueskill_numpy import NumpyTrueSkill
+        return NumpyTrueSkill(
+            mu=settings.ts_mu,
+            sigma=settings.ts_sigma,
+            beta=settings.ts_beta,
+            tau=settings.ts_tau,
+            draw_probability=settings.ts_draw_prob,
+        )
     return TrueSkill(
         mu=settings.ts_mu,
         sigma=settings.ts_sigma,
@@ -10,6 +22,27 @@ def make_ts_env() -> TrueSkill:
         draw_probability=settings.ts_draw_prob,
     )
 
+def ts_fingerprint() -> tuple:
+    return (
+        settings.ts_engine,
+        settings.ts_mu,
+        settings.ts_sigma,
+        settings.ts_beta,
+        settings.ts_tau,
+        settings.ts_draw_prob,
+    )
+
+rate_memo = RateMemo(
+    env_factory=make_ts_env,
+    fingerprint=ts_fingerprint,
+    maxsize=settings.ts_memo_size,
+    quantum=settings.ts_memo_quantum,
+)
+metrics.register("rate_memo", rate_memo.stats)
+
+def rate(rating_groups, ranks):
+    return rate_memo.rate(rating_groups, ranks)
+
 def skill(mu: float, sigma: float, *, teamer: bool = False) -> float:
     base = mu - max(sigma - settings.ts_sigma_free, 0.0)
     if teamer:
@@ -17,4 +50,11 @@ def skill(mu: float, sigma: float, *, teamer: bool = False) -> float:
     return base
 
 def skill_from_rating(r: Rating, *, teamer: bool = False) -> float:
-    return skill(r.mu, r.sigma, teamer=teamer)
\ No newline at end of file
+    return skill(r.mu, r.sigma, teamer=teamer)
+
+def skill_expression(*, teamer: bool = False) -> Dict[str, Any]:
+    """``skill()`` as an aggregation expression over a stat document's ``$mu``/``$sigma``."""
+    base: Dict[str, Any] = {"$subtract": ["$mu", {"$max": [{"$subtract": ["$sigma", settings.ts_sigma_free]}, 0.0]}]}
+    if teamer:
+        base = {"$add": [base, {"$multiply": [settings.ts_teamer_boost, {"$subtract": ["$mu", settings.ts_mu]}]}]}
+    return base
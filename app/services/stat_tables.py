@@ -0,0 +1,164 @@
+"""
+Storage of the stat tables behind ``MatchService.get_stat_table``.
+
+A stat table (one rating ledger) is named like its original collection,
+``<game>_<lifetime|season>_stats.<rt|pbc>_<mode>``, or for an archived
+season ``<game>_season_archive.s<n>_<rt|pbc>_<mode>``. That name keys the
+caches, invalidation topics and derived collections in both layouts
+(STAT_LAYOUT):
+
+- ``collections`` (default): one collection per ledger, ``_id`` is the
+  discord id. Stat tables are plain collections.
+- ``unified``: one ``<game>_stats.ratings`` collection per game, one
+  document per (discord_id, ledger). Stat tables are ``LedgerTable`` views
+  that read and write the documents of one ledger with ``_id`` standing for
+  the discord id, so callers see the same documents in both layouts. A
+  player's ratings in every ledger are one indexed query (``profile``).
+
+``python -m app migrate unify-stats`` copies the collections into the
+unified layout; switch STAT_LAYOUT once it has run.
+"""
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson.int64 import Int64
+
+from app.config import settings
+
+UNIFIED_DATABASE = "{game}_stats"
+UNIFIED_COLLECTION = "ratings"
+
+def split_name(full_name: str) -> Tuple[str, str]:
+    """``(database, collection)`` of a stat table name."""
+    database, collection = full_name.split(".", 1)
+    return database, collection
+
+def unified_collection(client, game: str):
+    return client[UNIFIED_DATABASE.format(game=game)][UNIFIED_COLLECTION]
+
+def _rename_id(value: Any) -> Any:
+    # "_id" (the discord id) is stored as "discord_id"; operators nest in lists and dicts
+    if isinstance(value, dict):
+        return {("discord_id" if key == "_id" else key): _rename_id(v) for key, v in value.items()}
+    if isinstance(value, list):
+        return [_rename_id(v) for v in value]
+    return value
+
+class LedgerCursor:
+    """A cursor over one ledger's documents, yielding them with ``_id`` as the discord id."""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    @staticmethod
+    def to_stat_doc(doc: Dict[str, Any]) -> Dict[str, Any]:
+        doc = dict(doc)
+        doc.pop("ledger", None)
+        doc["_id"] = doc.pop("discord_id")
+        return doc
+
+    def sort(self, keys):
+        self.cursor = self.cursor.sort([("discord_id" if field == "_id" else field, direction) for field, direction in keys])
+        return self
+
+    def limit(self, limit: int):
+        self.cursor = self.cursor.limit(limit)
+        return self
+
+    def skip(self, skip: int):
+        self.cursor = self.cursor.skip(skip)
+        return self
+
+    def __iter__(self):
+        return (self.to_stat_doc(doc) for doc in self.cursor)
+
+    def __aiter__(self):
+        return self._aiter()
+
+    async def _aiter(self):
+        async for doc in self.cursor:
+            yield self.to_stat_doc(doc)
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        return [self.to_stat_doc(doc) for doc in await self.cursor.to_list(length=length)]
+
+class LedgerTable:
+    """
+    One ledger of the unified layout, used like a per-ledger collection.
+
+    Queries, sorts and projections on ``_id`` are rewritten to
+    ``discord_id`` and scoped to the ledger. Write operations for
+    ``bulk_write`` are built by the caller with ``scoped`` filters.
+    """
+
+    def __init__(self, collection, full_name: str):
+        self.collection = collection
+        self.full_name = full_name
+        self.name = split_name(full_name)[1]
+
+    def scope(self, query: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return {**_rename_id(query or {}), "ledger": self.full_name}
+
+    def to_storage(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        stored = {key: value for key, value in doc.items() if key != "_id"}
+        stored["discord_id"] = Int64(doc["_id"])
+        stored["ledger"] = self.full_name
+        return stored
+
+    @staticmethod
+    def _projection(projection: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if not projection:
+            return projection
+        projection = _rename_id(projection)
+        if any(value for value in projection.values()):
+            # inclusion projection: the discord id is not implied like _id
+            projection["discord_id"] = 1
+        return projection
+
+    def find(self, query: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None, **kwargs) -> LedgerCursor:
+        return LedgerCursor(self.collection.find(self.scope(query), self._projection(projection), **kwargs))
+
+    async def find_one(self, query: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        doc = await self.collection.find_one(self.scope(query), self._projection(projection))
+        return LedgerCursor.to_stat_doc(doc) if doc else None
+
+    def bulk_write(self, requests, **kwargs):
+        return self.collection.bulk_write(requests, **kwargs)
+
+    def insert_many(self, docs, **kwargs):
+        return self.collection.insert_many([self.to_storage(doc) for doc in docs], **kwargs)
+
+    def update_many(self, query, update, **kwargs):
+        return self.collection.update_many(self.scope(query), update, **kwargs)
+
+    def delete_many(self, query, **kwargs):
+        return self.collection.delete_many(self.scope(query), **kwargs)
+
+    def count_documents(self, query, **kwargs):
+        return self.collection.count_documents(self.scope(query), **kwargs)
+
+def stat_table(client, database: str, collection: str):
+    """The stat table ``database.collection`` in the configured layout."""
+    if settings.stat_layout == "unified":
+        return LedgerTable(unified_collection(client, database.split("_", 1)[0]), f"{database}.{collection}")
+    return client[database][collection]
+
+def scoped(table, query: Dict[str, Any]) -> Dict[str, Any]:
+    """``query`` on a stat table (``_id`` is the discord id) as a filter for write operations on its storage."""
+    return table.scope(query) if isinstance(table, LedgerTable) else query
+
+def to_storage(table, doc: Dict[str, Any]) -> Dict[str, Any]:
+    return table.to_storage(doc) if isinstance(table, LedgerTable) else doc
+
+async def profile(client, game: str, discord_id: str, tables: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    """
+    A player's stat documents in every ledger of ``game``, each with its
+    ``ledger`` name. One indexed query in the unified layout (archived seasons
+    included); one query per collection of ``tables`` otherwise.
+    """
+    if settings.stat_layout == "unified":
+        cursor = unified_collection(client, game).find({"discord_id": Int64(discord_id)}).sort([("ledger", 1)])
+        # ledgers being rebuilt by replay end in __replay
+        return [{**LedgerCursor.to_stat_doc(doc), "ledger": doc["ledger"]} async for doc in cursor if not doc["ledger"].endswith("__replay")]
+    found = await asyncio.gather(*(client[database][collection].find_one({"_id": Int64(discord_id)}) for database, collection in tables))
+    return [{**doc, "ledger": f"{database}.{collection}"} for (database, collection), doc in zip(tables, found) if doc]
@@ -0,0 +1,144 @@
+import math
+import random
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+# canonical partitions up to this many are scored exhaustively: every split of 12 players (at most 15400, 4 teams of 3)
+EXHAUSTIVE_LIMIT = 50_000
+# restarts for a 12-player lobby, scaled down as lobbies grow (a step scores O(players²) swaps)
+LOCAL_SEARCH_RESTARTS = 16
+# no restart starts after this long; one restart of 24 players in 12 teams takes ~40 ms,
+# keeping the endpoint within 200 ms
+LOCAL_SEARCH_BUDGET_SECONDS = 0.12
+
+def partition_count(players: int, teams: int) -> int:
+    """Number of ways to split ``players`` into ``teams`` unlabeled teams of equal size."""
+    size = players // teams
+    return math.factorial(players) // (math.factorial(size) ** teams * math.factorial(teams))
+
+@lru_cache(maxsize=32)
+def partitions(players: int, teams: int) -> np.ndarray:
+    """
+    Every split into equal unlabeled teams as a ``(count, players)`` array of
+    team indices. Teams are opened in player order (player 0 is always in team
+    0, the next new team is always team 1, ...), which prunes the ``teams!``
+    relabelings of each split while it is built, one player at a time.
+    """
+    size = players // teams
+    rows = np.zeros((1, 0), dtype=np.int8)
+    counts = np.zeros((1, teams), dtype=np.int16)
+    for _ in range(players):
+        opened = (counts > 0).sum(axis=1)
+        grown_rows, grown_counts = [], []
+        for team in range(teams):
+            keep = (counts[:, team] < size) & (team <= opened)
+            if not keep.any():
+                continue
+            grown_rows.append(np.hstack([rows[keep], np.full((int(keep.sum()), 1), team, dtype=np.int8)]))
+            added = counts[keep].copy()
+            added[:, team] += 1
+            grown_counts.append(added)
+        rows, counts = np.vstack(grown_rows), np.vstack(grown_counts)
+    return rows
+
+def quality(assignments: np.ndarray, mu: np.ndarray, sigma: np.ndarray, teams: int, beta: float) -> np.ndarray:
+    """
+    ``TrueSkill.quality`` of each row of ``assignments`` (team index per player), vectorized.
+
+    With every player weighted 1 the quality only depends on each team's
+    size and sums of mu and sigma², so the ``(teams - 1)``-square matrices of
+    the formula are built from those sums for the whole batch at once.
+    """
+    onehot = (assignments[:, :, None] == np.arange(teams)).astype(np.float64)
+    sizes = onehot.sum(axis=1)
+    team_mu = onehot.transpose(0, 2, 1) @ mu
+    team_var = onehot.transpose(0, 2, 1) @ (sigma ** 2)
+
+    def tridiagonal(diag_terms: np.ndarray) -> np.ndarray:
+        # A^T X A for the consecutive-team comparison matrix A and per-team terms X
+        n = teams - 1
+        out = np.zeros((len(diag_terms), n, n))
+        idx = np.arange(n)
+        out[:, idx, idx] = diag_terms[:, :-1] + diag_terms[:, 1:]
+        out[:, idx[:-1], idx[1:]] = -diag_terms[:, 1:-1]
+        out[:, idx[1:], idx[:-1]] = -diag_terms[:, 1:-1]
+        return out
+
+    ata = tridiagonal(beta ** 2 * sizes)
+    middle = ata + tridiagonal(team_var)
+    start = team_mu[:, :-1] - team_mu[:, 1:]
+    e_arg = -0.5 * np.einsum("bi,bi->b", start, np.linalg.solve(middle, start[:, :, None])[:, :, 0])
+    return np.exp(e_arg) * np.sqrt(np.linalg.det(ata) / np.linalg.det(middle))
+
+def _canonical(assignment: np.ndarray) -> Tuple[int, ...]:
+    # relabel teams in order of first appearance so equal splits compare equal
+    labels: Dict[int, int] = {}
+    return tuple(labels.setdefault(int(team), len(labels)) for team in assignment)
+
+def _local_search(mu: np.ndarray, sigma: np.ndarray, teams: int, beta: float, limit: int, seed: int) -> Tuple[Dict[Tuple[int, ...], float], int]:
+    """
+    Best-improvement swap search from random equal splits. Each step scores
+    every swap of two players in different teams in one batch. Returns the
+    best ``limit`` neighbours of every step with their quality, and how many
+    splits were scored. Restarts stop at ``LOCAL_SEARCH_BUDGET_SECONDS``,
+    after at least one.
+    """
+    players = len(mu)
+    rng = random.Random(seed)
+    i, j = np.triu_indices(players, k=1)
+    seen: Dict[Tuple[int, ...], float] = {}
+    evaluated = 0
+    deadline = time.monotonic() + LOCAL_SEARCH_BUDGET_SECONDS
+    for restart in range(max(1, LOCAL_SEARCH_RESTARTS * 12 // players)):
+        if restart and time.monotonic() >= deadline:
+            break
+        labels = [p % teams for p in range(players)]
+        rng.shuffle(labels)
+        current = np.array(labels, dtype=np.int8)
+        best = float(quality(current[None, :], mu, sigma, teams, beta)[0])
+        seen[_canonical(current)] = best
+        while True:
+            pairs = current[i] != current[j]
+            si, sj = i[pairs], j[pairs]
+            neighbours = np.repeat(current[None, :], len(si), axis=0)
+            rows = np.arange(len(si))
+            neighbours[rows, si], neighbours[rows, sj] = current[sj], current[si]
+            scores = quality(neighbours, mu, sigma, teams, beta)
+            evaluated += len(scores)
+            for k in np.argsort(-scores)[:limit].tolist():
+                seen.setdefault(_canonical(neighbours[k]), float(scores[k]))
+            top = int(np.argmax(scores))
+            if scores[top] <= best:
+                break
+            current, best = neighbours[top], float(scores[top])
+    return seen, evaluated
+
+def balance(mu: np.ndarray, sigma: np.ndarray, teams: int, beta: float, limit: int, seed: int = 0) -> Dict[str, Any]:
+    """
+    The ``limit`` splits of the players into ``teams`` equal teams with the
+    highest quality, best first, as ``(assignment, quality)`` pairs, plus
+    whether the search was exhaustive and how many splits it scored.
+    """
+    players = len(mu)
+    if partition_count(players, teams) <= EXHAUSTIVE_LIMIT:
+        candidates = partitions(players, teams)
+        scores = quality(candidates, mu, sigma, teams, beta)
+        top = np.argsort(-scores, kind="stable")[:limit]
+        return {
+            "lineups": [(candidates[k], float(scores[k])) for k in top],
+            "exhaustive": True,
+            "evaluated": len(candidates),
+        }
+    seen, evaluated = _local_search(mu, sigma, teams, beta, limit, seed)
+    ranked = sorted(seen.items(), key=lambda item: -item[1])[:limit]
+    return {
+        "lineups": [(np.array(assignment, dtype=np.int8), score) for assignment, score in ranked],
+        "exhaustive": False,
+        "evaluated": evaluated,
+    }
+
+def lineup_teams(assignment: np.ndarray, ids: List[str], teams: int) -> List[List[str]]:
+    return [[ids[p] for p in np.flatnonzero(assignment == team).tolist()] for team in range(teams)]
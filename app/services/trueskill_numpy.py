@@ -0,0 +1,264 @@
+"""NumPy-backed implementation of the TrueSkill factor graph.
+
+Mirrors the message schedule of ``trueskill.TrueSkill.rate`` (prior,
+likelihood, team-sum, team-diff and truncation factors) but keeps every
+message as plain ``(pi, tau)`` floats instead of ``Variable``/``Gaussian``
+objects. The per-player layers are evaluated as NumPy array operations;
+the team-diff chain is inherently sequential and runs on scalars.
+
+The special functions (cdf/pdf/ppf) come from ``trueskill.backends`` so
+results agree with the reference implementation to floating point noise.
+"""
+from __future__ import annotations
+
+import math
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from trueskill import Rating
+from trueskill.backends import cdf, pdf, ppf
+
+DELTA = 0.0001
+_INF = float("inf")
+
+
+def _v_win(diff: float, draw_margin: float) -> float:
+    x = diff - draw_margin
+    denom = cdf(x)
+    return (pdf(x) / denom) if denom else -x
+
+
+def _v_draw(diff: float, draw_margin: float) -> float:
+    abs_diff = abs(diff)
+    a, b = draw_margin - abs_diff, -draw_margin - abs_diff
+    denom = cdf(a) - cdf(b)
+    numer = pdf(b) - pdf(a)
+    return ((numer / denom) if denom else a) * (-1 if diff < 0 else +1)
+
+
+def _w_win(diff: float, draw_margin: float) -> float:
+    x = diff - draw_margin
+    v = _v_win(diff, draw_margin)
+    w = v * (v + x)
+    if 0 < w < 1:
+        return w
+    raise FloatingPointError("Cannot calculate correctly, set backend to \"mpmath\"")
+
+
+def _w_draw(diff: float, draw_margin: float) -> float:
+    abs_diff = abs(diff)
+    a, b = draw_margin - abs_diff, -draw_margin - abs_diff
+    denom = cdf(a) - cdf(b)
+    if not denom:
+        raise FloatingPointError("Cannot calculate correctly, set backend to \"mpmath\"")
+    v = _v_draw(abs_diff, draw_margin)
+    return (v ** 2) + (a * pdf(a) - b * pdf(b)) / denom
+
+
+def _mu(pi: float, tau: float) -> float:
+    return tau / pi if pi else 0.0
+
+
+def _set(var: List[float], pi: float, tau: float) -> float:
+    """Assign a new value to ``var`` and return the change (``Variable.set``)."""
+    pi_delta = abs(var[0] - pi)
+    if pi_delta == _INF:
+        delta = 0.0
+    else:
+        delta = max(abs(var[1] - tau), math.sqrt(pi_delta))
+    var[0], var[1] = pi, tau
+    return delta
+
+
+def _update_message(var: List[float], old: List[float], pi: float, tau: float) -> float:
+    new_pi = var[0] - old[0] + pi
+    new_tau = var[1] - old[1] + tau
+    old[0], old[1] = pi, tau
+    return _set(var, new_pi, new_tau)
+
+
+def _update_value(var: List[float], old: List[float], pi: float, tau: float) -> float:
+    old[0], old[1] = pi + old[0] - var[0], tau + old[1] - var[1]
+    return _set(var, pi, tau)
+
+
+def _sum_message(terms: Sequence[Tuple[float, float, float]]) -> Tuple[float, float]:
+    """Message of a sum factor given ``(coeff, pi, tau)`` of every other edge."""
+    pi_inv = 0.0
+    mu = 0.0
+    for coeff, pi, tau in terms:
+        mu += coeff * _mu(pi, tau)
+        if pi_inv == _INF:
+            continue
+        if pi == 0:
+            pi_inv = _INF
+        else:
+            pi_inv += coeff ** 2 / pi
+    pi = 1.0 / pi_inv
+    return pi, pi * mu
+
+
+class NumpyTrueSkill:
+    """Drop-in replacement for ``trueskill.TrueSkill`` covering ``rate``.
+
+    Only a static ``draw_probability`` and unit weights are supported, which
+    is everything ``MatchService`` uses.
+    """
+
+    def __init__(self, mu: float, sigma: float, beta: float, tau: float, draw_probability: float) -> None:
+        self.mu = mu
+        self.sigma = sigma
+        self.beta = beta
+        self.tau = tau
+        self.draw_probability = draw_probability
+
+    def create_rating(self, mu: Optional[float] = None, sigma: Optional[float] = None) -> Rating:
+        return Rating(self.mu if mu is None else mu, self.sigma if sigma is None else sigma)
+
+    def draw_margin(self, size: int) -> float:
+        return ppf((self.draw_probability + 1) / 2.0) * math.sqrt(size) * self.beta
+
+    def rate(self, rating_groups, ranks=None, min_delta: float = DELTA) -> List[Tuple[Rating, ...]]:
+        if min_delta <= 0:
+            raise ValueError("min_delta must be greater than 0")
+        rating_groups = [tuple(g) for g in rating_groups]
+        if len(rating_groups) < 2:
+            raise ValueError("Need multiple rating groups")
+        if not all(rating_groups):
+            raise ValueError("Each group must contain multiple ratings")
+        num_teams = len(rating_groups)
+        if ranks is None:
+            ranks = range(num_teams)
+        elif len(ranks) != num_teams:
+            raise ValueError("Wrong ranks")
+        ranks = list(ranks)
+
+        # sort teams by rank (stable, like the reference implementation)
+        order = sorted(range(num_teams), key=lambda x: ranks[x])
+        groups = [rating_groups[x] for x in order]
+        sorted_ranks = [ranks[x] for x in order]
+        sizes = np.array([len(g) for g in groups])
+        team_of = np.repeat(np.arange(num_teams), sizes)
+
+        mu = np.array([r.mu for g in groups for r in g], dtype=float)
+        sigma = np.array([r.sigma for g in groups for r in g], dtype=float)
+
+        # prior factor: rating ~ N(mu, sigma^2 + tau^2)
+        prior_pi = (sigma ** 2 + self.tau ** 2) ** -1
+        prior_tau = prior_pi * mu
+        # likelihood factor: perf ~ N(rating, beta^2)
+        beta_sq = self.beta ** 2
+        a = 1.0 / (1.0 + beta_sq * prior_pi)
+        perf_pi = a * prior_pi
+        perf_tau = a * prior_tau
+        perf_mu = perf_tau / perf_pi
+        perf_var = 1.0 / perf_pi
+        # team-sum factor (down)
+        team_mu = np.bincount(team_of, weights=perf_mu, minlength=num_teams)
+        team_var = np.bincount(team_of, weights=perf_var, minlength=num_teams)
+
+        # team perf variables and their messages from the sum / diff factors
+        team = [[1.0 / v, m / v] for m, v in zip(team_mu.tolist(), team_var.tolist())]
+        m_left = [[0.0, 0.0] for _ in range(num_teams)]   # from diff factor t-1
+        m_right = [[0.0, 0.0] for _ in range(num_teams)]  # from diff factor t
+        m_sum = [list(t) for t in team]
+
+        num_diffs = num_teams - 1
+        diff = [[0.0, 0.0] for _ in range(num_diffs)]
+        d_sum = [[0.0, 0.0] for _ in range(num_diffs)]
+        d_trunc = [[0.0, 0.0] for _ in range(num_diffs)]
+        margins = []
+        draws = []
+        for x in range(num_diffs):
+            margins.append(self.draw_margin(int(sizes[x] + sizes[x + 1])))
+            draws.append(sorted_ranks[x] == sorted_ranks[x + 1])
+
+        def diff_down(x: int) -> None:
+            l, r = team[x], team[x + 1]
+            ml, mr = m_right[x], m_left[x + 1]
+            pi, tau = _sum_message((
+                (1.0, l[0] - ml[0], l[1] - ml[1]),
+                (-1.0, r[0] - mr[0], r[1] - mr[1]),
+            ))
+            _update_message(diff[x], d_sum[x], pi, tau)
+
+        def diff_up(x: int, index: int) -> None:
+            d, md = diff[x], d_sum[x]
+            if index == 0:
+                r, mr = team[x + 1], m_left[x + 1]
+                pi, tau = _sum_message((
+                    (1.0, d[0] - md[0], d[1] - md[1]),
+                    (1.0, r[0] - mr[0], r[1] - mr[1]),
+                ))
+                _update_message(team[x], m_right[x], pi, tau)
+            else:
+                l, ml = team[x], m_right[x]
+                pi, tau = _sum_message((
+                    (1.0, l[0] - ml[0], l[1] - ml[1]),
+                    (-1.0, d[0] - md[0], d[1] - md[1]),
+                ))
+                _update_message(team[x + 1], m_left[x + 1], pi, tau)
+
+        def trunc_up(x: int) -> float:
+            d, mt = diff[x], d_trunc[x]
+            div_pi, div_tau = d[0] - mt[0], d[1] - mt[1]
+            sqrt_pi = math.sqrt(div_pi)
+            args = (div_tau / sqrt_pi, margins[x] * sqrt_pi)
+            if draws[x]:
+                v, w = _v_draw(*args), _w_draw(*args)
+            else:
+                v, w = _v_win(*args), _w_win(*args)
+            denom = 1.0 - w
+            return _update_value(d, mt, div_pi / denom, (div_tau + sqrt_pi * v) / denom)
+
+        for _ in range(10):
+            if num_diffs == 1:
+                diff_down(0)
+                delta = trunc_up(0)
+            else:
+                delta = 0.0
+                for x in range(num_diffs - 1):
+                    diff_down(x)
+                    delta = max(delta, trunc_up(x))
+                    diff_up(x, 1)
+                for x in range(num_diffs - 1, 0, -1):
+                    diff_down(x)
+                    delta = max(delta, trunc_up(x))
+                    diff_up(x, 0)
+            if delta <= min_delta:
+                break
+        diff_up(0, 0)
+        diff_up(num_diffs - 1, 1)
+
+        # team-sum factor (up): message from the team variable minus the
+        # other members' performances, for every player at once
+        team_arr = np.array(team)
+        sum_arr = np.array(m_sum)
+        up_pi = (team_arr[:, 0] - sum_arr[:, 0])[team_of]
+        up_tau = (team_arr[:, 1] - sum_arr[:, 1])[team_of]
+        up_mu = np.where(up_pi != 0, up_tau / np.where(up_pi != 0, up_pi, 1.0), 0.0)
+        with np.errstate(divide="ignore"):
+            up_var = np.where(up_pi != 0, 1.0 / np.where(up_pi != 0, up_pi, 1.0), np.inf)
+        others_mu = team_mu[team_of] - perf_mu
+        others_var = team_var[team_of] - perf_var
+        msg_var = up_var + others_var
+        msg_pi = 1.0 / msg_var
+        msg_tau = msg_pi * (up_mu - others_mu)
+        # likelihood factor (up)
+        a = 1.0 / (1.0 + beta_sq * msg_pi)
+        post_pi = prior_pi + a * msg_pi
+        post_tau = prior_tau + a * msg_tau
+        post_mu = (post_tau / post_pi).tolist()
+        post_sigma = np.sqrt(1.0 / post_pi).tolist()
+
+        transformed = []
+        start = 0
+        for size in sizes.tolist():
+            transformed.append(tuple(
+                Rating(post_mu[i], post_sigma[i]) for i in range(start, start + size)
+            ))
+            start += size
+        result: List[Tuple[Rating, ...]] = [()] * num_teams
+        for sorted_idx, original_idx in enumerate(order):
+            result[original_idx] = transformed[sorted_idx]
+        return result
@@ -0,0 +1,49 @@
+"""Rating throughput of the replay loop (``MatchService.rate_into_ledger``), without Mongo I/O.
+
+Run from the repository root:
+
+    PYTHONPATH=. python test/bench/bench_replay.py
+"""
+import random
+import time
+
+from pymongo import MongoClient
+
+from app.config import settings
+from app.models.db_models import MatchModel, PlayerModel
+from app.services.match_service import MatchService
+from app.services.rating_ledger import RatingLedger
+from app.services.skill import rate_memo
+
+CIVS = ["LEADER_SALADIN", "LEADER_TRAJAN", "LEADER_GANDHI", "LEADER_JOHN_CURTIN", "LEADER_QIN"]
+MATCHES = 3000
+POOL = 1000
+
+def _matches(rng):
+    matches = []
+    for _ in range(MATCHES):
+        ids = rng.sample(range(POOL), rng.choice([6, 8, 10]))
+        matches.append(MatchModel(
+            game="civ6", turn=100, map_type="Pangaea", game_mode="ffa", is_cloud=False,
+            players=[PlayerModel(civ=rng.choice(CIVS), team=i, discord_id=str(10_000 + d), placement=i) for i, d in enumerate(ids)],
+            parser_version="bench", discord_messages_id_list=[], save_file_hash="bench", reporter_discord_id="bench",
+        ))
+    return matches
+
+def main():
+    # never connects: the replay loop only touches the in-memory ledger
+    svc = MatchService(MongoClient(connect=False))
+    print(f"{'engine':<10}{'matches':>8}{'seconds':>9}{'matches/s':>11}")
+    for engine in ("trueskill", "numpy"):
+        settings.ts_engine = engine
+        rate_memo.clear()
+        matches = _matches(random.Random(0))
+        ledger = RatingLedger(None)
+        started = time.perf_counter()
+        for match in matches:
+            svc.rate_into_ledger(match, ledger, "delta")
+        elapsed = time.perf_counter() - started
+        print(f"{engine:<10}{MATCHES:>8}{elapsed:>9.2f}{MATCHES / elapsed:>11,.0f}")
+
+if __name__ == "__main__":
+    main()
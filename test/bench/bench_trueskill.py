@@ -0,0 +1,40 @@
+"""Compare the reference ``trueskill`` engine with ``NumpyTrueSkill``.
+
+Run from the repository root:
+
+    PYTHONPATH=. python test/bench/bench_trueskill.py
+"""
+import random
+import timeit
+
+from trueskill import TrueSkill, Rating
+
+from app.services.trueskill_numpy import NumpyTrueSkill
+
+PARAMS = dict(mu=1250.0, sigma=150.0, beta=70.0, tau=1.0, draw_probability=0.0)
+REPEAT = 200
+
+def _ffa(rng, players):
+    return [[Rating(rng.uniform(900, 1600), rng.uniform(40, 150))] for _ in range(players)]
+
+def _teamer(rng, players):
+    half = players // 2
+    return [[Rating(rng.uniform(900, 1600), rng.uniform(40, 150)) for _ in range(half)] for _ in range(2)]
+
+def main():
+    rng = random.Random(0)
+    engines = {"trueskill": TrueSkill(**PARAMS), "numpy": NumpyTrueSkill(**PARAMS)}
+    print(f"{'layout':<8}{'players':>8}{'trueskill ms':>14}{'numpy ms':>10}{'speedup':>9}")
+    for layout, build in (("ffa", _ffa), ("teamer", _teamer)):
+        for players in (2, 4, 6, 8, 10, 12):
+            groups = build(rng, players)
+            ranks = list(range(len(groups)))
+            timings = {
+                name: timeit.timeit(lambda env=env: env.rate(groups, ranks=ranks), number=REPEAT) / REPEAT * 1e3
+                for name, env in engines.items()
+            }
+            speedup = timings["trueskill"] / timings["numpy"]
+            print(f"{layout:<8}{players:>8}{timings['trueskill']:>14.3f}{timings['numpy']:>10.3f}{speedup:>8.1f}x")
+
+if __name__ == "__main__":
+    main()
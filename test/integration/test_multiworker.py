@@ -0,0 +1,136 @@
+"""
+Multi-worker approval tests against a real mongod.
+
+Transactions need a replica set, e.g.:
+
+    mongod --replSet rs0 --dbpath /tmp/rs0 --port 27018
+    mongosh --port 27018 --eval 'rs.initiate()'
+    MONGO_TEST_URL=mongodb://localhost:27018/?replicaSet=rs0 pytest test/integration
+
+The tests drop the service databases on that server; never point them at
+a server holding real data.
+"""
+import asyncio
+import multiprocessing
+import os
+import random
+from collections import Counter
+
+import pytest
+
+MONGO_TEST_URL = os.environ.get("MONGO_TEST_URL")
+NUM_WORKERS = 4
+MATCHES_PER_WORKER = 10
+PLAYER_POOL = [str(10_000 + i) for i in range(12)]
+
+pytestmark = [
+    pytest.mark.integration,
+    pytest.mark.skipif(not MONGO_TEST_URL, reason="set MONGO_TEST_URL to a replica-set mongod"),
+]
+
+SERVICE_DATABASES = ["match_reporter", "server_members", "civ6_lifetime_stats", "civ6_season_stats"]
+
+def _client():
+    from motor.motor_asyncio import AsyncIOMotorClient
+    return AsyncIOMotorClient(MONGO_TEST_URL, uuidRepresentation="standard")
+
+def _approve_worker(match_ids):
+    from app.services.match_service import MatchService
+
+    async def run():
+        client = _client()
+        svc = MatchService(client)
+        outcomes = []
+        for match_id in match_ids:
+            try:
+                await svc.approve_match(match_id, "approver")
+                outcomes.append("approved")
+            except Exception as e:
+                outcomes.append(type(e).__name__)
+        client.close()
+        return outcomes
+    return asyncio.run(run())
+
+def _lease_worker(name):
+    from app.services.leases import LeaseManager
+
+    async def run():
+        client = _client()
+        won = await LeaseManager(client).acquire(name, ttl_seconds=30)
+        client.close()
+        return won
+    return asyncio.run(run())
+
+async def _seed_matches(rng):
+    from app.models.db_models import MatchModel, PlayerModel
+    client = _client()
+    for name in SERVICE_DATABASES:
+        await client.drop_database(name)
+    pending = client["match_reporter"].pending_matches
+    rosters = []
+    for n in range(NUM_WORKERS * MATCHES_PER_WORKER):
+        roster = rng.sample(PLAYER_POOL, 6)
+        players = [
+            PlayerModel(civ="LEADER_SALADIN", team=i, discord_id=discord_id, placement=i)
+            for i, discord_id in enumerate(roster)
+        ]
+        match = MatchModel(
+            game="civ6", turn=100, map_type="Pangaea", game_mode="ffa", is_cloud=False,
+            players=players, parser_version="test", discord_messages_id_list=[],
+            save_file_hash=f"multiworker-{n}", reporter_discord_id="reporter",
+        )
+        res = await pending.insert_one(match.dict())
+        rosters.append((str(res.inserted_id), roster))
+    client.close()
+    return rosters
+
+async def _serial_ratings(client):
+    """Ratings from rating the validated matches one after another in one process, per delta field."""
+    from app.models.db_models import MatchModel
+    from app.services.match_service import MatchService
+    from app.services.rating_ledger import RatingLedger
+    svc = MatchService(client)
+    # compare-and-swap retries a conflicting approval with a new approved_at, so approval order is commit order per player
+    docs = await client["match_reporter"].validated_matches.find({}).sort([("approved_at", 1), ("_id", 1)]).to_list(length=None)
+    ledgers = {"delta": RatingLedger(None), "season_delta": RatingLedger(None)}
+    for doc in docs:
+        for delta_value_name, ledger in ledgers.items():
+            svc.rate_into_ledger(MatchModel(**doc), ledger, delta_value_name)
+    return ledgers
+
+def test_concurrent_workers_lose_no_rating_updates():
+    rosters = asyncio.run(_seed_matches(random.Random(7)))
+    chunks = [[match_id for match_id, _ in rosters[i::NUM_WORKERS]] for i in range(NUM_WORKERS)]
+    with multiprocessing.get_context("spawn").Pool(NUM_WORKERS) as pool:
+        outcomes = [o for worker in pool.map(_approve_worker, chunks) for o in worker]
+    assert outcomes.count("approved") == len(rosters), Counter(outcomes)
+
+    expected_games = Counter(discord_id for _, roster in rosters for discord_id in roster)
+
+    async def check():
+        from bson.int64 import Int64
+        client = _client()
+        assert await client["match_reporter"].pending_matches.count_documents({}) == 0
+        assert await client["match_reporter"].validated_matches.count_documents({}) == len(rosters)
+        serial = await _serial_ratings(client)
+        for table, delta_value_name in ((client["civ6_lifetime_stats"].rt_ffa, "delta"), (client["civ6_season_stats"].rt_ffa, "season_delta")):
+            for discord_id, games in expected_games.items():
+                doc = await table.find_one({"_id": Int64(discord_id)})
+                assert doc["games"] == games
+                assert doc["version"] == games
+                # a lost or stale update changes the ratings even when the counters add up
+                expected = serial[delta_value_name].get(discord_id)
+                assert doc["mu"] == pytest.approx(expected["mu"], abs=1e-9)
+                assert doc["sigma"] == pytest.approx(expected["sigma"], abs=1e-9)
+        client.close()
+    asyncio.run(check())
+
+def test_only_one_worker_acquires_a_lease():
+    async def reset():
+        client = _client()
+        await client["match_reporter"].leases.delete_many({})
+        client.close()
+    asyncio.run(reset())
+    with multiprocessing.get_context("spawn").Pool(NUM_WORKERS) as pool:
+        results = pool.map(_lease_worker, ["multiworker-test"] * NUM_WORKERS)
+    assert results.count(True) == 1
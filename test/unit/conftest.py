@@ -0,0 +1,20 @@
+from typing import Any, Dict, List
+
+import pytest
+
+from app.models.db_models import MatchModel, PlayerModel
+
+def _make_match(players: List[Dict[str, Any]], game_mode: str = "ffa", map_type: str = "Pangaea") -> MatchModel:
+    """A civ6 match; player i defaults to team i, discord id i + 1, placement i."""
+    return MatchModel(
+        game="civ6", turn=100, map_type=map_type, game_mode=game_mode, is_cloud=False,
+        players=[
+            PlayerModel(**{"civ": "LEADER_TRAJAN", "team": i, "discord_id": str(i + 1), "placement": i, **fields})
+            for i, fields in enumerate(players)
+        ],
+        parser_version="test", discord_messages_id_list=[], save_file_hash="test", reporter_discord_id="1",
+    )
+
+@pytest.fixture
+def make_match():
+    return _make_match
@@ -0,0 +1,47 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.config import settings
+from app.routes import ratings
+from app.services import auto_approval as module
+from app.services.auto_approval import AutoApprovalScheduler
+from app.services.leases import Lease, LeaseManager
+
+class FakeService:
+    def __init__(self, lease: Lease, lose_after: int):
+        self.lease = lease
+        self.lose_after = lose_after
+        self.batches = 0
+
+    async def oldest_eligible(self):
+        return None
+
+    async def approve_eligible_matches(self, limit: int) -> int:
+        self.batches += 1
+        if self.batches == self.lose_after:
+            self.lease.lost = True
+        return limit
+
+@pytest.mark.unit
+def test_run_once_stops_when_the_lease_is_lost(monkeypatch):
+    lease = Lease("auto-approval", "worker")
+    svc = FakeService(lease, lose_after=2)
+    monkeypatch.setattr(module, "TrueSkillService", lambda db: svc)
+    approved = asyncio.run(AutoApprovalScheduler().run_once(None, lease))
+    assert svc.batches == 2
+    assert approved == 2 * settings.auto_approve_batch_size
+
+@pytest.mark.unit
+def test_route_refuses_while_the_lease_is_held(monkeypatch):
+    async def held(self, name, ttl_seconds):
+        return False
+    async def run_once(db, lease=None):
+        raise AssertionError("approved without the lease")
+    monkeypatch.setattr(LeaseManager, "acquire", held)
+    monkeypatch.setattr(ratings.auto_approval, "run_once", run_once)
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(ratings.approve_eligible_matches(db={"match_reporter": SimpleNamespace(leases=None)}))
+    assert e.value.status_code == 409
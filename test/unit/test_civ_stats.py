@@ -0,0 +1,28 @@
+import pytest
+
+from app.services.civ_stats import merge_rollups, rollup_docs, rollup_of
+
+@pytest.mark.unit
+def test_rollup_counts_picks_wins_and_matches(make_match):
+    matches = [
+        make_match([dict(civ="LEADER_TRAJAN", placement=0, delta=30), dict(civ="LEADER_QIN", placement=1, delta=-30)]),
+        make_match([
+            dict(civ="LEADER_TRAJAN", placement=1, delta=-10),
+            dict(civ="LEADER_QIN", placement=0, delta=10),
+            dict(civ="LEADER_QIN", placement=0, delta=0, subbed_out=True),
+        ]),
+    ]
+    rollup = rollup_of(matches, "delta")
+    assert rollup[("Pangaea", None)]["matches"] == 2
+    trajan = [counters for (map_type, civ), counters in rollup.items() if civ and "Trajan" in civ][0]
+    assert (trajan["picks"], trajan["wins"], trajan["first"], trajan["delta_sum"]) == (2, 1, 1, 20)
+    # the subbed-out slot is not a second pick
+    assert sum(counters["picks"] for (_, civ), counters in rollup.items() if civ) == 4
+
+@pytest.mark.unit
+def test_negated_rollup_cancels_out(make_match):
+    match = make_match([dict(civ="LEADER_TRAJAN", placement=0, delta=30), dict(civ="LEADER_QIN", placement=1, delta=-30)])
+    merged = merge_rollups(rollup_of([match], "delta"), rollup_of([match], "delta", sign=-1))
+    assert all(value == 0 for counters in merged.values() for value in counters.values())
+    docs = rollup_docs("civ6_lifetime_stats.rt_ffa", rollup_of([match], "delta"))
+    assert {doc["table"] for doc in docs} == {"civ6_lifetime_stats.rt_ffa"}
@@ -0,0 +1,37 @@
+import asyncio
+
+import pytest
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+
+from app.services.match_service import MatchService
+
+class FakeSession:
+    def __init__(self, *labels):
+        self.errors = [OperationFailure("commit failed", 0, {"errorLabels": [label]}) for label in labels]
+        self.commits = 0
+
+    async def commit_transaction(self):
+        self.commits += 1
+        if self.errors:
+            raise self.errors.pop(0)
+
+@pytest.mark.unit
+def test_unknown_commit_result_is_retried():
+    session = FakeSession("UnknownTransactionCommitResult", "UnknownTransactionCommitResult")
+    asyncio.run(MatchService._commit(session))
+    assert session.commits == 3
+
+@pytest.mark.unit
+def test_transient_commit_error_is_raised_as_a_conflict():
+    session = FakeSession("TransientTransactionError")
+    with pytest.raises(OperationFailure) as e:
+        asyncio.run(MatchService._commit(session))
+    assert session.commits == 1
+    assert MatchService._is_conflict(e.value)
+
+@pytest.mark.unit
+def test_only_stat_table_duplicates_are_conflicts():
+    stat_race = BulkWriteError({"writeErrors": [{"index": 0, "code": 11000, "errmsg": "E11000 duplicate key"}]})
+    assert MatchService._is_conflict(stat_race)
+    # e.g. re-inserting an unapproved match whose save was reported again
+    assert not MatchService._is_conflict(DuplicateKeyError("E11000 duplicate key", 11000))
@@ -0,0 +1,34 @@
+import pytest
+
+from app.services.head_to_head import pair_results
+
+@pytest.mark.unit
+def test_pairs_count_opponents_both_ways(make_match):
+    first = make_match([
+        dict(discord_id="1", team=0, placement=0),
+        dict(discord_id="2", team=0, placement=0),
+        dict(discord_id="3", team=1, placement=1),
+        dict(discord_id="4", team=1, placement=1, subbed_out=True),
+    ], game_mode="teamer")
+    second = make_match([dict(discord_id="1", team=0, placement=1), dict(discord_id="3", team=1, placement=0)], game_mode="teamer")
+    results = pair_results([first, second])
+    assert results[("1", "3")] == [2, 1, 1]
+    assert results[("3", "2")] == [1, 0, 1]
+    # teammates and subbed-out players are not counted
+    assert ("1", "2") not in results
+    assert not any("4" in pair for pair in results)
+
+@pytest.mark.unit
+def test_equal_placements_are_draws(make_match):
+    results = pair_results([make_match([dict(discord_id="1", team=0, placement=0), dict(discord_id="2", team=1, placement=0)], game_mode="teamer")])
+    assert results[("1", "2")] == results[("2", "1")] == [1, 0, 0]
+
+@pytest.mark.unit
+def test_unplaced_players_are_not_counted(make_match):
+    results = pair_results([make_match([
+        dict(discord_id="1", team=0, placement=0),
+        dict(discord_id="2", team=1, placement=None),
+        dict(discord_id="3", team=2, placement=1),
+    ])])
+    assert results[("1", "3")] == [1, 1, 0]
+    assert not any("2" in pair for pair in results)
@@ -0,0 +1,66 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from app.indexes import IndexSpec, registry, stat_collections, unified_specs, verify_indexes
+
+class FakeCollection:
+    def __init__(self, indexes, ops):
+        self.indexes = indexes
+        self.ops = ops
+
+    async def index_information(self):
+        return self.indexes
+
+    async def aggregate(self, pipeline):
+        assert pipeline == [{"$indexStats": {}}]
+        for name in self.indexes:
+            yield {"name": name, "accesses": {"ops": self.ops.get(name, 0), "since": datetime(2026, 1, 1)}}
+
+class FakeClient:
+    def __init__(self, collections):
+        self.collections = collections
+
+    def __getitem__(self, database):
+        return {name.split(".", 1)[1]: coll for name, coll in self.collections.items() if name.startswith(database + ".")}
+
+@pytest.mark.unit
+def test_registry_covers_every_stat_collection():
+    specs = registry()
+    leaderboard = {(s.database, s.collection) for s in specs if s.name == "leaderboard_keyset"}
+    assert leaderboard == set(stat_collections())
+    assert len(leaderboard) == 4 * 2 * 3
+    assert ("civ7_season_stats", "pbc_teamer") in leaderboard
+    names = [(s.database, s.collection, s.name) for s in specs]
+    assert len(names) == len(set(names))
+
+@pytest.mark.unit
+def test_verify_reports_missing_unexpected_and_unused():
+    specs = [
+        IndexSpec("match_reporter", "pending_matches", (("save_file_hash", 1),), "save_file_hash_unique", unique=True),
+        IndexSpec("match_reporter", "pending_matches", (("created_at", 1), ("_id", 1)), "created_at"),
+        IndexSpec("match_reporter", "leases", (("expires_at", 1),), "expires_at_ttl", expire_after_seconds=0),
+    ]
+    client = FakeClient({
+        "match_reporter.pending_matches": FakeCollection({
+            "_id_": {"key": [("_id", 1)]},
+            # same keys but not unique: does not satisfy the spec
+            "save_file_hash_1": {"key": [("save_file_hash", 1.0)]},
+            "created_at": {"key": [("created_at", 1), ("_id", 1)]},
+        }, ops={"created_at": 12}),
+        "match_reporter.leases": FakeCollection({}, ops={}),
+    })
+    report = asyncio.run(verify_indexes(client, specs))
+    assert [(m["namespace"], m["name"]) for m in report["missing"]] == [
+        ("match_reporter.pending_matches", "save_file_hash_unique"),
+        ("match_reporter.leases", "expires_at_ttl"),
+    ]
+    assert [u["name"] for u in report["unexpected"]] == ["save_file_hash_1"]
+    assert [u["name"] for u in report["unused"]] == ["save_file_hash_1"]
+
+@pytest.mark.unit
+def test_unified_indexes_are_scoped_to_the_ledger():
+    for spec in unified_specs():
+        if spec.name != "profile":
+            assert spec.keys[0] == ("ledger", 1), spec.name
@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+from pymongo import MongoClient
+
+from app.config import settings
+from app.services.leaderboard_cache import Leaderboard, leaderboards
+from app.services.match_service import MatchService, MatchServiceError
+
+def row(discord_id, mu, games=5, version=1, sigma=50.0):
+    return {"_id": discord_id, "mu": mu, "sigma": sigma, "games": games, "wins": 1, "first": 0, "version": version}
+
+@pytest.fixture
+def small_board(monkeypatch):
+    monkeypatch.setattr(settings, "leaderboard_size", 2)
+    # top 3 of a table with more qualifying players than that
+    return Leaderboard([row(1, 1500), row(2, 1400), row(3, 1300)], capacity=3, complete=False)
+
+def ids(board):
+    return [r["discord_id"] for r in board.response()[0]["rankings"]]
+
+@pytest.mark.unit
+def test_rows_above_the_floor_are_placed_in_order(small_board):
+    small_board.apply(row(4, 1450))
+    assert ids(small_board) == ["1", "4"]
+    # the displaced bottom row is dropped, keeping capacity rows
+    assert sorted(small_board.rows) == [1, 2, 4]
+    assert not small_board.stale
+
+@pytest.mark.unit
+def test_row_falling_below_the_floor_leaves_the_board(small_board):
+    small_board.apply(row(1, 1200, version=2))
+    assert ids(small_board) == ["2", "3"]
+    assert 1 not in small_board.rows
+    small_board.apply(row(2, 1100, version=2))
+    # fewer rows than served: unknown players may belong in between
+    assert small_board.stale
+
+@pytest.mark.unit
+def test_complete_board_accepts_any_qualifying_row():
+    board = Leaderboard([row(1, 1500)], capacity=3, complete=True)
+    board.apply(row(2, 900))
+    board.apply(row(3, 2000, games=2))
+    assert sorted(board.rows) == [1, 2]
+    assert not board.stale
+
+@pytest.mark.unit
+def test_older_write_does_not_override_newer(small_board):
+    small_board.apply(row(2, 1600, version=3))
+    small_board.apply(row(2, 1410, version=2))
+    assert small_board.rows[2]["mu"] == 1600
+
+@pytest.mark.unit
+def test_etag_follows_content(small_board):
+    _, etag = small_board.response()
+    small_board.apply(row(3, 1310, version=2))
+    assert small_board.response()[1] == etag
+    small_board.apply(row(3, 1450, version=3))
+    assert small_board.response()[1] != etag
+
+@pytest.mark.unit
+def test_skill_order_ranks_by_skill_and_puts_unscored_rows_last(monkeypatch):
+    monkeypatch.setattr(settings, "leaderboard_size", 3)
+    board = Leaderboard(
+        [{**row(1, 1500), "skill": 1380.0}, {**row(2, 1400), "skill": 1395.0}, row(3, 1600)],
+        capacity=3, complete=True, order="skill",
+    )
+    assert ids(board) == ["2", "1", "3"]
+    board.apply({**row(3, 1600, version=2), "skill": 1590.0})
+    assert ids(board) == ["3", "2", "1"]
+    assert board.response()[0]["rankings"][0]["skill"] == 1590
+
+@pytest.mark.unit
+def test_unknown_tables_get_no_board():
+    svc = MatchService(MongoClient(connect=False))
+    boards = leaderboards.stats()["boards"]
+    for game, game_mode in [("civ6", "ffa-of-the-day"), ("civ8", "ffa")]:
+        with pytest.raises(MatchServiceError):
+            asyncio.run(svc.get_leaderboard("RT", game, game_mode, False))
+    assert leaderboards.stats()["boards"] == boards
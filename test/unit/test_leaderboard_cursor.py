@@ -0,0 +1,21 @@
+import pytest
+from bson.int64 import Int64
+
+from app.services.match_service import MatchService, MatchServiceError
+
+@pytest.mark.unit
+def test_cursor_resumes_strictly_after_the_last_row():
+    token = MatchService._encode_cursor({"_id": Int64(42), "mu": 1250.125, "sigma": 61.5}, "scope-a")
+    assert MatchService._decode_cursor(token, "scope-a") == {"$or": [
+        {"mu": {"$lt": 1250.125}},
+        {"mu": 1250.125, "sigma": {"$gt": 61.5}},
+        {"mu": 1250.125, "sigma": 61.5, "_id": {"$gt": 42}},
+    ]}
+
+@pytest.mark.unit
+@pytest.mark.parametrize("token", ["not-base64!", "e30=", None])
+def test_cursor_rejects_garbage_and_foreign_scopes(token):
+    if token is None:
+        token = MatchService._encode_cursor({"_id": Int64(1), "mu": 1.0, "sigma": 1.0}, "scope-b")
+    with pytest.raises(MatchServiceError):
+        MatchService._decode_cursor(token, "scope-a")
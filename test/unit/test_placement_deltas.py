@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+from pymongo import MongoClient
+
+from app.services.match_service import MatchService, MatchServiceError
+
+@pytest.fixture
+def svc(monkeypatch):
+    svc = MatchService(MongoClient(connect=False))
+
+    async def rankings(match):
+        # everyone unrated: no I/O
+        new = [svc.to_stat_model(None, p.discord_id, i) for i, p in enumerate(match.players)]
+        return new, [s.copy() for s in new]
+    monkeypatch.setattr(svc, "get_match_rankings", rankings)
+    return svc
+
+@pytest.mark.unit
+def test_every_position_of_every_team(svc, make_match):
+    match = make_match([dict(placement=p) for p in (2, 0, 1, 3)])
+    table = asyncio.run(svc._placement_deltas(match))
+    # teams in current finishing order, one row per position
+    assert [entry["team"] for entry in table] == [1, 2, 0, 3]
+    for entry in table:
+        deltas = [row[0] for row in entry["delta"]]
+        assert len(deltas) == 4
+        assert deltas == sorted(deltas, reverse=True)
+        assert entry["season_delta"] == entry["delta"]
+
+@pytest.mark.unit
+def test_current_position_matches_preview(svc, make_match):
+    match = make_match([dict(placement=p) for p in (2, 0, 1, 3)])
+    table = asyncio.run(svc._placement_deltas(match))
+    preview = make_match([dict(placement=p) for p in (2, 0, 1, 3)])
+    asyncio.run(svc._rate_preview(preview))
+    for position, entry in enumerate(table):
+        assert entry["delta"][position] == [preview.players[i].delta for i in entry["players"]]
+    # the match itself is left untouched
+    assert [p.placement for p in match.players] == [2, 0, 1, 3]
+
+@pytest.mark.unit
+def test_missing_placement_is_rejected(svc, make_match):
+    match = make_match([dict(placement=p) for p in (0, None, 1)])
+    with pytest.raises(MatchServiceError):
+        asyncio.run(svc._placement_deltas(match))
@@ -0,0 +1,14 @@
+import pytest
+
+from app.config import settings
+from app.services.match_service import MatchService
+
+@pytest.mark.unit
+def test_key_follows_rating_inputs_versions_and_trueskill_settings(make_match, monkeypatch):
+    match = make_match([dict(), dict()])
+    key = MatchService._preview_key(match, [1, 1])
+    assert MatchService._preview_key(make_match([dict(), dict()]), [1, 1]) == key
+    assert MatchService._preview_key(match, [1, 2]) != key
+    assert MatchService._preview_key(make_match([dict(placement=1), dict(placement=0)]), [1, 1]) != key
+    monkeypatch.setattr(settings, "ts_beta", settings.ts_beta + 1)
+    assert MatchService._preview_key(match, [1, 1]) != key
@@ -0,0 +1,50 @@
+import pytest
+from trueskill import TrueSkill, Rating
+
+from app.services.rate_memo import RateMemo
+
+class CountingEnv:
+    def __init__(self, mu):
+        self.env = TrueSkill(mu=mu, sigma=150.0, beta=70.0, tau=1.0, draw_probability=0.0)
+        self.calls = 0
+
+    def rate(self, rating_groups, ranks):
+        self.calls += 1
+        return self.env.rate(rating_groups, ranks=ranks)
+
+def _memo(params, maxsize=16):
+    envs = []
+    def factory():
+        envs.append(CountingEnv(params["mu"]))
+        return envs[-1]
+    return RateMemo(factory, lambda: params["mu"], maxsize=maxsize), envs
+
+@pytest.mark.unit
+def test_memo_hits_for_identical_inputs():
+    memo, envs = _memo({"mu": 1250.0})
+    groups = [[Rating(1250, 150)], [Rating(1250, 150)]]
+    first = memo.rate(groups, ranks=[0, 1])
+    second = memo.rate([[Rating(1250, 150)], [Rating(1250, 150)]], ranks=[0, 1])
+    assert envs[0].calls == 1
+    assert [[(r.mu, r.sigma) for r in t] for t in first] == [[(r.mu, r.sigma) for r in t] for t in second]
+    memo.rate(groups, ranks=[1, 0])
+    assert envs[0].calls == 2
+    assert memo.stats()["hit_ratio"] == pytest.approx(1 / 3)
+
+@pytest.mark.unit
+def test_memo_is_invalidated_when_settings_change():
+    params = {"mu": 1250.0}
+    memo, envs = _memo(params)
+    groups = [[Rating(1250, 150)], [Rating(1250, 150)]]
+    memo.rate(groups, ranks=[0, 1])
+    params["mu"] = 1500.0
+    memo.rate(groups, ranks=[0, 1])
+    assert len(envs) == 2
+    assert envs[1].calls == 1
+
+@pytest.mark.unit
+def test_memo_is_bounded():
+    memo, _ = _memo({"mu": 1250.0}, maxsize=2)
+    for mu in (1200, 1250, 1300):
+        memo.rate([[Rating(mu, 150)], [Rating(1250, 150)]], ranks=[0, 1])
+    assert memo.stats()["size"] == 2
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+from bson.int64 import Int64
+
+from app.services.rating_ledger import RatingLedger
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        self._it = iter(self.docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._it)
+        except StopIteration:
+            raise StopAsyncIteration
+
+class FakeStatTable:
+    def __init__(self, docs):
+        self.docs = {d["_id"]: d for d in docs}
+        self.queries = []
+
+    def find(self, query):
+        ids = query["_id"]["$in"]
+        self.queries.append(sorted(ids))
+        return FakeCursor([dict(self.docs[i]) for i in ids if i in self.docs])
+
+def _update(mu, won, civ):
+    return {
+        "$inc": {"games": 1, "wins": 1 if won else 0, "version": 1, f"civs.{civ}": 1},
+        "$set": {"mu": mu, "sigma": 100.0},
+    }
+
+@pytest.mark.unit
+def test_ledger_chains_updates_and_folds_them_into_one_write():
+    table = FakeStatTable([{"_id": Int64(1), "mu": 1300.0, "sigma": 120.0, "games": 4, "wins": 2, "version": 4, "civs": {"Rome": 4}}])
+    ledger = RatingLedger(table)
+    asyncio.run(ledger.load(["1", "2"]))
+    asyncio.run(ledger.load(["1", "2", None]))
+    assert table.queries == [[1, 2]]
+    assert ledger.get("2") is None
+
+    ledger.apply("1", _update(1310.0, True, "Rome"))
+    ledger.apply("2", _update(1240.0, False, "Maya"))
+    ledger.apply("1", _update(1305.0, False, "Maya"))
+    assert ledger.get("1")["mu"] == 1305.0
+    assert ledger.get("1")["games"] == 6
+    assert ledger.get("1")["civs"] == {"Rome": 5, "Maya": 1}
+    assert ledger.get("2")["civs"] == {"Maya": 1}
+
+    changes = {discord_id: (version, update) for discord_id, version, update in ledger.changes()}
+    assert changes["1"] == (4, {
+        "$inc": {"games": 2, "wins": 1, "version": 2, "civs.Rome": 1, "civs.Maya": 1},
+        "$set": {"mu": 1305.0, "sigma": 100.0},
+    })
+    assert changes["2"][0] == 0
+
+    ledger.commit()
+    assert ledger.changes() == []
+    ledger.apply("2", _update(1250.0, True, "Maya"))
+    assert ledger.changes()[0][1] == 1
+
+@pytest.mark.unit
+def test_ledger_reset_rereads():
+    table = FakeStatTable([{"_id": Int64(1), "mu": 1300.0, "sigma": 120.0, "version": 4}])
+    ledger = RatingLedger(table)
+    asyncio.run(ledger.load(["1"]))
+    ledger.apply("1", _update(1310.0, True, "Rome"))
+    ledger.reset()
+    assert ledger.changes() == []
+    asyncio.run(ledger.load(["1"]))
+    assert len(table.queries) == 2
+    assert ledger.get("1")["mu"] == 1300.0
@@ -0,0 +1,31 @@
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from app.services.rating_series import bucket_docs, downsample
+
+@pytest.mark.unit
+def test_bucket_docs_groups_by_player_and_month_in_order():
+    a, b, c = ObjectId(), ObjectId(), ObjectId()
+    points = [
+        ("1", datetime(2025, 1, 30), 1000.0, 300.0, a),
+        ("2", datetime(2025, 1, 30), 900.0, 300.0, a),
+        ("1", datetime(2025, 1, 31), 1010.0, 290.0, b),
+        ("1", datetime(2025, 2, 1), 1020.0, 280.0, c),
+    ]
+    buckets = {(doc["player"], doc["month"]): doc for doc in bucket_docs("civ6_lifetime_stats.rt_ffa", points)}
+    assert set(buckets) == {(1, "2025-01"), (2, "2025-01"), (1, "2025-02")}
+    january = buckets[(1, "2025-01")]
+    assert january["n"] == 2
+    assert january["mu"] == [1000.0, 1010.0]
+    assert january["match"] == [a, b]
+    assert buckets[(1, "2025-02")]["t"] == [datetime(2025, 2, 1)]
+
+@pytest.mark.unit
+def test_downsample_keeps_endpoints():
+    series = {"t": list(range(100)), "mu": [float(i) for i in range(100)], "sigma": [1.0] * 100}
+    out = downsample(series, 5)
+    assert out["t"] == [0, 25, 50, 74, 99]
+    assert len(out["mu"]) == len(out["sigma"]) == 5
+    assert downsample(series, 200) is series
@@ -0,0 +1,156 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from app.config import settings
+from app.services.rating_service import TrueSkillService, RatingServiceError, MatchNotFoundError
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        self._it = iter(self.docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._it)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    def sort(self, keys):
+        for field, direction in reversed(keys):
+            self.docs.sort(key=lambda d: d[field], reverse=direction < 0)
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, length=None):
+        return list(self.docs)
+
+class FakeCollection:
+    """Records every call; ``find`` understands ``{"_id": {"$in": ...}}`` and equality filters."""
+
+    def __init__(self, docs=()):
+        self.docs = {d["_id"]: dict(d) for d in docs}
+        self.calls = []
+
+    def _match(self, query):
+        for doc in self.docs.values():
+            ok = True
+            for field, cond in query.items():
+                if isinstance(cond, dict) and "$in" in cond:
+                    ok &= doc.get(field) in cond["$in"]
+                elif not field.startswith("$") and not isinstance(cond, dict):
+                    ok &= doc.get(field) == cond
+            if ok:
+                yield doc
+
+    def find(self, query, projection=None):
+        self.calls.append(("find", query))
+        return FakeCursor([dict(d) for d in self._match(query)])
+
+    async def find_one(self, query, projection=None):
+        self.calls.append(("find_one", query))
+        return next(iter(self._match(query)), None)
+
+    async def insert_many(self, docs, ordered=True):
+        self.calls.append(("insert_many", docs, ordered))
+        for doc in docs:
+            self.docs[doc.setdefault("_id", ObjectId())] = doc
+
+    async def update_one(self, query, update):
+        self.calls.append(("update_one", query, update))
+        doc = next(iter(self._match(query)), None)
+        if doc is not None:
+            doc.update(update["$set"])
+
+    async def update_many(self, query, update):
+        self.calls.append(("update_many", query, update))
+        for doc in list(self._match(query)):
+            doc.update(update["$set"])
+
+    async def bulk_write(self, ops, ordered=True):
+        self.calls.append(("bulk_write", ops, ordered))
+        for op in ops:
+            doc = next(iter(self._match(op._filter)), None)
+            if doc is not None:
+                doc.update(op._doc["$set"])
+
+def _service(players=(), matches=(), history=()):
+    collections = {"players": FakeCollection(players), "matches": FakeCollection(matches), "rating_history": FakeCollection(history)}
+    class FakeDatabase:
+        def __getattr__(self, name):
+            return collections[name]
+    return TrueSkillService({settings.mongo_db_name: FakeDatabase()}), collections
+
+@pytest.mark.unit
+def test_confirm_reads_all_pre_states_once_and_writes_history_in_one_batch():
+    match_id, a, b, c, d = (ObjectId() for _ in range(5))
+    svc, cols = _service(
+        players=[{"_id": a, "rating": {"mu": 1400.0, "sigma": 80.0}}, {"_id": c}],
+        matches=[{"_id": match_id, "status": "uploaded"}],
+    )
+    teams = [[str(a), str(b)], [str(c), str(d)]]
+    res = asyncio.run(svc.confirm_placements_and_rate(str(match_id), teams, [2, 1]))
+
+    assert [call[0] for call in cols["players"].calls] == ["find"]
+    assert set(cols["players"].calls[0][1]["_id"]["$in"]) == {a, b, c, d}
+    assert set(res["ratingDeltas"]) == {str(a), str(b), str(c), str(d)}
+    assert res["ratingDeltas"][str(a)]["deltaMu"] < 0 < res["ratingDeltas"][str(c)]["deltaMu"]
+
+    (op, rows, ordered), = cols["rating_history"].calls
+    assert op == "insert_many" and ordered
+    assert [row["playerId"] for row in rows] == [a, b, c, d]
+    assert rows[0]["pre"] == {"mu": 1400.0, "sigma": 80.0}
+    # players without a stored rating start from the configured prior
+    assert rows[1]["pre"] == rows[2]["pre"] == {"mu": settings.ts_mu, "sigma": settings.ts_sigma}
+    assert cols["matches"].docs[match_id]["status"] == "pending-approval"
+    assert cols["matches"].docs[match_id]["teams"][1] == {"teamNo": 2, "players": teams[1], "placement": 1}
+
+@pytest.mark.unit
+@pytest.mark.parametrize("teams, placements, error", [
+    ([["a"]], [1], RatingServiceError),
+    ([[str(ObjectId())], [str(ObjectId())]], [1, 1], RatingServiceError),
+    ([[str(ObjectId())], [str(ObjectId())]], [1], RatingServiceError),
+    ([[str(ObjectId()), str(ObjectId())], [str(ObjectId())]], [1, 2], RatingServiceError),
+    ([["not-an-id"], [str(ObjectId())]], [1, 2], RatingServiceError),
+    ([[str(ObjectId())], [str(ObjectId())]], [1, 2], MatchNotFoundError),
+])
+def test_confirm_rejects_invalid_input(teams, placements, error):
+    svc, cols = _service()
+    with pytest.raises(error):
+        asyncio.run(svc.confirm_placements_and_rate(str(ObjectId()), teams, placements))
+    assert cols["rating_history"].calls == []
+
+@pytest.mark.unit
+def test_approval_writes_post_ratings_in_one_ordered_batch_oldest_match_first():
+    now = datetime.utcnow()
+    older, newer, a, b = (ObjectId() for _ in range(4))
+    post = lambda mu: {"mu": mu, "sigma": 90.0}
+    svc, cols = _service(
+        players=[{"_id": a}, {"_id": b}],
+        # newer match listed first, and its history rows inserted first
+        matches=[
+            {"_id": newer, "status": "pending-approval", "confirmedAt": now - timedelta(hours=49)},
+            {"_id": older, "status": "pending-approval", "confirmedAt": now - timedelta(hours=72)},
+        ],
+        history=[
+            {"_id": ObjectId(), "matchId": newer, "playerId": a, "post": post(1320.0)},
+            {"_id": ObjectId(), "matchId": older, "playerId": a, "post": post(1300.0)},
+            {"_id": ObjectId(), "matchId": older, "playerId": b, "post": post(1200.0)},
+        ],
+    )
+    assert asyncio.run(svc.approve_eligible_matches(limit=10)) == 2
+
+    (op, writes, ordered), = [c for c in cols["players"].calls if c[0] == "bulk_write"]
+    assert ordered
+    assert [w._filter["_id"] for w in writes] == [a, b, a]
+    assert cols["players"].docs[a]["rating"]["mu"] == 1320.0
+    assert [c[0] for c in cols["rating_history"].calls] == ["find"]
+    assert {m["status"] for m in cols["matches"].docs.values()} == {"approved"}
@@ -0,0 +1,48 @@
+import random
+
+import pytest
+
+from app.services.rating_store import RatingTable
+
+def brute_order(docs):
+    ranked = [d for d in docs.values() if d["games"] >= 3]
+    return [d["_id"] for d in sorted(ranked, key=lambda d: (-d["mu"], d["sigma"], d["_id"]))]
+
+@pytest.mark.unit
+def test_positions_match_a_full_sort_under_random_updates():
+    rng = random.Random(11)
+    docs = {}
+    for discord_id in range(1, 201):
+        # coarse ratings so ties on mu (and mu + sigma) are common
+        docs[discord_id] = {"_id": discord_id, "mu": float(rng.randrange(1000, 1500, 25)), "sigma": float(rng.choice([40, 60])), "games": rng.randrange(0, 10), "version": 1}
+    table = RatingTable.from_docs(list(docs.values()))
+    for step in range(500):
+        discord_id = rng.randrange(1, 221)
+        old = docs.get(discord_id, {"games": 0, "version": 0})
+        docs[discord_id] = {
+            "_id": discord_id,
+            "mu": float(rng.randrange(1000, 1500, 25)),
+            "sigma": float(rng.choice([40, 60])),
+            "games": old["games"] + 1,
+            "version": old["version"] + 1,
+        }
+        table.apply(docs[discord_id])
+        if step % 50 == 0:
+            expected = brute_order(docs)
+            assert table.ids.tolist() == expected
+            for rank, expected_id in enumerate(expected):
+                assert table.position(expected_id) == rank
+    assert table.position(10_000) is None
+
+@pytest.mark.unit
+def test_rows_histogram_and_stale_writes():
+    table = RatingTable.from_docs([
+        {"_id": 1, "mu": 1320.0, "sigma": 50.0, "games": 4, "version": 4},
+        {"_id": 2, "mu": 1260.0, "sigma": 50.0, "games": 3, "version": 3},
+        {"_id": 3, "mu": 1299.0, "sigma": 50.0, "games": 9, "version": 9},
+    ])
+    assert [r["discord_id"] for r in table.rows(-2, 2)] == ["1", "3"]
+    assert table.rows(1, 2) == [{"rank": 2, "discord_id": "3", "rating": 1299, "games_played": 9}]
+    assert table.histogram(50) == [{"min_rating": 1250, "count": 2}, {"min_rating": 1300, "count": 1}]
+    table.apply({"_id": 1, "mu": 1100.0, "sigma": 50.0, "games": 3, "version": 3})
+    assert table.position(1) == 0
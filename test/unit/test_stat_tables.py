@@ -0,0 +1,33 @@
+import pytest
+from bson.int64 import Int64
+
+from app.services.match_service import MatchService
+from app.services.stat_tables import LedgerCursor, LedgerTable, scoped
+
+LEDGER = "civ6_lifetime_stats.rt_ffa"
+
+@pytest.mark.unit
+def test_queries_are_scoped_to_the_ledger():
+    table = LedgerTable(None, LEDGER)
+    query = {"$and": [{"games": {"$gte": 1}}, {"$or": [{"mu": 1.0, "_id": {"$gt": Int64(5)}}]}]}
+    assert table.scope(query) == {
+        "$and": [{"games": {"$gte": 1}}, {"$or": [{"mu": 1.0, "discord_id": {"$gt": Int64(5)}}]}],
+        "ledger": LEDGER,
+    }
+    # the versioned filter of approvals
+    assert scoped(table, MatchService.version_filter("7", 0)) == {"discord_id": Int64(7), "version": {"$in": [None, 0]}, "ledger": LEDGER}
+    assert scoped(object(), {"_id": 1}) == {"_id": 1}
+
+@pytest.mark.unit
+def test_documents_round_trip_through_storage():
+    table = LedgerTable(None, LEDGER)
+    doc = {"_id": Int64(7), "mu": 1300.0, "civs": {"CIVILIZATION_ROME": 2}}
+    stored = table.to_storage(doc)
+    assert stored == {"discord_id": Int64(7), "ledger": LEDGER, "mu": 1300.0, "civs": {"CIVILIZATION_ROME": 2}}
+    assert LedgerCursor.to_stat_doc(stored) == doc
+
+@pytest.mark.unit
+def test_inclusion_projections_keep_the_discord_id():
+    assert LedgerTable._projection({"mu": 1, "sigma": 1}) == {"mu": 1, "sigma": 1, "discord_id": 1}
+    assert LedgerTable._projection({"_id": 1}) == {"discord_id": 1}
+    assert LedgerTable._projection({"civs": 0}) == {"civs": 0}
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from trueskill import TrueSkill
+
+from app.services import team_balance
+from app.services.team_balance import balance, partition_count, partitions, quality
+
+@pytest.mark.unit
+@pytest.mark.parametrize("players,teams", [(4, 2), (6, 3), (12, 2), (12, 4), (12, 6)])
+def test_partitions_are_every_split_once(players, teams):
+    rows = partitions(players, teams)
+    assert len(rows) == partition_count(players, teams)
+    assert (rows[:, 0] == 0).all()
+    assert (np.stack([(rows == t).sum(axis=1) for t in range(teams)], axis=1) == players // teams).all()
+    assert len({tuple(r) for r in rows.tolist()}) == len(rows)
+
+@pytest.mark.unit
+def test_quality_matches_trueskill():
+    rng = np.random.default_rng(3)
+    mu, sigma = rng.normal(1250, 100, 9), rng.uniform(40, 150, 9)
+    env = TrueSkill(mu=1250, sigma=150, beta=70)
+    rows = partitions(9, 3)[:50]
+    expected = [
+        env.quality([[env.create_rating(mu[p], sigma[p]) for p in np.flatnonzero(row == t)] for t in range(3)])
+        for row in rows
+    ]
+    assert np.allclose(quality(rows, mu, sigma, 3, 70.0), expected)
+
+@pytest.mark.unit
+def test_balance_pairs_strong_with_weak():
+    mu = np.array([1500.0, 1400.0, 1100.0, 1000.0])
+    res = balance(mu, np.full(4, 50.0), 2, 70.0, limit=2)
+    best, _ = res["lineups"][0]
+    assert res["exhaustive"] and res["evaluated"] == 3
+    assert best[0] == best[3] and best[1] == best[2]
+    assert res["lineups"][0][1] >= res["lineups"][1][1]
+
+@pytest.mark.unit
+def test_balance_falls_back_to_local_search():
+    rng = np.random.default_rng(5)
+    res = balance(rng.normal(1250, 100, 24), rng.uniform(40, 150, 24), 4, 70.0, limit=3)
+    assert not res["exhaustive"]
+    assert len(res["lineups"]) == 3
+    for assignment, _ in res["lineups"]:
+        assert np.bincount(assignment, minlength=4).tolist() == [6, 6, 6, 6]
+
+@pytest.mark.unit
+def test_local_search_stops_at_its_budget(monkeypatch):
+    rng = np.random.default_rng(7)
+    mu, sigma = rng.normal(1250, 100, 24), rng.uniform(40, 150, 24)
+    full = balance(mu, sigma, 12, 70.0, limit=3)["evaluated"]
+    monkeypatch.setattr(team_balance, "LOCAL_SEARCH_BUDGET_SECONDS", 0.0)
+    res = balance(mu, sigma, 12, 70.0, limit=3)
+    # one restart still runs to a local optimum
+    assert 0 < res["evaluated"] < full
+    assert len(res["lineups"]) == 3
@@ -0,0 +1,56 @@
+import random
+
+import pytest
+from trueskill import TrueSkill, Rating
+
+from app.services.trueskill_numpy import NumpyTrueSkill
+
+TOLERANCE = 1e-6
+
+def _envs(draw_prob):
+    params = dict(mu=1250.0, sigma=150.0, beta=70.0, tau=1.0, draw_probability=draw_prob)
+    return TrueSkill(**params), NumpyTrueSkill(**params)
+
+def _random_match(rng, allow_draws):
+    num_teams = rng.randint(2, 12)
+    team_size = rng.randint(1, 6) if num_teams <= 2 else rng.randint(1, 3)
+    groups = [
+        [Rating(rng.uniform(800, 1700), rng.uniform(30, 200)) for _ in range(team_size)]
+        for _ in range(num_teams)
+    ]
+    if allow_draws:
+        ranks = [rng.randint(0, max(1, num_teams // 2)) for _ in range(num_teams)]
+    else:
+        ranks = list(range(num_teams))
+        rng.shuffle(ranks)
+    return groups, ranks
+
+@pytest.mark.unit
+@pytest.mark.parametrize("draw_prob,allow_draws", [(0.0, False), (0.1, False), (0.1, True)])
+def test_numpy_engine_matches_trueskill(draw_prob, allow_draws):
+    ref, engine = _envs(draw_prob)
+    rng = random.Random(draw_prob * 1000 + allow_draws)
+    checked = 0
+    for _ in range(300):
+        groups, ranks = _random_match(rng, allow_draws)
+        try:
+            expected = ref.rate(groups, ranks=ranks)
+        except FloatingPointError:
+            with pytest.raises(FloatingPointError):
+                engine.rate(groups, ranks=ranks)
+            continue
+        actual = engine.rate(groups, ranks=ranks)
+        assert len(actual) == len(expected)
+        for exp_team, act_team in zip(expected, actual):
+            assert len(exp_team) == len(act_team)
+            for exp, act in zip(exp_team, act_team):
+                assert act.mu == pytest.approx(exp.mu, abs=TOLERANCE)
+                assert act.sigma == pytest.approx(exp.sigma, abs=TOLERANCE)
+        checked += 1
+    assert checked > 200
+
+@pytest.mark.unit
+def test_numpy_engine_rejects_single_group():
+    _, engine = _envs(0.0)
+    with pytest.raises(ValueError):
+        engine.rate([[Rating(1250, 150)]], ranks=[0])
@@ -0,0 +1,44 @@
+import pytest
+from pymongo import MongoClient
+
+from app.config import settings
+from app.services.match_service import MatchService
+from app.services.rating_ledger import RatingLedger
+
+@pytest.fixture
+def svc():
+    # never connects: rating into a ledger does no I/O
+    return MatchService(MongoClient(connect=False))
+
+@pytest.mark.unit
+def test_rating_records_snapshots_chained_by_version(svc, make_match):
+    ledger = RatingLedger(None)
+    first = make_match([dict(discord_id="1", civ="LEADER_TRAJAN"), dict(discord_id="2", civ="LEADER_QIN")])
+    second = make_match([dict(discord_id="2", civ="LEADER_QIN"), dict(discord_id="3", civ="LEADER_GANDHI")])
+    svc.rate_into_ledger(first, ledger, "delta")
+    svc.rate_into_ledger(second, ledger, "delta")
+    before, after = first.players[1].rating, second.players[0].rating
+    assert before.mu_before == settings.ts_mu and before.version == 1
+    assert (after.mu_before, after.sigma_before) == (before.mu_after, before.sigma_after)
+    assert after.version == 2 == ledger.get("2")["version"]
+    assert ledger.get("2")["mu"] == after.mu_after
+
+@pytest.mark.unit
+def test_reverting_newest_first_restores_counters_and_ratings(svc, make_match):
+    ledger = RatingLedger(None)
+    matches = [
+        make_match([dict(discord_id="1", civ="LEADER_TRAJAN"), dict(discord_id="2", civ="LEADER_QIN"), dict(discord_id="3", civ="LEADER_GANDHI")]),
+        make_match([dict(discord_id="3", civ="LEADER_GANDHI"), dict(discord_id="1", civ="LEADER_TRAJAN")]),
+    ]
+    for match in matches:
+        svc.rate_into_ledger(match, ledger, "delta")
+    for match in reversed(matches):
+        for player in match.players:
+            ledger.apply(player.discord_id, svc.get_player_stats_revert(match, player, "delta"))
+    for discord_id in ("1", "2", "3"):
+        doc = ledger.get(discord_id)
+        assert (doc["mu"], doc["sigma"]) == (settings.ts_mu, settings.ts_sigma)
+        assert doc["games"] == doc["wins"] == doc["first"] == 0
+        assert not any(doc["civs"].values())
+        # versions keep moving forward for compare-and-swap and caches
+        assert doc["version"] > 0